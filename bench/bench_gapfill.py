@@ -0,0 +1,142 @@
+"""metrics_raw 결측 채우기: 기존 파이썬 루프 vs NumPy 엔진 비교.
+
+    python3 bench/bench_gapfill.py [--repeat 5] [--seed 1]
+
+7 / 30 / 90 일 구간의 5분 주기 가상 데이터(지터, 장애 구간 포함)로 두 구현을 돌려
+결과가 같은지 확인하고 소요 시간을 출력한다.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from router_info_server import (  # noqa: E402
+    format_points, gap_fill, rows_to_columns, wall_seconds,
+)
+
+
+def legacy_fill(rows, tail_to: datetime):
+    """변경 전 metrics_raw 의 dict 기반 루프 (비교 기준)."""
+    def to_float(v):
+        if v is None:
+            return None
+        try:
+            return float(v)
+        except Exception:
+            return None
+
+    raw_points = []
+    for r in rows:
+        raw_points.append({
+            "ts": r[0],
+            "rsrp": to_float(r[1]),
+            "rsrq": to_float(r[2]),
+            "sinr": to_float(r[3]),
+            "router_rssi": to_float(r[4]),
+            "is_fake": False,
+        })
+
+    filled = []
+    FIVE_MIN = 300
+
+    prev = None
+    for p in raw_points:
+        if prev is not None:
+            delta_sec = (p["ts"] - prev["ts"]).total_seconds()
+            gaps = int(delta_sec // FIVE_MIN) - 1
+            if gaps > 0:
+                for i in range(1, gaps + 1):
+                    filled.append({
+                        "ts": prev["ts"] + timedelta(minutes=5 * i),
+                        "rsrp": -125.0, "rsrq": -15.0, "sinr": 5.0, "router_rssi": -100.0,
+                        "is_fake": True,
+                    })
+        filled.append(p)
+        prev = p
+
+    if raw_points:
+        last = raw_points[-1]
+        if tail_to > last["ts"]:
+            gaps_tail = int((tail_to - last["ts"]).total_seconds() // FIVE_MIN) - 1
+            for i in range(1, gaps_tail + 1):
+                ts_fake = last["ts"] + timedelta(minutes=5 * i)
+                if ts_fake >= tail_to:
+                    break
+                filled.append({
+                    "ts": ts_fake,
+                    "rsrp": -125.0, "rsrq": -15.0, "sinr": 5.0, "router_rssi": -100.0,
+                    "is_fake": True,
+                })
+
+    filled.sort(key=lambda x: x["ts"])
+
+    return [{
+        "ts": p["ts"].strftime("%Y-%m-%d %H:%M:%S"),
+        "rsrp": p["rsrp"], "rsrq": p["rsrq"], "sinr": p["sinr"],
+        "router_rssi": p["router_rssi"], "is_fake": p["is_fake"],
+    } for p in filled]
+
+
+def numpy_fill(rows, tail_to: datetime):
+    """rows 의 ts 는 SQL(TS_SEC_EXPR) 이 돌려주는 epoch 초."""
+    ts, vals = rows_to_columns(rows)
+    ts, vals, is_fake = gap_fill(ts, vals, wall_seconds(tail_to))
+    return format_points(ts, vals, is_fake)
+
+
+def make_rows(days: int, rng: random.Random):
+    """5분 주기 + 지터, 약 2% 확률로 10분~6시간 장애, 일부 NULL 값."""
+    end = datetime(2026, 1, 1)
+    t = end - timedelta(days=days)
+    rows = []
+    while t < end:
+        rows.append((
+            t,
+            rng.randint(-120, -80),
+            round(rng.uniform(-15, -5), 1),
+            None if rng.random() < 0.01 else round(rng.uniform(0, 25), 1),
+            rng.randint(-90, -50),
+        ))
+        if rng.random() < 0.02:
+            t += timedelta(minutes=rng.randint(10, 360))
+        else:
+            t += timedelta(seconds=300 + rng.randint(-20, 20))
+    return rows, end + timedelta(hours=2)
+
+
+def bench(fn, rows, tail_to, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(rows, tail_to)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'days':>5} {'rows':>8} {'points':>8} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for days in (7, 30, 90):
+        rows, tail_to = make_rows(days, rng)
+        # 새 쿼리는 ts_kst 대신 epoch 초를 돌려준다 (변환은 DB에서)
+        sec_rows = [(wall_seconds(r[0]),) + r[1:] for r in rows]
+        expected = legacy_fill(rows, tail_to)
+        if numpy_fill(sec_rows, tail_to) != expected:
+            raise SystemExit(f"{days}일: 결과 불일치")
+        t_old = bench(legacy_fill, rows, tail_to, args.repeat)
+        t_new = bench(numpy_fill, sec_rows, tail_to, args.repeat)
+        print(f"{days:>5} {len(rows):>8} {len(expected):>8} "
+              f"{t_old * 1000:>10.1f} {t_new * 1000:>10.1f} {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
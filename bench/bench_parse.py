@@ -0,0 +1,160 @@
+"""수집 바디 파싱: 기존 build_row (json + dict + 재직렬화) vs 테이블 기반 build_row 비교.
+
+    python3 bench/bench_parse.py [--n 20000] [--repeat 5] [--seed 1]
+
+가상 라우터 보고(정상 JSON, 일부 필드 누락, 깨진 바디 포함)를 만들어 두 구현의 결과가 같은지
+확인하고 건당 소요 시간을 출력한다. orjson 이 설치되어 있으면 stdlib json 경로와 함께 비교한다.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import router_info_server as srv  # noqa: E402
+from router_info_server import (  # noqa: E402
+    ROUTER_INFO_COLS, SIGNAL_NUM_COLS, build_row, parse_signal,
+)
+
+RAW_IDX = ROUTER_INFO_COLS.index("raw_json")
+
+
+def legacy_build_row(client_ip, ts_kst: datetime, body: bytes) -> tuple:
+    """변경 전 build_row (비교 기준)."""
+    ts_str = ts_kst.strftime("%Y-%m-%d %H:%M:%S")
+
+    row = {
+        "ts_kst": ts_str,
+        "datetime_str": None, "msisdn": None, "system": None, "plmn": None,
+        "band": None, "earfcn_dl": None, "earfcn_ul": None, "bandwidth": None,
+        "cell_id": None, "pci": None, "drx": None, "rsrp": None, "rsrq": None,
+        "rssi": None, "tac": None, "sinr": None, "rrc_st": None, "emc_st": None,
+        "scell_band": None, "scell_bw": None, "scell_status": None,
+        "latitude": None, "longitude": None, "ip_v4": None,
+        "client_ip": client_ip, "raw_json": None,
+        "rsrp_num": None, "rsrq_num": None, "sinr_num": None, "rssi_num": None,
+    }
+
+    try:
+        payload = json.loads(body.decode("utf-8"))
+        row["datetime_str"] = payload.get("DATETIME")
+        row["msisdn"]       = payload.get("MSISDN")
+        row["system"]       = payload.get("SYSTEM")
+        row["plmn"]         = payload.get("PLMN")
+        row["band"]         = payload.get("Band")
+        row["earfcn_dl"]    = payload.get("EARFCN_DL")
+        row["earfcn_ul"]    = payload.get("EARFCN_UL")
+        row["bandwidth"]    = payload.get("Bandwidth")
+        row["cell_id"]      = payload.get("Cell_ID")
+        row["pci"]          = payload.get("PCI")
+        row["drx"]          = payload.get("DRX")
+        row["rsrp"]         = payload.get("RSRP")
+        row["rsrq"]         = payload.get("RSRQ")
+        row["rssi"]         = payload.get("RSSI")
+        row["tac"]          = payload.get("TAC")
+        row["sinr"]         = payload.get("SINR")
+        row["rrc_st"]       = payload.get("RRC_ST")
+        row["emc_st"]       = payload.get("EMC_ST")
+        row["scell_band"]   = payload.get("SCELL_BAND")
+        row["scell_bw"]     = payload.get("SCELL_BW")
+        row["scell_status"] = payload.get("SCELL_STATUS")
+        row["latitude"]     = payload.get("LATITUDE")
+        row["longitude"]    = payload.get("LONGITUDE")
+        row["ip_v4"]        = payload.get("IP_v4")
+        row["raw_json"]     = json.dumps(payload, ensure_ascii=False)
+    except Exception:
+        pass
+
+    for col in SIGNAL_NUM_COLS:
+        row[f"{col}_num"] = parse_signal(col, row[col])
+
+    return tuple(row[c] for c in ROUTER_INFO_COLS)
+
+
+def make_bodies(n: int, rng: random.Random):
+    """라우터 보고 형식의 바디. 약 5% 는 필드 누락, 1% 는 깨진 JSON."""
+    t = datetime(2026, 1, 1)
+    bodies = []
+    for i in range(n):
+        payload = {
+            "DATETIME": (t + timedelta(seconds=300 * i)).strftime("%Y%m%d%H%M%S"),
+            "MSISDN": f"0101234{rng.randint(0, 9999):04d}",
+            "SYSTEM": "LTE", "PLMN": "45006", "Band": str(rng.choice((1, 3, 5, 7))),
+            "EARFCN_DL": str(rng.randint(0, 3000)), "EARFCN_UL": str(rng.randint(18000, 21000)),
+            "Bandwidth": "20MHz", "Cell_ID": f"{rng.getrandbits(28):07X}",
+            "PCI": str(rng.randint(0, 503)), "DRX": "1280",
+            "RSRP": str(rng.randint(-120, -80)), "RSRQ": f"{rng.uniform(-15, -5):.1f}",
+            "RSSI": str(rng.randint(-90, -50)), "TAC": str(rng.randint(1, 9999)),
+            "SINR": f"{rng.uniform(0, 25):.1f}", "RRC_ST": "CONNECTED", "EMC_ST": "0",
+            "SCELL_BAND": "", "SCELL_BW": "", "SCELL_STATUS": "NONE",
+            "LATITUDE": f"{rng.uniform(33, 38):.6f}", "LONGITUDE": f"{rng.uniform(126, 129):.6f}",
+            "IP_v4": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+        }
+        r = rng.random()
+        if r < 0.05:
+            for k in rng.sample(sorted(payload), 5):
+                del payload[k]
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        if r > 0.99:
+            body = body[: len(body) // 2]
+        bodies.append(body)
+    return bodies
+
+
+def check(bodies, ts: datetime):
+    """raw_json 은 원본 바디를 그대로 저장하므로 파싱 결과로 비교, 나머지 컬럼은 값 그대로 비교."""
+    for body in bodies:
+        old = legacy_build_row("10.0.0.1", ts, body)
+        new = build_row("10.0.0.1", ts, body)
+        same_raw = (old[RAW_IDX] is None) == (new[RAW_IDX] is None) and (
+            old[RAW_IDX] is None or json.loads(old[RAW_IDX]) == json.loads(new[RAW_IDX])
+        )
+        if not same_raw or old[:RAW_IDX] + old[RAW_IDX + 1:] != new[:RAW_IDX] + new[RAW_IDX + 1:]:
+            raise SystemExit(f"결과 불일치: {body[:80]!r}")
+
+
+def bench(fn, bodies, ts: datetime, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for body in bodies:
+            fn("10.0.0.1", ts, body)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    bodies = make_bodies(args.n, random.Random(args.seed))
+    ts = datetime(2026, 1, 1, 12, 0, 0)
+
+    loaders = [("json", json.loads)]
+    if srv.orjson is not None:
+        loaders.append(("orjson", srv.orjson.loads))
+
+    t_old = bench(legacy_build_row, bodies, ts, args.repeat)
+    print(f"{'impl':>16} {'us/row':>8} {'speedup':>8}")
+    print(f"{'legacy':>16} {t_old * 1e6:>8.2f} {1.0:>7.1f}x")
+
+    default = srv.json_loads
+    try:
+        for name, loads in loaders:
+            srv.json_loads = loads
+            check(bodies, ts)
+            t_new = bench(build_row, bodies, ts, args.repeat)
+            print(f"{'table+' + name:>16} {t_new * 1e6:>8.2f} {t_old / t_new:>7.1f}x")
+    finally:
+        srv.json_loads = default
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""워커 수에 따른 처리량: 수집 POST 와 조회 GET 의 초당 요청 수를 워커 수별로 비교.
+
+    python3 bench/load_workers.py [--workers 1,2,4] [--port 35480] [--conns 64] [--duration 10]
+    python3 bench/load_workers.py --url http://host:35443   # 이미 떠 있는 서버 하나만 측정
+
+워커 수마다 `router_info_server.py serve --workers N` 를 띄워(DB 환경변수는 그대로 사용)
+keep-alive 연결 --conns 개로 --duration 초 동안 요청을 보내고 req/s 와 p50/p99 지연을 출력한다.
+수집 측정으로 쌓인 행은 --msisdn 번호로 들어가므로 측정용 DB 에서 실행할 것.
+조회는 응답 캐시를 피하도록 요청마다 다른 `_b` 파라미터를 붙인다 (연결 간에도 겹치지 않게).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "router_info_server.py")
+
+
+def ingest_body(msisdn: str, i: int) -> bytes:
+    return json.dumps({
+        "DATETIME": datetime.now().strftime("%Y%m%d%H%M%S"), "MSISDN": msisdn,
+        "SYSTEM": "LTE", "RSRP": str(-80 - i % 40), "RSRQ": "-9.5", "SINR": "12.0", "RSSI": "-60",
+    }).encode()
+
+
+async def worker(host, port, make_request, deadline, lat, errors):
+    """keep-alive 연결 하나로 deadline 까지 요청을 반복 (Content-Length 응답만 처리)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            writer.write(make_request(i))
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if status >= 400:
+                errors.append(status)
+            lat.append(time.perf_counter() - t0)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, make_request, conns, duration):
+    lat, errors = [], []
+    deadline = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, make_request, deadline, lat, errors) for _ in range(conns)))
+    elapsed = time.perf_counter() - t0
+    lat.sort()
+    pct = (lambda q: lat[min(len(lat) - 1, int(len(lat) * q))] * 1000) if lat else (lambda q: 0.0)
+    return {"rps": len(lat) / elapsed, "p50": pct(0.5), "p99": pct(0.99), "errors": len(errors)}
+
+
+def requests_for(host, msisdn):
+    def post(i):
+        body = ingest_body(msisdn, i)
+        return (f"POST /bench HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+    bust = itertools.count()   # worker 의 i 는 연결마다 0 부터라 연결 간에 공유하는 번호를 쓴다
+
+    def get(i):
+        return (f"GET /api/metrics/daily_avg?msisdn={msisdn}&days=7&_b={next(bust)} HTTP/1.1\r\n"
+                f"Host: {host}\r\n\r\n").encode()
+
+    return {"ingest": post, "daily_avg": get}
+
+
+async def wait_ready(host, port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET /healthz HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            if (await reader.read()).startswith(b"HTTP/1.1 200"):
+                writer.close()
+                return
+            writer.close()
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"서버가 {timeout:.0f}초 안에 준비되지 않았습니다 ({host}:{port})")
+
+
+async def measure(host, port, args):
+    out = {}
+    for name, make_request in requests_for(host, args.msisdn).items():
+        out[name] = await run_load(host, port, make_request, args.conns, args.duration)
+    return out
+
+
+def print_row(label, res, base):
+    cells = []
+    for name in ("ingest", "daily_avg"):
+        r = res[name]
+        scale = r["rps"] / base[name]["rps"] if base and base[name]["rps"] else 1.0
+        cells.append(f"{r['rps']:>9.0f} {scale:>5.2f}x {r['p50']:>6.1f} {r['p99']:>6.1f} {r['errors']:>5}")
+    print(f"{label:>8} " + " | ".join(cells), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="쉼표로 구분한 워커 수 목록")
+    parser.add_argument("--port", type=int, default=35480)
+    parser.add_argument("--url", help="이미 실행 중인 서버 주소 (지정하면 서버를 띄우지 않음)")
+    parser.add_argument("--conns", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--msisdn", default="01099990000")
+    args = parser.parse_args()
+
+    hdr = f"{'req/s':>9} {'scale':>6} {'p50ms':>6} {'p99ms':>6} {'err':>5}"
+    print(f"{'workers':>8} {'ingest':^36} | {'daily_avg':^36}")
+    print(f"{'':>8} {hdr} | {hdr}")
+
+    if args.url:
+        u = urlsplit(args.url)
+        print_row("-", asyncio.run(measure(u.hostname, u.port or 80, args)), None)
+        return
+
+    base = None
+    for n in [int(x) for x in args.workers.split(",") if x.strip()]:
+        proc = subprocess.Popen(
+            [sys.executable, SERVER, "serve", "--workers", str(n), "--host", "127.0.0.1", "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            asyncio.run(wait_ready("127.0.0.1", args.port))
+            res = asyncio.run(measure("127.0.0.1", args.port, args))
+        finally:
+            proc.terminate()
+            proc.wait(timeout=60)
+        base = base or res
+        print_row(str(n), res, base)
+
+
+if __name__ == "__main__":
+    main()
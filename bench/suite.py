@@ -0,0 +1,669 @@
+"""수집/조회 API 부하 측정: 합성 데이터로 1M / 10M 행 DB 를 만들고 서버를 띄워 지연과 처리량을 JSON 으로 저장.
+
+    python3 bench/suite.py run [--docker] [--sizes 1000000,10000000] [--rate 500] [--duration 20] [--out FILE]
+    python3 bench/suite.py compare BASE.json NEW.json [--threshold 0.1]
+
+DB 접속은 DB_HOST / DB_PORT / DB_USER / DB_PASS 환경변수와 --db-name(기본 ROUTER_INFO_BENCH) 을 쓴다.
+--docker 면 MySQL 8 컨테이너를 띄워 쓰고 끝나면 지운다 (--keep 이면 남겨서 다음 실행 때 데이터 재사용).
+합성 행을 넣고 테이블을 만들므로 운영 DB 로 실행하지 말 것.
+
+크기마다 router_info 를 목표 행 수까지 채우고(이미 있으면 모자란 만큼만 과거 쪽으로 추가) 서버를 띄워
+롤업이 따라잡은 뒤 아래 시나리오를 돈다.
+
+    ingest          --rate req/s 개방 루프 POST. 지연은 예정 시각 기준, rows_per_sec 는 DB 에 적재된 속도
+    metrics_raw     /api/metrics/raw 최근 7일
+    hourly_avg      /api/metrics/hourly_avg 30일
+    records_deep    /api/records 기기 전체 구간의 깊은 OFFSET 페이지
+    records_cursor  /api/records 커서로 이어 읽기 (페이지당 지연)
+    records_csv     /api/records/csv 기기 전체 구간 (rows_per_sec, mb_per_sec)
+    outages         /api/outages 전체 기기 30일
+
+조회는 응답 캐시를 피하도록 요청마다 다른 `_b` 파라미터를 붙인다.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import router_info_server as srv  # noqa: E402
+from router_info_server import aiomysql  # noqa: E402
+
+SERVER = os.path.join(HERE, "..", "router_info_server.py")
+FIVE_MIN = timedelta(minutes=5)
+SAMPLES_PER_DAY = 288
+
+# 서버는 router_info / devices 를 만들지 않으므로 (운영 DB 에 이미 있음) 벤치 DB 에는 같은 모양으로 만든다.
+# 인덱스는 서버가 요구하는 것(REQUIRED_INDEXES)만 둔다
+ROUTER_INFO_DDL = (
+    "CREATE TABLE IF NOT EXISTS `router_info` (\n"
+    "  `id` BIGINT NOT NULL AUTO_INCREMENT,\n  `ts_kst` DATETIME NOT NULL,\n"
+    + "".join(f"  `{c}` VARCHAR(64) NULL,\n" for c, _ in srv.PAYLOAD_FIELDS)
+    + "  `client_ip` VARCHAR(64) NULL,\n  `raw_json` TEXT NULL,\n"
+    + "".join(f"  `{c}_num` {t} NULL,\n" for c, (t, _, _) in srv.SIGNAL_NUM_COLS.items())
+    + "  PRIMARY KEY (`id`),\n"
+    + ",\n".join(f"  KEY `{name}` (" + ", ".join(f"`{c}`" for c in cols) + ")" for cols, name in srv.REQUIRED_INDEXES.items())
+    + "\n)"
+)
+DEVICES_DDL = """
+CREATE TABLE IF NOT EXISTS `devices` (
+  `msisdn` VARCHAR(32) NOT NULL PRIMARY KEY,
+  `alias` VARCHAR(64) NULL,
+  `dormant` TINYINT NOT NULL DEFAULT 0,
+  `dormant_at` DATETIME NULL
+)
+"""
+# 기기별로 어디까지 채웠는지 (샘플 번호 j 는 anchor 에서 5분 * j 전, 클수록 과거)
+SEED_DDL = """
+CREATE TABLE IF NOT EXISTS `bench_seed` (
+  `msisdn` VARCHAR(32) NOT NULL PRIMARY KEY,
+  `anchor` DATETIME NOT NULL,
+  `next_j` INT NOT NULL
+)
+"""
+
+# 라우터 보고 필드별 합성 값 (insert_db 가 매핑하는 PAYLOAD_FIELDS 와 같은 키)
+FIELD_GEN = {
+    "SYSTEM": lambda r: "LTE",
+    "PLMN": lambda r: "45006",
+    "Band": lambda r: str(r.choice((1, 3, 5, 7))),
+    "EARFCN_DL": lambda r: str(r.randint(0, 3000)),
+    "EARFCN_UL": lambda r: str(r.randint(18000, 21000)),
+    "Bandwidth": lambda r: "20MHz",
+    "Cell_ID": lambda r: f"{r.getrandbits(28):07X}",
+    "PCI": lambda r: str(r.randint(0, 503)),
+    "DRX": lambda r: "1280",
+    "RSRP": lambda r: str(r.randint(-120, -80)),
+    "RSRQ": lambda r: f"{r.uniform(-15, -5):.1f}",
+    "RSSI": lambda r: str(r.randint(-90, -50)),
+    "TAC": lambda r: str(r.randint(1, 9999)),
+    "SINR": lambda r: f"{r.uniform(0, 25):.1f}",
+    "RRC_ST": lambda r: "CONNECTED",
+    "EMC_ST": lambda r: "0",
+    "SCELL_BAND": lambda r: "",
+    "SCELL_BW": lambda r: "",
+    "SCELL_STATUS": lambda r: "NONE",
+    "LATITUDE": lambda r: f"{r.uniform(33, 38):.6f}",
+    "LONGITUDE": lambda r: f"{r.uniform(126, 129):.6f}",
+    "IP_v4": lambda r: f"10.{r.randint(0, 255)}.{r.randint(0, 255)}.{r.randint(1, 254)}",
+}
+missing = set(srv.PAYLOAD_KEYS) - set(FIELD_GEN) - {"DATETIME", "MSISDN"}
+if missing:
+    raise SystemExit(f"합성 값이 없는 보고 필드: {sorted(missing)}")
+
+
+def msisdn_of(k: int) -> str:
+    return f"0109{k:07d}"
+
+
+def make_body(rng: random.Random, msisdn: str, ts: datetime) -> bytes:
+    payload = {"DATETIME": ts.strftime("%Y%m%d%H%M%S"), "MSISDN": msisdn}
+    payload.update((k, gen(rng)) for k, gen in FIELD_GEN.items())
+    return json.dumps(payload).encode()
+
+
+def sample_missing(k: int, j: int) -> bool:
+    """약 0.3% 샘플 누락 + 기기마다 29일에 한 번 2시간 장애 (gap_fill / outages 경로가 실제처럼 돌도록)."""
+    return (j * 2654435761 + k * 97) % 1000 < 3 or ((j // SAMPLES_PER_DAY) % 29 == k % 29 and j % SAMPLES_PER_DAY < 24)
+
+
+# ====== DB ======
+
+def db_args(args) -> dict:
+    return {"host": args.db_host, "port": args.db_port, "user": args.db_user, "password": args.db_pass}
+
+
+async def prepare_db(args):
+    conn = await aiomysql.connect(**db_args(args), autocommit=True)
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.db_name}`")
+            await cur.execute(f"USE `{args.db_name}`")
+            for sql in (ROUTER_INFO_DDL, DEVICES_DDL, SEED_DDL):
+                await cur.execute(sql)
+    finally:
+        conn.close()
+    # devices.last_* 등 서버가 추가하는 컬럼/보조 테이블
+    pool = await aiomysql.create_pool(**db_args(args), db=args.db_name, autocommit=True, minsize=1, maxsize=1)
+    try:
+        await srv.ensure_schema(pool)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def seed(args, size: int):
+    """router_info 를 기기당 size / devices 샘플까지 채운다. 새 행은 이미 채운 구간보다 과거 쪽으로 추가."""
+    per_device = -(-size // args.devices)
+    pool = await aiomysql.create_pool(**db_args(args), db=args.db_name, autocommit=True,
+                                      minsize=1, maxsize=args.seed_jobs)
+    try:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT `msisdn`, `anchor`, `next_j` FROM `bench_seed`")
+                state = {m: (a, j) for m, a, j in await cur.fetchall()}
+        anchor = min((a for a, _ in state.values()), default=None) \
+            or srv.floor_hour(srv.now_kst_naive()) - timedelta(hours=1)
+
+        todo = [k for k in range(args.devices) if state.get(msisdn_of(k), (anchor, 0))[1] < per_device]
+        if not todo:
+            return
+        t0 = time.perf_counter()
+        done = [0]
+
+        async def fill(k):
+            m = msisdn_of(k)
+            j0 = state.get(m, (anchor, 0))[1]
+            rng = random.Random(args.seed * 1_000_003 + k * 7919 + j0)
+            batch, newest = [], None
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    # 기기 안에서는 시간 순서대로 넣는다 (수집과 같은 삽입 순서)
+                    for j in range(per_device - 1, j0 - 1, -1):
+                        if sample_missing(k, j):
+                            continue
+                        ts = anchor - FIVE_MIN * j
+                        newest = row = srv.build_row("10.0.0.1", ts, make_body(rng, m, ts))
+                        batch.append(row)
+                        if len(batch) >= 2000:
+                            await insert_rows(cur, batch)
+                            done[0] += len(batch)
+                            batch = []
+                    if batch:
+                        await insert_rows(cur, batch)
+                        done[0] += len(batch)
+                    if j0 == 0 and newest is not None:
+                        _, params = srv.last_seen_params([newest])
+                        await cur.execute(srv.DEVICES_UPSERT_SQL.format(values=srv.DEVICES_ROW_PH), params)
+                    await cur.execute(
+                        "REPLACE INTO `bench_seed` (`msisdn`, `anchor`, `next_j`) VALUES (%s, %s, %s)",
+                        (m, anchor, per_device),
+                    )
+
+        queue = list(todo)
+
+        async def runner():
+            while queue:
+                await fill(queue.pop())
+
+        async def progress():
+            while queue or done[0] == 0:
+                await asyncio.sleep(10)
+                print(f"  seed {done[0]:,} rows ({done[0] / (time.perf_counter() - t0):,.0f} rows/s)", flush=True)
+
+        reporter = asyncio.create_task(progress())
+        await asyncio.gather(*(runner() for _ in range(args.seed_jobs)))
+        reporter.cancel()
+
+        # 이미 롤업된 구간보다 과거 행을 넣었으므로 서버가 가장 오래된 날부터 다시 롤업하게 한다
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    INSERT INTO `rollup_state` (`name`, `watermark`) VALUES ('hourly', %s) AS new
+                    ON DUPLICATE KEY UPDATE `watermark` = LEAST(COALESCE(`rollup_state`.`watermark`, new.`watermark`), new.`watermark`)
+                    """,
+                    (srv.floor_day(anchor - FIVE_MIN * (per_device - 1)),),
+                )
+        print(f"  seed done: +{done[0]:,} rows in {time.perf_counter() - t0:,.0f}s", flush=True)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def insert_rows(cur, rows):
+    await cur.execute(
+        srv.ROUTER_INFO_INSERT_SQL + ", ".join([srv.ROUTER_INFO_ROW_PH] * len(rows)),
+        [v for r in rows for v in r],
+    )
+
+
+async def db_scalar(args, sql: str, params=()):
+    conn = await aiomysql.connect(**db_args(args), db=args.db_name, autocommit=True)
+    try:
+        async with conn.cursor() as cur:
+            await cur.execute(sql, params)
+            row = await cur.fetchone()
+            return row[0] if row else None
+    finally:
+        conn.close()
+
+
+async def wait_rollup(args, timeout: float):
+    """서버 기동 후 롤업 워터마크가 따라잡을 때까지 (조회가 롤업 테이블을 쓰도록)."""
+    target = srv.floor_hour(srv.now_kst_naive() - timedelta(seconds=srv.ROLLUP_DELAY_SEC))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        wm = await db_scalar(args, "SELECT `watermark` FROM `rollup_state` WHERE `name` = 'hourly'")
+        if wm is not None and wm >= target:
+            return wm
+        await asyncio.sleep(2)
+    print(f"  롤업 워터마크가 {timeout:.0f}초 안에 따라잡지 못했습니다 (조회 결과에 원본 집계가 섞임)", flush=True)
+    return None
+
+
+# ====== HTTP ======
+
+class HttpConn:
+    """keep-alive HTTP/1.1 연결 하나 (Content-Length / chunked 응답)."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers: str = ""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n{headers}"
+        if body:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        self.writer.write((head + "\r\n").encode() + body)
+        await self.writer.drain()
+        try:
+            raw = await self.reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.close()
+            raise
+        lines = raw.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        hdrs = {k.strip().lower(): v.strip() for k, v in (ln.split(":", 1) for ln in lines[1:] if ":" in ln)}
+        if hdrs.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                parts.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            data = b"".join(p[:-2] for p in parts)
+        else:
+            data = await self.reader.readexactly(int(hdrs.get("content-length", 0)))
+        if hdrs.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def percentiles(lat: list) -> dict:
+    if not lat:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    lat = sorted(lat)
+    pick = lambda q: round(lat[min(len(lat) - 1, int(len(lat) * q))] * 1000, 2)  # noqa: E731
+    return {"p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": round(lat[-1] * 1000, 2)}
+
+
+async def closed_loop(host, port, make_path, conns: int, duration: float, on_body=None) -> dict:
+    """conns 개 연결이 응답을 받자마자 다음 요청을 보낸다. make_path(i) -> 경로."""
+    lat, errors, counter = [], [0], [0]
+    deadline = time.perf_counter() + duration
+
+    async def one():
+        conn = HttpConn(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                i = counter[0] = counter[0] + 1
+                t0 = time.perf_counter()
+                try:
+                    status, data = await conn.request("GET", make_path(i))
+                except (OSError, asyncio.IncompleteReadError):
+                    conn.close()
+                    errors[0] += 1
+                    await asyncio.sleep(0.1)
+                    continue
+                lat.append(time.perf_counter() - t0)
+                if status >= 400:
+                    errors[0] += 1
+                elif on_body:
+                    on_body(data)
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(conns)))
+    elapsed = time.perf_counter() - t0
+    return {"requests": len(lat), "rps": round(len(lat) / elapsed, 1), "errors": errors[0], **percentiles(lat)}
+
+
+async def open_loop(host, port, make_body, rate: float, duration: float, conns: int) -> dict:
+    """rate req/s 로 예정 시각마다 POST. 지연은 예정 시각부터 재므로 서버가 밀리면 대기 시간까지 포함된다."""
+    ticks = asyncio.Queue()
+    lat, errors, sent = [], [0], [0]
+
+    async def one():
+        conn = HttpConn(host, port)
+        try:
+            while True:
+                due = await ticks.get()
+                if due is None:
+                    return
+                try:
+                    status, _ = await conn.request("POST", "/bench", make_body(sent[0]))
+                except (OSError, asyncio.IncompleteReadError):
+                    conn.close()
+                    errors[0] += 1
+                    continue
+                sent[0] += 1
+                lat.append(time.perf_counter() - due)
+                if status >= 400:
+                    errors[0] += 1
+        finally:
+            conn.close()
+
+    workers = [asyncio.create_task(one()) for _ in range(conns)]
+    start = time.perf_counter()
+    n = int(rate * duration)
+    for i in range(n):
+        due = start + i / rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        ticks.put_nowait(due)
+    for _ in workers:
+        ticks.put_nowait(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - start
+    return {"target_rps": rate, "requests": sent[0], "rps": round(sent[0] / elapsed, 1),
+            "errors": errors[0], **percentiles(lat)}
+
+
+async def wait_ready(host, port, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        conn = HttpConn(host, port)
+        try:
+            status, _ = await conn.request("GET", "/healthz")
+            if status == 200:
+                return
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            conn.close()
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"서버가 {timeout:.0f}초 안에 준비되지 않았습니다")
+
+
+# ====== 시나리오 ======
+
+async def scenario_ingest(args, host, port):
+    rng = random.Random(args.seed)
+    before = await db_scalar(args, "SELECT COALESCE(MAX(`id`), 0) FROM `router_info`")
+    t0 = time.perf_counter()
+
+    def body(i):
+        return make_body(rng, msisdn_of(i % args.devices), srv.now_kst_naive())
+
+    res = await open_loop(host, port, body, args.rate, args.duration, args.conns * 4)
+    # 스풀을 거쳐 DB 에 다 들어갈 때까지 (최대 60초)
+    ok = res["requests"] - res["errors"]
+    stored = 0
+    for _ in range(120):
+        stored = await db_scalar(args, "SELECT COUNT(*) FROM `router_info` WHERE `id` > %s", (before,))
+        if stored >= ok:
+            break
+        await asyncio.sleep(0.5)
+    res["rows_stored"] = stored
+    res["rows_per_sec"] = round(stored / (time.perf_counter() - t0), 1)
+    return res
+
+
+def read_scenarios(args, rows_per_device: int, anchor: datetime):
+    """이름 -> (make_path(i), conns). 기기는 요청마다 무작위, `_b` 로 응답 캐시를 피한다."""
+    rng = random.Random(args.seed)
+    first = (anchor - FIVE_MIN * rows_per_device).strftime("%Y-%m-%d")
+    last = srv.now_kst_naive().strftime("%Y-%m-%d")
+    page_size = 200
+    deep_page = max(1, int(rows_per_device * 0.9) // page_size)
+
+    def path(route, **params):
+        return lambda i: f"{route}?" + urlencode({**params, "msisdn": msisdn_of(rng.randrange(args.devices)), "_b": i})
+
+    return {
+        "metrics_raw": (path("/api/metrics/raw", days=7), args.conns),
+        "hourly_avg": (path("/api/metrics/hourly_avg", days=30), args.conns),
+        "records_deep": (path("/api/records", start=first, end=last, page=deep_page, page_size=page_size), args.conns),
+        "outages": (lambda i: "/api/outages?" + urlencode({"days": 30, "_b": i}), max(1, args.conns // 4)),
+    }, (first, last)
+
+
+async def scenario_records_cursor(args, host, port, first, last):
+    """기기 하나를 커서로 끝까지(또는 duration 동안) 넘기며 페이지당 지연."""
+    rng = random.Random(args.seed + 1)
+    lat, errors = [], 0
+    conn = HttpConn(host, port)
+    deadline = time.perf_counter() + args.duration
+    try:
+        while time.perf_counter() < deadline:
+            params = {"msisdn": msisdn_of(rng.randrange(args.devices)), "start": first, "end": last, "page_size": 200}
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                status, data = await conn.request("GET", "/api/records?" + urlencode(params))
+                lat.append(time.perf_counter() - t0)
+                if status != 200:
+                    errors += 1
+                    break
+                cursor = json.loads(data).get("next_cursor")
+                if not cursor:
+                    break
+                params["cursor"] = cursor
+    finally:
+        conn.close()
+    return {"requests": len(lat), "rps": round(len(lat) / args.duration, 1), "errors": errors, **percentiles(lat)}
+
+
+async def scenario_records_csv(args, host, port, first, last):
+    """기기 전체 구간 CSV 를 연결 CSV_EXPORT_MAX 개 이하로 받는다."""
+    rng = random.Random(args.seed + 2)
+    lat, nbytes, nrows, errors = [], [0], [0], [0]
+    deadline = time.perf_counter() + args.duration
+
+    async def one():
+        conn = HttpConn(host, port)
+        try:
+            while time.perf_counter() < deadline:
+                q = urlencode({"msisdn": msisdn_of(rng.randrange(args.devices)), "start": first, "end": last})
+                t0 = time.perf_counter()
+                status, data = await conn.request("GET", "/api/records/csv?" + q)
+                lat.append(time.perf_counter() - t0)
+                if status != 200:
+                    errors[0] += 1
+                    continue
+                nbytes[0] += len(data)
+                nrows[0] += data.count(b"\r\n") - 1
+        finally:
+            conn.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(min(2, srv.CSV_EXPORT_MAX))))
+    elapsed = time.perf_counter() - t0
+    return {"requests": len(lat), "errors": errors[0], "rows_per_sec": round(nrows[0] / elapsed, 1),
+            "mb_per_sec": round(nbytes[0] / elapsed / 1e6, 2), **percentiles(lat)}
+
+
+async def run_size(args, size: int, host: str, port: int) -> dict:
+    await seed(args, size)
+    rows = await db_scalar(args, "SELECT COUNT(*) FROM `router_info`")
+    anchor = await db_scalar(args, "SELECT MIN(`anchor`) FROM `bench_seed`")
+    rows_per_device = -(-size // args.devices)
+
+    env = dict(os.environ, DB_HOST=args.db_host, DB_PORT=str(args.db_port), DB_USER=args.db_user,
+               DB_PASS=args.db_pass, DB_NAME=args.db_name, LOG_DIR=args.work_dir, SLOW_QUERY_MS="0",
+               RETENTION_MONTHS="0", ARCHIVE_MONTHS="0")
+    for k in ("READ_DB_HOST", "SPOOL_DIR", "ARCHIVE_DIR"):
+        env.pop(k, None)
+    proc = subprocess.Popen(
+        [sys.executable, SERVER, "serve", "--workers", str(args.workers), "--host", host, "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    out = {"rows": rows, "devices": args.devices, "rows_per_device": rows_per_device}
+    try:
+        await wait_ready(host, port, 120)
+        t0 = time.perf_counter()
+        await wait_rollup(args, args.rollup_wait)
+        out["rollup_catchup_sec"] = round(time.perf_counter() - t0, 1)
+
+        reads, (first, last) = read_scenarios(args, rows_per_device, anchor)
+        only = set(args.scenarios.split(",")) if args.scenarios else None
+        plan = [("ingest", lambda: scenario_ingest(args, host, port))]
+        plan += [(name, lambda p=p, c=c: closed_loop(host, port, p, c, args.duration)) for name, (p, c) in reads.items()]
+        plan += [("records_cursor", lambda: scenario_records_cursor(args, host, port, first, last)),
+                 ("records_csv", lambda: scenario_records_csv(args, host, port, first, last))]
+        for name, fn in plan:
+            if only and name not in only:
+                continue
+            res = out[name] = await fn()
+            print(f"  {name:<15} " + " ".join(f"{k}={v}" for k, v in res.items()), flush=True)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+    return out
+
+
+# ====== 실행 / 비교 ======
+
+def start_container(args):
+    name = f"router-info-bench-{args.db_port}"
+    if subprocess.run(["docker", "inspect", name], capture_output=True).returncode != 0:
+        subprocess.run(
+            ["docker", "run", "-d", "--name", name, "-p", f"{args.db_port}:3306",
+             "-e", f"MYSQL_ROOT_PASSWORD={args.db_pass}", args.image,
+             "--innodb-buffer-pool-size=1G", "--innodb-flush-log-at-trx-commit=2"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+    else:
+        subprocess.run(["docker", "start", name], check=True, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(db_scalar_any(args))
+            return name
+        except Exception:
+            time.sleep(2)
+    raise SystemExit("DB 컨테이너가 준비되지 않았습니다")
+
+
+async def db_scalar_any(args):
+    conn = await aiomysql.connect(**db_args(args))
+    conn.close()
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def cmd_run(args):
+    if args.docker:
+        args.db_host, args.db_user = "127.0.0.1", "root"
+        args.db_pass = args.db_pass or "bench"
+        container = start_container(args)
+    args.work_dir = tempfile.mkdtemp(prefix="router-bench-")
+    result = {
+        "meta": {
+            "started": datetime.now().isoformat(timespec="seconds"), "git": git_rev(),
+            "python": platform.python_version(), "host": platform.node(), "cpus": os.cpu_count(),
+            "image": args.image if args.docker else None,
+            "params": {k: getattr(args, k) for k in ("devices", "rate", "duration", "conns", "workers", "seed")},
+        },
+        "sizes": {},
+    }
+    try:
+        asyncio.run(prepare_db(args))
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            print(f"== {size:,} rows", flush=True)
+            result["sizes"][str(size)] = asyncio.run(run_size(args, size, "127.0.0.1", args.port))
+    finally:
+        shutil.rmtree(args.work_dir, ignore_errors=True)
+        if args.docker and not args.keep:
+            subprocess.run(["docker", "rm", "-f", container], stdout=subprocess.DEVNULL)
+
+    out = args.out or os.path.join(HERE, "results", datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"saved {out}")
+    if args.compare:
+        return compare(args.compare, out, args.threshold)
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    """같은 크기/시나리오의 rps(또는 rows_per_sec) 와 p99 비교. threshold 이상 나빠지면 표시하고 종료 코드 1."""
+    with open(base_path) as f:
+        base = json.load(f)["sizes"]
+    with open(new_path) as f:
+        new = json.load(f)["sizes"]
+    worse = 0
+    print(f"{'size':>10} {'scenario':<15} {'metric':<13} {'base':>10} {'new':>10} {'change':>8}")
+    for size, scen in new.items():
+        for name, res in scen.items():
+            old = base.get(size, {}).get(name)
+            if not isinstance(res, dict) or not isinstance(old, dict):
+                continue
+            for metric, higher_better in (("rps", True), ("rows_per_sec", True), ("p99_ms", False)):
+                a, b = old.get(metric), res.get(metric)
+                if not a or b is None:
+                    continue
+                change = (b - a) / a
+                bad = change < -threshold if higher_better else change > threshold
+                worse += bad
+                print(f"{size:>10} {name:<15} {metric:<13} {a:>10} {b:>10} {change:>+7.1%}{'  <- regression' if bad else ''}")
+    return 1 if worse else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run", help="데이터 채우기 + 서버 기동 + 시나리오 측정")
+    p.add_argument("--sizes", default="1000000,10000000", help="쉼표로 구분한 router_info 행 수")
+    p.add_argument("--devices", type=int, default=200)
+    p.add_argument("--rate", type=float, default=500, help="ingest 목표 req/s")
+    p.add_argument("--duration", type=float, default=20, help="시나리오당 측정 시간(초)")
+    p.add_argument("--conns", type=int, default=16, help="조회 동시 연결 수")
+    p.add_argument("--workers", type=int, default=1, help="서버 워커 수")
+    p.add_argument("--port", type=int, default=35490)
+    p.add_argument("--scenarios", help="일부만 실행 (쉼표 구분)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--seed-jobs", type=int, default=4, help="데이터 채우기 동시 연결 수")
+    p.add_argument("--rollup-wait", type=float, default=1800, help="롤업 따라잡기 최대 대기(초)")
+    p.add_argument("--db-host", default=os.environ.get("DB_HOST", "127.0.0.1"))
+    p.add_argument("--db-port", type=int, default=int(os.environ.get("DB_PORT", "3306")))
+    p.add_argument("--db-user", default=os.environ.get("DB_USER", "root"))
+    p.add_argument("--db-pass", default=os.environ.get("DB_PASS", ""))
+    p.add_argument("--db-name", default="ROUTER_INFO_BENCH")
+    p.add_argument("--docker", action="store_true", help="MySQL 컨테이너를 띄워서 사용 (--db-port 로 노출)")
+    p.add_argument("--image", default="mysql:8.4")
+    p.add_argument("--keep", action="store_true", help="--docker 컨테이너를 남겨 둔다 (데이터 재사용)")
+    p.add_argument("--out", help="결과 JSON 경로 (기본 bench/results/YYYYmmdd-HHMMSS.json)")
+    p.add_argument("--compare", help="끝난 뒤 이 결과 JSON 과 비교")
+    p.add_argument("--threshold", type=float, default=0.1)
+
+    p = sub.add_parser("compare", help="결과 JSON 두 개 비교")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.1, help="이 비율 이상 나빠지면 회귀 (기본 10%%)")
+
+    args = parser.parse_args()
+    if args.cmd == "compare":
+        sys.exit(compare(args.base, args.new, args.threshold))
+    sys.exit(cmd_run(args) or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,73 @@
 import os
+import re
 import json
+import time
+import base64
+import asyncio
+import argparse
+import multiprocessing
+import queue
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import csv
 import io
+import gzip
+import zlib
+import bisect
+import hashlib
+import functools
+import contextlib
+from collections import OrderedDict, Counter, deque
+from decimal import Decimal, ROUND_HALF_UP
 
 from sanic import Sanic, response
 from sanic.request import Request
 from sanic.exceptions import InvalidUsage
+from sanic.log import logger
 
 try:
-    import aiofiles
     import aiomysql
+    import numpy as np
 except ImportError:
-    raise SystemExit("`pip install aiofiles aiomysql` 를 먼저 실행하세요.")
+    raise SystemExit("`pip install aiomysql numpy` 를 먼저 실행하세요.")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:   # Windows 개발 환경: 단일 워커만 지원
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# 수집 경로 JSON: orjson 이 있으면 사용 (loads 는 bytes 를 그대로 받고 UTF-8 검증까지 한다)
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+else:
+    json_loads = json.loads
+
+    def json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
 
 APP_NAME = "RawBodyDailyLogger"
 LOG_DIR = os.environ.get("LOG_DIR", "/home/rcn01/router_info")
@@ -25,6 +79,100 @@ DB_USER = os.environ.get("DB_USER", "rcn")
 DB_PASS = os.environ.get("DB_PASS", "")
 DB_NAME = os.environ.get("DB_NAME", "ROUTER_INFO")
 
+# 수집 배치: 스풀에 쌓인 행을 INGEST_BATCH_SIZE 개 또는 INGEST_FLUSH_SEC 초마다 한 번에 INSERT
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_SEC = float(os.environ.get("INGEST_FLUSH_SEC", "1.0"))
+
+# 수집 스풀: 요청은 SPOOL_DIR 세그먼트 파일에 쓰고 바로 응답, DB 적재는 소비자가 재시도하며 진행
+SPOOL_DIR = os.environ.get("SPOOL_DIR", os.path.join(LOG_DIR, "spool"))
+SPOOL_SEGMENT_BYTES = int(os.environ.get("SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+SPOOL_MAX_BYTES = int(os.environ.get("SPOOL_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+SPOOL_FLUSH_SEC = float(os.environ.get("SPOOL_FLUSH_SEC", "0.2"))
+SPOOL_FSYNC_SEC = float(os.environ.get("SPOOL_FSYNC_SEC", "1"))
+SPOOL_RETRY_MAX_SEC = float(os.environ.get("SPOOL_RETRY_MAX_SEC", "30"))
+SPOOL_DRAIN_SEC = float(os.environ.get("SPOOL_DRAIN_SEC", "10"))
+
+# 원본 로그: LOG_FLUSH_SEC 마다 모아서 write, LOG_FSYNC_SEC 마다 fsync, LOG_COMPRESS = "" | gzip | zstd
+LOG_FLUSH_SEC = float(os.environ.get("LOG_FLUSH_SEC", "0.5"))
+LOG_FSYNC_SEC = float(os.environ.get("LOG_FSYNC_SEC", "5"))
+LOG_BUFFER_MAX = int(os.environ.get("LOG_BUFFER_MAX", str(1024 * 1024)))
+LOG_COMPRESS = os.environ.get("LOG_COMPRESS", "").lower()
+
+# 롤업: ROLLUP_INTERVAL_SEC 마다 끝난 지 ROLLUP_DELAY_SEC 이상 지난 시간 구간을 집계
+ROLLUP_INTERVAL_SEC = float(os.environ.get("ROLLUP_INTERVAL_SEC", "60"))
+ROLLUP_DELAY_SEC = int(os.environ.get("ROLLUP_DELAY_SEC", "120"))
+ROLLUP_CHUNK_HOURS = int(os.environ.get("ROLLUP_CHUNK_HOURS", "24"))
+
+# devices.last_seen_ts / last_*: 이미 활성인 기기는 마지막 기록 후 LAST_SEEN_WRITE_SEC(초) 이상 지난 보고만 기록 (0 이면 매번).
+# 보고 주기(5분)보다 길어야 upsert 가 줄어든다. 그 대신 last_seen_ts 는 이만큼 늦을 수 있다
+LAST_SEEN_WRITE_SEC = int(os.environ.get("LAST_SEEN_WRITE_SEC", "900"))
+
+# 장애 구간: 같은 기기의 연속 두 샘플 간격이 OUTAGE_GAP_SEC 이상이면 장애 (기본 = 5분 보고 1회 이상 누락)
+OUTAGE_GAP_SEC = int(os.environ.get("OUTAGE_GAP_SEC", "600"))
+
+# records 전체 건수 캐시: 끝난(과거) 구간은 길게, 오늘이 포함된 구간은 짧게
+COUNT_CACHE_TTL_CLOSED = float(os.environ.get("COUNT_CACHE_TTL_CLOSED", "3600"))
+COUNT_CACHE_TTL_OPEN = float(os.environ.get("COUNT_CACHE_TTL_OPEN", "60"))
+COUNT_CACHE_MAX = int(os.environ.get("COUNT_CACHE_MAX", "5000"))
+
+# router_info 월별 파티션 (partition-init 으로 전환한 경우에만 동작)
+# PARTITION_AHEAD_MONTHS 달 앞까지 미리 만들고, RETENTION_MONTHS(0=무기한) 보다 오래된 달은 drop | archive
+PARTITION_AHEAD_MONTHS = int(os.environ.get("PARTITION_AHEAD_MONTHS", "3"))
+PARTITION_CHECK_SEC = float(os.environ.get("PARTITION_CHECK_SEC", "3600"))
+RETENTION_MONTHS = int(os.environ.get("RETENTION_MONTHS", "0"))
+RETENTION_MODE = os.environ.get("RETENTION_MODE", "drop").lower()
+
+# 콜드 데이터: ARCHIVE_MONTHS(0=끔) 보다 오래된 달을 기기별 Parquet(zstd)로 내보내고 router_info 에서 제거
+ARCHIVE_MONTHS = int(os.environ.get("ARCHIVE_MONTHS", "0"))
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", os.path.join(LOG_DIR, "archive"))
+ARCHIVE_CHECK_SEC = float(os.environ.get("ARCHIVE_CHECK_SEC", "3600"))
+
+# 대시보드 조회 응답 캐시 (msisdns / daily_avg / hourly_avg / raw): 크기(바이트) 제한 LRU + TTL
+RESP_CACHE_TTL_CLOSED = float(os.environ.get("RESP_CACHE_TTL_CLOSED", "86400"))
+RESP_CACHE_TTL_OPEN = float(os.environ.get("RESP_CACHE_TTL_OPEN", "15"))
+RESP_CACHE_MAX_BYTES = int(os.environ.get("RESP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# /api/metrics/batch 1회 요청당 최대 기기 수
+METRICS_BATCH_MAX = int(os.environ.get("METRICS_BATCH_MAX", "200"))
+
+# 느린 쿼리 기록: SLOW_QUERY_MS(0=끔) 이상 걸린 SQL 을 파라미터와 함께 SLOW_QUERY_WINDOW_SEC 동안 보관,
+# SELECT 는 쿼리 종류별로 SLOW_QUERY_EXPLAIN_SEC 에 한 번 EXPLAIN. /api/debug/slow-queries 로 조회
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_WINDOW_SEC = float(os.environ.get("SLOW_QUERY_WINDOW_SEC", "3600"))
+SLOW_QUERY_MAX_EVENTS = int(os.environ.get("SLOW_QUERY_MAX_EVENTS", "5000"))
+SLOW_QUERY_EXPLAIN_SEC = float(os.environ.get("SLOW_QUERY_EXPLAIN_SEC", "600"))
+SLOW_QUERY_TOP = int(os.environ.get("SLOW_QUERY_TOP", "20"))
+
+# 실시간 스트림 (/api/stream, SSE): 클라이언트별 대기 이벤트 상한, 동시 접속/구독 기기 수 상한, keep-alive 주기
+STREAM_QUEUE_MAX = int(os.environ.get("STREAM_QUEUE_MAX", "256"))
+STREAM_MAX_CLIENTS = int(os.environ.get("STREAM_MAX_CLIENTS", "200"))
+STREAM_MAX_MSISDNS = int(os.environ.get("STREAM_MAX_MSISDNS", "50"))
+STREAM_PING_SEC = float(os.environ.get("STREAM_PING_SEC", "15"))
+
+# 다중 워커: WORKERS 개 프로세스로 서비스 (serve --workers 가 우선, 워커는 shared_ctx.workers 로 받는다).
+# 롤업/파티션/아카이브는 슬롯 0 워커만 실행, 나머지 워커는 WORKER_SYNC_SEC 마다 워터마크/아카이브 경계와 캐시 무효화 신호를 맞춘다
+WORKERS = int(os.environ.get("WORKERS", "1"))
+WORKER_SYNC_SEC = float(os.environ.get("WORKER_SYNC_SEC", "1"))
+
+# DB 풀: 워커별 maxsize 는 DB_POOL_MAX, 0 이면 전체 상한 DB_POOL_TOTAL 을 워커 수로 나눈 값 (최소 2)
+DB_POOL_TOTAL = int(os.environ.get("DB_POOL_TOTAL", "10"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "0"))
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_TIMEOUT_SEC = float(os.environ.get("DB_POOL_TIMEOUT_SEC", "0"))   # 쓰기 풀 대기 상한, 0 이면 무제한
+
+# 조회 풀: 대시보드/CSV 조회는 수집·롤업과 다른 풀을 써서 쓰기 커넥션을 뺏지 않는다.
+# READ_DB_HOST 를 지정하면 읽기 복제본으로 보낸다 (비어 있으면 주 DB 에 별도 풀)
+READ_DB_HOST = os.environ.get("READ_DB_HOST", "")
+READ_DB_PORT = int(os.environ.get("READ_DB_PORT", str(DB_PORT)))
+READ_DB_USER = os.environ.get("READ_DB_USER", DB_USER)
+READ_DB_PASS = os.environ.get("READ_DB_PASS", DB_PASS)
+READ_DB_NAME = os.environ.get("READ_DB_NAME", DB_NAME)
+READ_POOL_TOTAL = int(os.environ.get("READ_POOL_TOTAL", "10"))
+READ_POOL_MAX = int(os.environ.get("READ_POOL_MAX", "0"))
+READ_POOL_TIMEOUT_SEC = float(os.environ.get("READ_POOL_TIMEOUT_SEC", "5"))   # 초과 시 503
+READ_SYNC_SEC = float(os.environ.get("READ_SYNC_SEC", "2"))   # 복제본 롤업 워터마크 확인 주기
+CSV_EXPORT_MAX = int(os.environ.get("CSV_EXPORT_MAX", "2"))   # 워커당 동시 CSV 내보내기 수, 초과 시 503
+
 app = Sanic(APP_NAME)
 
 
@@ -34,33 +182,793 @@ async def log_error(tag: str, exc: Exception):
     """에러를 날짜별 로그 파일에 append."""
     ts = datetime.now(tz=KST)
     msg = f"[{ts.strftime('%Y-%m-%d %H:%M:%S')}] {tag}: {repr(exc)}\n"
+    METRICS.errors[tag] += 1
     try:
-        path = os.path.join(app.ctx.log_dir, f"{ts.strftime('%Y%m%d')}.log")
-        async with aiofiles.open(path, "ab") as f:
-            await f.write(msg.encode())
+        app.ctx.log_writer.write(ts, msg.encode())
     except Exception:
         pass
 
 
-def build_avg_sql(time_expr: str, time_alias: str, has_range: bool):
-    """daily_avg / hourly_avg 공통 SQL 생성."""
-    if has_range:
-        where = "WHERE `msisdn` = %s AND `ts_kst` >= %s AND `ts_kst` < DATE_ADD(%s, INTERVAL 1 DAY)"
+# (원본 컬럼, 응답 키) — 롤업 테이블 컬럼은 원본 컬럼명 기준
+SIGNAL_METRICS = (("rsrp", "rsrp"), ("rsrq", "rsrq"), ("sinr", "sinr"), ("rssi", "router_rssi"))
+
+# 숫자 컬럼 `{col}_num` 의 타입과 허용 범위. 범위 밖이거나 숫자가 아니면 NULL
+SIGNAL_NUM_COLS = {
+    "rsrp": ("SMALLINT", -160, -30),
+    "rsrq": ("FLOAT", -45, 20),
+    "sinr": ("FLOAT", -30, 50),
+    "rssi": ("SMALLINT", -130, 0),
+}
+
+
+# 신호 값 문법: 앞뒤 공백을 뗀 부호 있는 10진수 ("1e2", ".5", "5." 은 숫자로 보지 않음).
+# 수집(parse_signal)과 backfill-signals(backfill_signals_sql 의 REGEXP)가 같은 패턴을 쓴다
+SIGNAL_NUM_PATTERN = r"^[-+]?[0-9]+([.][0-9]+)?$"
+SIGNAL_NUM_RE = re.compile(SIGNAL_NUM_PATTERN)
+SIGNAL_NUM_STEP = Decimal("0.001")   # backfill 의 DECIMAL(10,3) 과 같은 정밀도
+
+
+def signal_expr(col: str) -> str:
+    """신호 컬럼을 숫자로 읽는 SQL 식 (수집 시 채운 `{col}_num`)."""
+    return f"`{col}_num`"
+
+
+def parse_signal(col: str, v):
+    """수집 값 하나를 SIGNAL_NUM_COLS 기준으로 검증해 숫자로 변환. 실패 시 None.
+
+    backfill_signals_sql 과 같은 결과가 나오도록 SIGNAL_NUM_PATTERN 으로 검사하고, 소수 셋째 자리로
+    반올림한 값으로 범위를 본다. SMALLINT 컬럼은 다시 정수로 반올림 (MySQL 과 같게 .5 는 0에서 먼 쪽).
+    JSON 숫자는 문자열 컬럼에 저장되는 형태(str)로 바꿔서 같은 규칙을 적용한다.
+    """
+    if isinstance(v, bool) or not isinstance(v, (str, int, float)):
+        return None
+    s = v.strip(" ") if isinstance(v, str) else str(v)
+    if not SIGNAL_NUM_RE.match(s):
+        return None
+    d = Decimal(s).quantize(SIGNAL_NUM_STEP, ROUND_HALF_UP)
+    col_type, lo, hi = SIGNAL_NUM_COLS[col]
+    if d < lo or d > hi:
+        return None
+    if col_type == "SMALLINT":
+        return int(d.quantize(Decimal(1), ROUND_HALF_UP))
+    return float(d)
+
+
+def floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(dt: datetime) -> datetime:
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def now_kst_naive() -> datetime:
+    """DB의 ts_kst 와 같은 naive KST 현재 시각."""
+    return datetime.now(tz=KST).replace(tzinfo=None)
+
+
+def resolve_range(days: int, start, end):
+    """start~end(포함) 또는 최근 days 일을 [lo, hi) naive KST datetime 으로 변환."""
+    if start and end:
+        try:
+            lo = datetime.fromisoformat(start)
+            hi = datetime.fromisoformat(end) + timedelta(days=1)
+        except ValueError:
+            raise InvalidUsage("start, end must be YYYY-MM-DD")
+        return lo, hi
+    today = floor_day(now_kst_naive())
+    return today - timedelta(days=days), today + timedelta(days=1)
+
+
+def raw_range(days: int, start, end):
+    """원시 시계열 조회 구간 [lo, hi) 와 현재 시각. start~end 가 없으면 지금부터 days 일 전까지."""
+    now = now_kst_naive()
+    if start and end:
+        lo, hi = resolve_range(days, start, end)
+    else:
+        lo, hi = now - timedelta(days=days), now
+    return lo, hi, now
+
+
+def build_avg_sql(bucket: str, batch: int = 0):
+    """daily_avg / hourly_avg 공통 SQL 생성.
+
+    롤업 워터마크 이전은 router_info_daily / router_info_hourly 에서, 이후(진행 중인 구간)만
+    router_info 원본에서 sum/count 를 구해 합친다. 파라미터는 build_avg_params 참고.
+    batch > 0 이면 `msisdn IN (batch 개)` 로 여러 기기를 한 번에 읽고 msisdn 별로 묶는다.
+    """
+    if batch:
+        m_where = "`msisdn` IN (" + ", ".join(["%s"] * batch) + ")"
+        m_col = "`msisdn`, "
+    else:
+        m_where = "`msisdn` = %s"
+        m_col = ""
+    sums = ", ".join(f"`{c}_sum`, `{c}_cnt`" for c, _ in SIGNAL_METRICS)
+    raw_sums = ", ".join(
+        f"SUM({signal_expr(c)}) AS `{c}_sum`, COUNT({signal_expr(c)}) AS `{c}_cnt`"
+        for c, _ in SIGNAL_METRICS
+    )
+    avgs = ",\n      ".join(
+        f"SUM(`{c}_sum`) / NULLIF(SUM(`{c}_cnt`), 0) AS {key}_avg" for c, key in SIGNAL_METRICS
+    )
+
+    if bucket == "d":
+        parts = f"""
+      SELECT {m_col}`d` AS b, {sums} FROM `router_info_daily`
+      WHERE {m_where} AND `d` >= %s AND `d` < %s
+      UNION ALL
+      SELECT {m_col}DATE(`h`) AS b, {sums} FROM `router_info_hourly`
+      WHERE {m_where} AND `h` >= %s AND `h` < %s
+      UNION ALL
+      SELECT {m_col}DATE(`ts_kst`) AS b, {raw_sums} FROM `router_info`
+      WHERE {m_where} AND `ts_kst` >= %s AND `ts_kst` < %s
+      GROUP BY {m_col}b"""
     else:
-        where = "WHERE `msisdn` = %s AND `ts_kst` >= (CURRENT_DATE - INTERVAL %s DAY)"
+        parts = f"""
+      SELECT {m_col}DATE_FORMAT(`h`, '%%Y-%%m-%%d %%H:00:00') AS b, {sums} FROM `router_info_hourly`
+      WHERE {m_where} AND `h` >= %s AND `h` < %s
+      UNION ALL
+      SELECT {m_col}DATE_FORMAT(`ts_kst`, '%%Y-%%m-%%d %%H:00:00') AS b, {raw_sums} FROM `router_info`
+      WHERE {m_where} AND `ts_kst` >= %s AND `ts_kst` < %s
+      GROUP BY {m_col}b"""
 
     return f"""
     SELECT
-      {time_expr} AS {time_alias},
-      AVG(CAST(NULLIF(`rsrp`,'')  AS DECIMAL(10,3))) AS rsrp_avg,
-      AVG(CAST(NULLIF(`rsrq`,'')  AS DECIMAL(10,3))) AS rsrq_avg,
-      AVG(CAST(NULLIF(`sinr`,'')  AS DECIMAL(10,3))) AS sinr_avg,
-      AVG(CAST(NULLIF(`rssi`,'')  AS DECIMAL(10,3))) AS router_rssi_avg
-    FROM `router_info`
-    {where}
-    GROUP BY {time_alias}
-    ORDER BY {time_alias} ASC
+      {m_col}b AS {bucket},
+      {avgs}
+    FROM ({parts}
+    ) u
+    GROUP BY {m_col}b
+    ORDER BY {m_col}b ASC
+    """
+
+
+def build_avg_params(bucket: str, msisdn, lo: datetime, hi: datetime, wm):
+    """build_avg_sql 파라미터. wm(롤업 워터마크) 기준으로 롤업/원본 구간을 나눈다.
+
+    msisdn 에 리스트를 주면 build_avg_sql(bucket, batch=len(msisdn)) 용 파라미터가 된다.
+    """
+    ms = tuple(msisdn) if isinstance(msisdn, (list, tuple)) else (msisdn,)
+    wm = min(max(wm or lo, lo), hi)
+    if bucket == "d":
+        wm_day = max(floor_day(wm), lo)
+        return (
+            *ms, lo.date(), wm_day.date(),
+            *ms, wm_day, wm,
+            *ms, wm, hi,
+        )
+    return (
+        *ms, lo, wm,
+        *ms, wm, hi,
+    )
+
+
+def range_is_closed(hi: datetime) -> bool:
+    """[lo, hi) 구간이 이미 끝나서 더 이상 데이터가 들어오지 않는지."""
+    return hi <= floor_day(now_kst_naive())
+
+
+def encode_cursor(ts: str, row_id: int, direction: str) -> str:
+    """records 페이지 커서: (ts_kst, id) 키와 방향(next | prev)을 담은 불투명 토큰."""
+    raw = json.dumps([ts, row_id, direction], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        ts, row_id, direction = json.loads(raw)
+        datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return ts, int(row_id), direction
+    except Exception:
+        raise InvalidUsage("invalid cursor")
+
+
+class TTLCache:
+    """크기 제한(LRU) + 항목별 TTL 메모리 캐시.
+
+    size 를 주지 않으면 항목 수 기준, 주면 그 합(예: 바이트) 기준으로 max_size 를 지킨다.
+    tag 로 묶은 항목은 drop_tag() 로 한 번에 무효화한다.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._data = OrderedDict()   # key -> (expires, value, size, tag)
+        self._tags = {}              # tag -> {key}
+        self._gens = {}              # tag -> 무효화 횟수
+        self._clears = 0             # clear() 횟수 (모든 tag 세대에 더해진다)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                self._remove(key)
+            self.stats["misses"] += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return item[1]
+
+    def set(self, key, value, ttl: float, size: int = 1, tag=None):
+        if key in self._data:
+            self._remove(key)
+        if size > self.max_size:
+            return
+        self._data[key] = (time.monotonic() + ttl, value, size, tag)
+        self.size += size
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+        while self.size > self.max_size:
+            self._remove(next(iter(self._data)))
+            self.stats["evictions"] += 1
+
+    def _remove(self, key):
+        _, _, size, tag = self._data.pop(key)
+        self.size -= size
+        if tag is not None:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def generation(self, tag) -> int:
+        """tag 무효화 세대 (clear() 포함). 조회 전후 값이 다르면 그 사이 무효화된 것."""
+        return self._clears + self._gens.get(tag, 0)
+
+    def drop_tag(self, tag):
+        self._gens[tag] = self._gens.get(tag, 0) + 1
+        for key in list(self._tags.get(tag, ())):
+            self._remove(key)
+            self.stats["invalidations"] += 1
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, items=len(self._data), size=self.size)
+
+    def clear(self):
+        self._clears += 1
+        self._data.clear()
+        self._tags.clear()
+        self.size = 0
+
+
+# 응답 캐시 태그: (msisdn, 끝난 구간 여부). 기기 목록은 DEVICES_TAG,
+# 여러 기기 batch 조회와 msisdns 없는 전체 기기 조회(outages)는 (FLEET_TAG, 끝난 구간 여부)
+DEVICES_TAG = ("*", False)
+FLEET_TAG = "**"
+
+
+def request_range_closed(req: Request) -> bool:
+    """start~end 로 지정된 구간이 이미 끝났는지 (days 만 주면 항상 열린 구간)."""
+    start, end = req.args.get("start"), req.args.get("end")
+    if not (start and end):
+        return False
+    try:
+        hi = datetime.fromisoformat(end) + timedelta(days=1)
+    except ValueError:
+        return False
+    return range_is_closed(hi)
+
+
+def etag_matches(req: Request, etag: str) -> bool:
+    inm = req.headers.get("if-none-match")
+    if not inm:
+        return False
+    return any(t.strip().removeprefix("W/") in (etag, "*") for t in inm.split(","))
+
+
+def cached_response(handler):
+    """GET 조회 응답 캐시 + ETag/304.
+
+    키는 라우트 + 정렬된 쿼리 파라미터 + msgpack 여부(Accept). 끝난 과거 구간은 RESP_CACHE_TTL_CLOSED,
+    오늘이 포함된 구간은 RESP_CACHE_TTL_OPEN 동안 유지하고 invalidate_responses() 로 무효화한다.
+    """
+    @functools.wraps(handler)
+    async def wrapper(req: Request, *args, **kwargs):
+        cache = app.ctx.resp_cache
+        key = (
+            handler.__name__,
+            tuple(sorted((k, tuple(v)) for k, v in req.args.items())),
+            wants_msgpack(req),
+        )
+        hit = cache.get(key)
+        if hit is None:
+            msisdn = req.args.get("msisdn")
+            closed = request_range_closed(req)
+            if msisdn:
+                tag = (msisdn, closed)
+            elif handler.__name__ == "list_msisdns":
+                tag = DEVICES_TAG
+            else:
+                # 어느 기기의 수집/늦은 행에도 무효화되도록 (DEVICES_TAG 는 기기 정보 변경 때만 지워진다)
+                tag = (FLEET_TAG, closed)
+            gen = cache.generation(tag)
+
+            resp = await handler(req, *args, **kwargs)
+            if resp.status != 200:
+                return resp
+
+            body = resp.body or b""
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            hit = (body, resp.content_type, etag)
+            # 조회 도중 무효화됐으면 이미 낡았을 수 있으므로 저장하지 않는다
+            if cache.generation(tag) == gen:
+                ttl = RESP_CACHE_TTL_CLOSED if closed else RESP_CACHE_TTL_OPEN
+                cache.set(key, hit, ttl, size=len(body) + 256, tag=tag)
+
+        body, content_type, etag = hit
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+        if etag_matches(req, etag):
+            return response.empty(status=304, headers=headers)
+        return response.raw(body, content_type=content_type, headers=headers)
+
+    return wrapper
+
+
+def invalidate_responses(msisdn=None, closed: bool = False, devices: bool = False):
+    """msisdn 의 열린 구간(closed=True 면 과거 구간까지) 응답과, devices=True 면 기기 목록과 전체 기기 응답 제거."""
+    cache = app.ctx.resp_cache
+    if msisdn:
+        for m in (str(msisdn), FLEET_TAG):
+            cache.drop_tag((m, False))
+            if closed:
+                cache.drop_tag((m, True))
+    if devices:
+        cache.drop_tag(DEVICES_TAG)
+        # 전체 기기 응답에는 기기 목록(별칭, 휴면)이 들어 있다
+        cache.drop_tag((FLEET_TAG, False))
+        cache.drop_tag((FLEET_TAG, True))
+
+
+# ====== 메트릭 (/metrics) ======
+# Prometheus 텍스트 형식. 라우트 지연은 미들웨어, SQL 은 Timed*Cursor, 풀 대기는 TimedPool,
+# 파이썬 처리 단계(gap_fill / 인코딩 등)는 timed_stage 로 수집한다.
+
+METRIC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def metric_labels(names, values, extra: str = "") -> str:
+    parts = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{n}="{v}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """고정 버킷 히스토그램. series[라벨 값 튜플] = [버킷별 개수..., 합계, 개수]."""
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=METRIC_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value: float, *label_values):
+        s = self.series.get(label_values)
+        if s is None:
+            s = self.series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            s[i] += 1
+        s[-2] += value
+        s[-1] += 1
+
+    def render(self, out: list):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        for lv, s in self.series.items():
+            acc = 0
+            for le, n in zip(self.buckets, s):
+                acc += n
+                le_label = f'le="{le}"'
+                out.append(f"{self.name}_bucket{metric_labels(self.labels, lv, le_label)} {acc}")
+            inf_label = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{metric_labels(self.labels, lv, inf_label)} {s[-1]}")
+            out.append(f"{self.name}_sum{metric_labels(self.labels, lv)} {s[-2]:.6f}")
+            out.append(f"{self.name}_count{metric_labels(self.labels, lv)} {s[-1]}")
+
+
+def render_samples(out: list, name: str, kind: str, help_text: str, samples, labels=()):
+    """samples: [(라벨 값 튜플, 값)]"""
+    out.append(f"# HELP {name} {help_text}")
+    out.append(f"# TYPE {name} {kind}")
+    for lv, v in samples:
+        out.append(f"{name}{metric_labels(labels, lv)} {v}")
+
+
+def render_stats(out: list, prefix: str, stats: dict, gauges=()):
+    """snapshot() dict 의 숫자 값을 메트릭으로. gauges 에 없는 키는 누적 카운터(_total)."""
+    for k, v in stats.items():
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            continue
+        if k in gauges:
+            render_samples(out, f"{prefix}_{k}", "gauge", k, [((), v)])
+        else:
+            render_samples(out, f"{prefix}_{k}_total", "counter", k, [((), v)])
+
+
+SQL_WS_RE = re.compile(r"\s+")
+SQL_NUM_RE = re.compile(r"\d+")
+SQL_PH_GROUP_RE = re.compile(r"\(\s*(?:(?:%s|N|NULL)\s*,\s*)*(?:%s|N|NULL)\s*\)")
+SQL_PH_LIST_RE = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+SQL_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|JOIN)\s+`?(\w+)`?", re.I)
+SQL_LABEL_CACHE_LEN = 4096
+
+
+def sql_fingerprint(sql: str) -> tuple:
+    """SQL -> (라벨, 정규화된 SQL). 숫자는 N, 플레이스홀더 묶음/IN 목록/다중 VALUES 는 (?) 하나로."""
+    s = SQL_WS_RE.sub(" ", sql).strip()
+    s = SQL_NUM_RE.sub("N", s)
+    s = SQL_PH_GROUP_RE.sub("(?)", s)
+    s = SQL_PH_LIST_RE.sub("(?)", s).replace("%s", "?")
+    verb = s.split(" ", 1)[0].lower() or "?"
+    m = SQL_TABLE_RE.search(s)
+    digest = hashlib.blake2b(s.encode(), digest_size=4).hexdigest()
+    return f"{verb}:{m.group(1) if m else '-'}:{digest}", s
+
+
+cached_sql_fingerprint = functools.lru_cache(maxsize=1024)(sql_fingerprint)
+
+
+class Metrics:
+    def __init__(self):
+        self.http = Histogram(
+            "router_info_http_request_duration_seconds", "HTTP 요청 처리 시간", ("route", "method", "status"),
+        )
+        self.stage = Histogram("router_info_stage_duration_seconds", "파이썬 처리 단계별 시간", ("stage",))
+        self.query = Histogram("router_info_db_query_duration_seconds", "SQL 별 실행 시간", ("query",))
+        self.pool_wait = Histogram("router_info_db_pool_wait_seconds", "DB 풀 커넥션 대기 시간", ("pool",))
+        self.query_rows = Counter()    # 라벨 -> 반환(SELECT)/변경 행 수 합계
+        self.query_errors = Counter()  # 라벨 -> 실패 횟수
+        self.query_sql = {}            # 라벨 -> 정규화된 SQL (앞부분)
+        self.errors = Counter()        # log_error 태그 -> 횟수
+        self.pools = {}                # 이름 -> TimedPool
+
+    def observe_query(self, sql, sec: float, rows, failed: bool) -> tuple:
+        """(라벨, 정규화된 SQL) 반환."""
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8", "replace")
+        if len(sql) <= SQL_LABEL_CACHE_LEN:
+            label, norm = cached_sql_fingerprint(sql)
+        else:
+            label, norm = sql_fingerprint(sql)   # 다중 VALUES INSERT 등 긴 SQL 은 캐시에 두지 않는다
+        if label not in self.query_sql:
+            self.query_sql[label] = norm[:300]
+        self.query.observe(sec, label)
+        if failed:
+            self.query_errors[label] += 1
+        elif rows is not None and 0 <= rows < 2 ** 63:   # 스트리밍 커서는 행 수를 미리 알 수 없음
+            self.query_rows[label] += rows
+        return label, norm
+
+    def render(self) -> str:
+        out = []
+        for h in (self.http, self.stage, self.query, self.pool_wait):
+            h.render(out)
+        render_samples(out, "router_info_db_query_rows_total", "counter", "SQL 별 반환/변경 행 수",
+                       [((k,), v) for k, v in self.query_rows.items()], ("query",))
+        render_samples(out, "router_info_db_query_errors_total", "counter", "SQL 별 실패 횟수",
+                       [((k,), v) for k, v in self.query_errors.items()], ("query",))
+        render_samples(out, "router_info_db_query_info", "gauge", "쿼리 라벨 -> 정규화된 SQL",
+                       [((k, v), 1) for k, v in self.query_sql.items()], ("query", "sql"))
+        render_samples(out, "router_info_errors_total", "counter", "log_error 태그별 횟수",
+                       [((k,), v) for k, v in self.errors.items()], ("tag",))
+
+        pools = list(self.pools.items())
+        for name, key in (("size", "size"), ("in_use", None), ("free", "freesize"),
+                          ("max", "maxsize"), ("waiting", "waiting")):
+            render_samples(
+                out, f"router_info_db_pool_{name}", "gauge", f"DB 풀 커넥션 {name}",
+                [((n,), p.size - p.freesize if key is None else getattr(p, key)) for n, p in pools], ("pool",),
+            )
+        render_samples(out, "router_info_db_pool_timeouts_total", "counter", "DB 풀 대기 시간 초과(503) 횟수",
+                       [((n,), p.timeouts) for n, p in pools], ("pool",))
+
+        ctx = app.ctx
+        if hasattr(ctx, "ingest_stats"):
+            render_stats(out, "router_info_ingest", ctx.ingest_stats)
+        if hasattr(ctx, "spool"):
+            render_stats(out, "router_info_spool", ctx.spool.snapshot(),
+                         gauges=("backlog_bytes", "segments", "lag_sec"))
+        if hasattr(ctx, "resp_cache"):
+            render_stats(out, "router_info_resp_cache", ctx.resp_cache.snapshot(), gauges=("items", "size"))
+        if hasattr(ctx, "stream_hub"):
+            render_stats(out, "router_info_stream", ctx.stream_hub.snapshot(), gauges=("clients", "msisdns"))
+        return "\n".join(out) + "\n"
+
+
+METRICS = Metrics()
+
+
+def preview_params(args, max_items: int = 20, max_len: int = 64):
+    """SQL 파라미터 요약: 앞 max_items 개만, 각 값은 max_len 자까지."""
+    if args is None:
+        return None
+    items = list(args.values()) if isinstance(args, dict) else list(args) if isinstance(args, (list, tuple)) else [args]
+    out = []
+    for v in items[:max_items]:
+        v = v if isinstance(v, (int, float)) or v is None else str(v)
+        out.append(v[:max_len] if isinstance(v, str) else v)
+    if len(items) > max_items:
+        out.append(f"... +{len(items) - max_items}")
+    return out
+
+
+def plain_value(v):
+    return v if v is None or isinstance(v, (int, float, str)) else str(v)
+
+
+class SlowQueryLog:
+    """SLOW_QUERY_MS 이상 걸린 SQL 기록 (최근 SLOW_QUERY_WINDOW_SEC). report() 는 쿼리 종류별 상위 N."""
+
+    def __init__(self):
+        self.events = deque(maxlen=SLOW_QUERY_MAX_EVENTS)   # (시각, 라벨, 초, 행 수, 파라미터 요약)
+        self.sql = {}                 # 라벨 -> (정규화된 SQL, 원본 SQL 앞부분)
+        self.explains = OrderedDict()  # 라벨 -> {"at", "params", "plan"} (최근 500 종류)
+        self._explain_at = {}
+        self._explaining = False
+
+    def record(self, label: str, norm: str, sql: str, args, sec: float, rows):
+        now = time.time()
+        if rows is not None and not 0 <= rows < 2 ** 63:
+            rows = None
+        self.events.append((now, label, sec, rows, preview_params(args)))
+        self.sql.setdefault(label, (norm[:1000], sql[:1000]))
+        verb = label.split(":", 1)[0]
+        if verb in ("select", "with") and not self._explaining \
+                and now - self._explain_at.get(label, 0) >= SLOW_QUERY_EXPLAIN_SEC:
+            pool = getattr(app.ctx, "read_pool", None) or getattr(app.ctx, "pool", None)
+            if pool is not None:
+                self._explain_at[label] = now
+                self._explaining = True
+                asyncio.get_running_loop().create_task(self.explain(pool, label, sql, args))
+
+    async def explain(self, pool, label: str, sql: str, args):
+        """느린 SELECT 를 같은 파라미터로 EXPLAIN. 자기 자신이 기록되지 않도록 계측 없는 커서를 쓴다."""
+        try:
+            async with pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await cur.execute("EXPLAIN " + sql, args)
+                    plan = [{k: plain_value(v) for k, v in r.items()} for r in await cur.fetchall()]
+        except Exception as e:
+            plan = [{"error": repr(e)}]
+        finally:
+            self._explaining = False
+        self.explains[label] = {
+            "at": datetime.fromtimestamp(time.time(), tz=KST).strftime("%Y-%m-%d %H:%M:%S"),
+            "params": preview_params(args),
+            "plan": plan,
+        }
+        self.explains.move_to_end(label)
+        while len(self.explains) > 500:
+            self.explains.popitem(last=False)
+
+    def report(self, top: int, sort: str) -> dict:
+        cutoff = time.time() - SLOW_QUERY_WINDOW_SEC
+        while self.events and self.events[0][0] < cutoff:
+            self.events.popleft()
+
+        agg = {}
+        for at, label, sec, rows, params in self.events:
+            a = agg.get(label)
+            if a is None:
+                a = agg[label] = {"query": label, "count": 0, "total_sec": 0.0, "max_sec": 0.0}
+            a["count"] += 1
+            a["total_sec"] += sec
+            a["last_at"] = at
+            if sec >= a["max_sec"]:
+                a.update(max_sec=sec, slowest_params=params, slowest_rows=rows)
+
+        ranked = sorted(agg.values(), key=lambda a: a[sort], reverse=True)[:top]
+        for a in ranked:
+            a["avg_sec"] = a["total_sec"] / a["count"]
+            a["last_at"] = datetime.fromtimestamp(a["last_at"], tz=KST).strftime("%Y-%m-%d %H:%M:%S")
+            a["sql"], a["sql_text"] = self.sql.get(a["query"], (None, None))
+            a["explain"] = self.explains.get(a["query"])
+        return {
+            "threshold_ms": SLOW_QUERY_MS, "window_sec": SLOW_QUERY_WINDOW_SEC,
+            "events": len(self.events), "sort": sort, "queries": ranked,
+        }
+
+
+SLOW_QUERIES = SlowQueryLog()
+
+
+def timed_stage(stage: str):
+    """동기 함수 실행 시간을 router_info_stage_duration_seconds{stage=...} 에 기록하는 데코레이터."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.stage.observe(time.perf_counter() - t0, stage)
+        return wrapper
+    return deco
+
+
+class TimedCursorMixin:
+    """execute() 실행 시간과 행 수를 METRICS 에 기록."""
+
+    async def execute(self, query, args=None):
+        t0 = time.perf_counter()
+        failed = True
+        try:
+            result = await super().execute(query, args)
+            failed = False
+            return result
+        finally:
+            sec = time.perf_counter() - t0
+            rows = None if failed else self.rowcount
+            label, norm = METRICS.observe_query(query, sec, rows, failed)
+            if SLOW_QUERY_MS > 0 and sec * 1000 >= SLOW_QUERY_MS:
+                SLOW_QUERIES.record(label, norm, query, args, sec, rows)
+
+
+class TimedCursor(TimedCursorMixin, aiomysql.Cursor):
+    pass
+
+
+class TimedDictCursor(TimedCursorMixin, aiomysql.DictCursor):
+    pass
+
+
+class TimedSSCursor(TimedCursorMixin, aiomysql.SSCursor):
+    pass
+
+
+class PoolBusy(Exception):
+    """풀 커넥션을 timeout 안에 받지 못함 -> 503."""
+
+    def __init__(self, pool: str):
+        super().__init__(f"DB pool {pool!r} busy")
+        self.pool = pool
+
+
+class TimedPool:
+    """aiomysql 풀 래퍼. acquire() 대기 시간/대기 수를 기록하고 나머지는 원래 풀에 위임.
+
+    동시 사용은 maxsize 개로 세마포어로 제한하고, timeout 이 있으면 그 안에 자리가 안 나면 PoolBusy.
+    (aiomysql 의 acquire() 를 wait_for 로 취소하지 않도록 대기는 세마포어에서 한다)
+    """
+
+    def __init__(self, pool, name: str, timeout: float = 0.0):
+        self._pool = pool
+        self.name = name
+        self.timeout = timeout
+        self.waiting = 0
+        self.timeouts = 0
+        self._slots = asyncio.Semaphore(pool.maxsize)
+        METRICS.pools[name] = self
+
+    def __getattr__(self, attr):
+        return getattr(self._pool, attr)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        t0 = time.perf_counter()
+        self.waiting += 1
+        try:
+            if self.timeout > 0:
+                await asyncio.wait_for(self._slots.acquire(), self.timeout)
+            else:
+                await self._slots.acquire()
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolBusy(self.name) from None
+        finally:
+            self.waiting -= 1
+        try:
+            conn = await self._pool.acquire()
+        except BaseException:
+            self._slots.release()
+            raise
+        METRICS.pool_wait.observe(time.perf_counter() - t0, self.name)
+        try:
+            yield conn
+        finally:
+            try:
+                await self._pool.release(conn)
+            finally:
+                self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {"size": self.size, "free": self.freesize, "max": self.maxsize,
+                "waiting": self.waiting, "timeouts": self.timeouts}
+
+
+@app.middleware("request")
+async def metrics_request_start(request: Request):
+    request.ctx.t0 = time.perf_counter()
+
+
+@app.middleware("response")
+async def metrics_request_end(request: Request, resp):
+    t0 = getattr(request.ctx, "t0", None)
+    if t0 is None:
+        return
+    route = request.route.name.rsplit(".", 1)[-1] if request.route else "unmatched"
+    METRICS.http.observe(time.perf_counter() - t0, route, request.method, resp.status if resp else 0)
+
+
+# ====== 응답 인코딩 ======
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+RESPONSE_FORMATS = ("rows", "columnar")
+
+
+def wants_msgpack(req: Request) -> bool:
+    """Accept 에 msgpack 이 있고 서버에 msgpack 이 설치돼 있으면 바이너리로 응답."""
+    accept = req.headers.get("accept") or ""
+    return msgpack is not None and any(t in accept for t in MSGPACK_TYPES)
+
+
+def parse_format(req: Request) -> str:
+    fmt = (req.args.get("format") or "rows").lower()
+    if fmt not in RESPONSE_FORMATS:
+        raise InvalidUsage("format must be one of: " + ", ".join(RESPONSE_FORMATS))
+    return fmt
+
+
+@timed_stage("encode")
+def encode_response(req: Request, payload: dict):
+    if wants_msgpack(req):
+        return response.raw(msgpack.packb(payload, use_bin_type=True), content_type=MSGPACK_TYPES[0])
+    return response.json(payload)
+
+
+@timed_stage("columnar")
+def columnar_payload(ts, cols: dict, is_fake, binary: bool) -> dict:
+    """format=columnar 본문.
+
+    ts 는 KST 벽시계 기준 epoch 초 → t0 + dt(직전 포인트와의 차, dt[0]=0). cols 의 값은 float 배열(nan=없음),
+    is_fake 는 비트셋(LSB 우선, packbits little). JSON 이면 dt/값은 배열(null=없음), fake 는 base64.
+    msgpack(binary) 이면 dt 는 int32 LE, 값은 float32 LE(NaN=없음) bytes, fake 는 그대로 bytes.
     """
+    ts = np.asarray(ts, dtype=np.int64)
+    dt = np.diff(ts, prepend=ts[:1])
+    out = {"format": "columnar", "n": len(ts), "t0": int(ts[0]) if len(ts) else None}
+    fake = np.packbits(is_fake, bitorder="little").tobytes() if is_fake is not None else None
+
+    if binary:
+        out["dt"] = dt.astype("<i4").tobytes()
+        for k, v in cols.items():
+            out[k] = np.asarray(v, dtype="<f4").tobytes()
+        if fake is not None:
+            out["fake"] = fake
+        return out
+
+    out["dt"] = dt.tolist()
+    for k, v in cols.items():
+        v = np.asarray(v, dtype=np.float64)
+        obj = v.astype(object)
+        obj[np.isnan(v)] = None
+        out[k] = obj.tolist()
+    if fake is not None:
+        out["fake"] = base64.b64encode(fake).decode()
+    return out
+
+
+@timed_stage("columnar")
+def avg_columnar(rows, bucket: str, binary: bool) -> dict:
+    """daily_avg / hourly_avg 행 -> columnar_payload (버킷 시작 시각을 t0 + dt 로)."""
+    if bucket == "d":
+        ts = [wall_seconds(datetime(r["d"].year, r["d"].month, r["d"].day)) for r in rows]
+    else:
+        ts = [wall_seconds(datetime.strptime(r["h"], "%Y-%m-%d %H:%M:%S")) for r in rows]
+    cols = {
+        f"{key}_avg": np.array([r[f"{key}_avg"] for r in rows], dtype=np.float64)
+        for _, key in SIGNAL_METRICS
+    }
+    return columnar_payload(ts, cols, None, binary)
 
 
 def rows_decimal_to_float(rows):
@@ -73,156 +981,2079 @@ def rows_decimal_to_float(rows):
                 r[k] = float(v)
 
 
-# ====== lifecycle ======
+# ====== 원시 시계열 ======
 
-@app.exception(Exception)
-async def handle_ex(request, exc):
-    await log_error("UNHANDLED", exc)
-    return response.json({"error": "internal_error", "detail": repr(exc)}, status=500)
+FIVE_MIN = 300
+RAW_KEYS = ("rsrp", "rsrq", "sinr", "router_rssi")
+# 결측 구간을 채우는 가짜 포인트 값 (RAW_KEYS 순서)
+FAKE_VALUES = np.array([-125.0, -15.0, 5.0, -100.0])
+EPOCH = datetime(1970, 1, 1)
+# ts_kst 를 KST 벽시계 기준 epoch 초로 읽는 SQL 식 (세션 time_zone 과 무관)
+TS_SEC_EXPR = "TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', `ts_kst`)"
 
+_HM = [f" {h:02d}:{m:02d}:" for h in range(24) for m in range(60)]
+_SS = [f"{s:02d}" for s in range(60)]
 
-@app.listener("before_server_start")
-async def before_start(app, _):
-    os.makedirs(LOG_DIR, exist_ok=True)
-    app.ctx.log_dir = LOG_DIR
 
-    app.ctx.pool = await aiomysql.create_pool(
-        host=DB_HOST,
-        port=DB_PORT,
-        user=DB_USER,
-        password=DB_PASS,
-        db=DB_NAME,
-        autocommit=True,
-        minsize=1,
-        maxsize=10,
-        charset="utf8mb4",
-    )
+def wall_seconds(dt: datetime) -> int:
+    """naive KST 시각 -> KST 벽시계 기준 epoch 초 (TS_SEC_EXPR 과 같은 기준)."""
+    return int((dt - EPOCH).total_seconds())
 
 
-@app.listener("after_server_stop")
-async def after_stop(app, _):
-    pool = getattr(app.ctx, "pool", None)
-    if pool:
-        pool.close()
-        await pool.wait_closed()
+@timed_stage("rows_to_columns")
+def rows_to_columns(rows):
+    """(ts 초, rsrp, rsrq, sinr, router_rssi) 행 -> (ts int64 배열, (n, 4) float64 배열). NULL은 nan."""
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(RAW_KEYS)))
+    arr = np.array(rows, dtype=np.float64)
+    return arr[:, 0].astype(np.int64), arr[:, 1:]
+
+
+@timed_stage("gap_fill")
+def gap_fill(ts, vals, tail_to: int):
+    """5분 이상 빈 구간을 5분 간격 가짜 포인트로 채운다.
+
+    ts 는 오름차순 epoch 초, tail_to 는 마지막 포인트 뒤로 채울 상한(초, 미포함).
+    입력이 정렬돼 있으므로 결과도 정렬된 상태로 바로 만들어진다. (ts, vals, is_fake) 반환.
+    """
+    n = len(ts)
+    if n == 0:
+        return ts, vals, np.zeros(0, dtype=bool)
+
+    # gaps[i] = i 번째 포인트 뒤에 들어갈 가짜 포인트 수
+    gaps = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        gaps[:-1] = np.maximum(np.diff(ts) // FIVE_MIN - 1, 0)
+    gaps[-1] = max((tail_to - int(ts[-1])) // FIVE_MIN - 1, 0)
+
+    # 원본 포인트의 출력 위치 = 자기 인덱스 + 앞쪽 가짜 포인트 수
+    pos = np.arange(n) + np.concatenate(([0], np.cumsum(gaps)[:-1]))
+    total = n + int(gaps.sum())
+
+    out_ts = np.empty(total, dtype=np.int64)
+    out_vals = np.empty((total, vals.shape[1]), dtype=np.float64)
+    is_fake = np.ones(total, dtype=bool)
+    is_fake[pos] = False
+    out_ts[pos] = ts
+    out_vals[pos] = vals
+
+    fake_idx = np.flatnonzero(is_fake)
+    if len(fake_idx):
+        owner = np.repeat(np.arange(n), gaps)
+        out_ts[fake_idx] = ts[owner] + FIVE_MIN * (fake_idx - pos[owner])
+        out_vals[fake_idx] = FAKE_VALUES
+    return out_ts, out_vals, is_fake
+
+
+def format_ts(ts):
+    """epoch 초 배열 -> 'YYYY-MM-DD HH:MM:SS' 문자열 리스트 (strftime 은 날짜별 1회만)."""
+    day = ts // 86400
+    sod = ts - day * 86400
+    dates = {d: (EPOCH + timedelta(days=d)).strftime("%Y-%m-%d") for d in np.unique(day).tolist()}
+    return [
+        dates[d] + _HM[hm] + _SS[s]
+        for d, hm, s in zip(day.tolist(), (sod // 60).tolist(), (sod % 60).tolist())
+    ]
+
+
+@timed_stage("format")
+def format_points(ts, vals, is_fake):
+    """gap_fill 결과 -> metrics_raw 기존 응답 형식(포인트당 dict)."""
+    cols = vals.astype(object)
+    cols[np.isnan(vals)] = None
+    return [
+        {"ts": t, "rsrp": a, "rsrq": b, "sinr": c, "router_rssi": d, "is_fake": f}
+        for t, a, b, c, d, f in zip(format_ts(ts), *cols.T.tolist(), is_fake.tolist())
+    ]
+
+
+@timed_stage("format")
+def format_columns(ts, vals, is_fake) -> dict:
+    """gap_fill 결과 -> 컬럼 배열 형식 ({"ts": [...], "rsrp": [...], ..., "is_fake": [...]})."""
+    cols = vals.astype(object)
+    cols[np.isnan(vals)] = None
+    out = {"ts": format_ts(ts)}
+    out.update(zip(RAW_KEYS, cols.T.tolist()))
+    out["is_fake"] = is_fake.tolist()
+    return out
+
+
+def minmax_indices(ts, vals, max_points: int):
+    """시간 구간별로 지표마다 최소/최대 포인트를 남기는 다운샘플 (인덱스 반환).
+
+    처음/마지막 포인트 2개를 먼저 남기고, 구간 수는 (max_points - 2) // (2 * 지표 수) 라서
+    결과는 max_points 를 넘지 않는다 (max_points 는 DOWNSAMPLE_MIN_POINTS["minmax"] 이상).
+    결측 구간의 가짜 포인트(-125 dBm 등)는 최소값으로 잡혀 그대로 보인다.
+    """
+    n = len(ts)
+    n_buckets = (max_points - 2) // (2 * vals.shape[1])
+    if n_buckets < 1:
+        raise ValueError(f"max_points must be >= {2 + 2 * vals.shape[1]}")
+    edges = np.linspace(ts[0], ts[-1] + 1, n_buckets + 1)
+    bucket = np.searchsorted(edges, ts, side="right") - 1
+
+    picked = [np.array([0, n - 1])]
+    for k in range(vals.shape[1]):
+        v = vals[:, k]
+        nan = np.isnan(v)
+        for key in (np.where(nan, np.inf, v), -np.where(nan, -np.inf, v)):
+            order = np.lexsort((key, bucket))
+            b_sorted = bucket[order]
+            firsts = np.flatnonzero(np.r_[True, b_sorted[1:] != b_sorted[:-1]])
+            picked.append(order[firsts])
+    return np.unique(np.concatenate(picked))
+
+
+def lttb_indices(ts, vals, max_points: int):
+    """Largest-Triangle-Three-Buckets 다운샘플 (인덱스 반환).
+
+    4개 지표를 각각 0~1 로 정규화한 삼각형 넓이의 합으로 포인트를 고르므로
+    모든 지표가 같은 타임스탬프를 공유한다.
+    """
+    n = len(ts)
+    x = ts.astype(np.float64)
+    lo_v = np.nanmin(np.where(np.isnan(vals), np.inf, vals), axis=0)
+    hi_v = np.nanmax(np.where(np.isnan(vals), -np.inf, vals), axis=0)
+    span = np.where(np.isfinite(hi_v - lo_v) & (hi_v > lo_v), hi_v - lo_v, 1.0)
+    y = np.nan_to_num((vals - np.where(np.isfinite(lo_v), lo_v, 0.0)) / span)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    out = np.empty(max_points, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo = edges[i + 1]
+        nhi = edges[i + 2] if i + 2 < len(edges) else n
+        cx = x[nlo:nhi].mean()
+        cy = y[nlo:nhi].mean(axis=0)
+        area = np.abs(
+            (x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi])[:, None] * (cy - y[a])
+        ).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+DOWNSAMPLERS = {"minmax": minmax_indices, "lttb": lttb_indices}
+# 방식별 max_points 하한: minmax 는 처음/끝 + 구간 하나의 지표별 최소/최대, lttb 는 처음/끝 + 1
+DOWNSAMPLE_MIN_POINTS = {"minmax": 2 + 2 * len(RAW_KEYS), "lttb": 3}
+
+
+@timed_stage("downsample")
+def downsample(ts, vals, is_fake, max_points: int, method: str = "minmax"):
+    """gap_fill 결과를 max_points 이하로 줄인다. 이미 작거나 max_points <= 0 이면 그대로."""
+    if max_points <= 0 or len(ts) <= max_points:
+        return ts, vals, is_fake
+    idx = DOWNSAMPLERS[method](ts, vals, max_points)
+    return ts[idx], vals[idx], is_fake[idx]
+
+
+# ====== 원본 로그 기록 ======
+
+class RawLogWriter:
+    """날짜별 .log 파일 핸들을 하나만 유지하며 버퍼링해서 기록하는 writer.
+
+    write()는 메모리 버퍼에 줄을 쌓기만 하고, run() 태스크가 LOG_FLUSH_SEC 마다
+    (또는 버퍼가 LOG_BUFFER_MAX 를 넘으면 즉시) 스레드에서 한 번에 write 한다.
+    fsync는 LOG_FSYNC_SEC 마다. 날짜(KST)가 바뀌면 파일을 닫고 새 날짜 파일을 연다.
+
+    shared=True(다중 워커)면 여러 프로세스가 같은 파일에 append 하므로 flush 마다 완결된
+    gzip member / zstd frame 으로 압축해서 flock 을 잡고 write 한다 (이어 붙은 member/frame 도 그대로 읽힌다).
+    """
+
+    SUFFIX = {"": ".log", "gzip": ".log.gz", "zstd": ".log.zst"}
+
+    def __init__(self, log_dir: str, compress: str = "", shared: bool = False):
+        if compress not in self.SUFFIX:
+            raise SystemExit(f"LOG_COMPRESS={compress!r} 는 지원하지 않습니다. (gzip, zstd)")
+        if compress == "zstd" and zstandard is None:
+            raise SystemExit("LOG_COMPRESS=zstd 는 `pip install zstandard` 가 필요합니다.")
+        self.log_dir = log_dir
+        self.compress = compress
+        self.shared = shared
+        self._zstd = zstandard.ZstdCompressor() if shared and compress == "zstd" else None
+        self.max_pending = LOG_BUFFER_MAX * 16
+
+        self._pending = []
+        self._pending_bytes = 0
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._task = None
+
+        self._date = None
+        self._raw = None
+        self._stream = None
+        self._dirty = False
+        self._last_fsync = 0.0
+
+        self.stats = {
+            "lines": 0, "bytes": 0, "dropped": 0,
+            "flushes": 0, "fsyncs": 0, "rotations": 0, "errors": 0,
+        }
+
+    def path_for(self, date_str: str) -> str:
+        return os.path.join(self.log_dir, f"{date_str}{self.SUFFIX[self.compress]}")
+
+    def write(self, ts_kst: datetime, line: bytes):
+        """줄 하나를 버퍼에 추가. 실제 파일 쓰기는 run() 에서."""
+        if self._pending_bytes >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self._pending.append((ts_kst.strftime("%Y%m%d"), line))
+        self._pending_bytes += len(line)
+        if self._pending_bytes >= LOG_BUFFER_MAX:
+            self._wake.set()
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, pending_lines=len(self._pending), pending_bytes=self._pending_bytes)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=LOG_FLUSH_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self, final: bool = False):
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        loop = asyncio.get_running_loop()
+        do_fsync = final or (loop.time() - self._last_fsync >= LOG_FSYNC_SEC)
+        if not pending and not (do_fsync and self._dirty) and not final:
+            return
+        try:
+            await asyncio.to_thread(self._write_sync, pending, do_fsync, final)
+        except Exception:
+            self.stats["errors"] += 1
+        if do_fsync:
+            self._last_fsync = loop.time()
+
+    async def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._task:
+            await self._task
+        await self.flush(final=True)
+
+    # --- 아래는 스레드에서 실행 ---
+
+    def _open(self, date_str: str):
+        if self._date == date_str:
+            return
+        if self._date is not None:
+            self._close_file()
+            self.stats["rotations"] += 1
+        raw = open(self.path_for(date_str), "ab", buffering=0)
+        if self.shared:
+            stream = raw
+        elif self.compress == "gzip":
+            stream = gzip.GzipFile(fileobj=raw, mode="wb")
+        elif self.compress == "zstd":
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+        else:
+            stream = raw
+        self._date, self._raw, self._stream = date_str, raw, stream
+
+    def _sync_file(self, do_fsync: bool):
+        if self._stream is self._raw:
+            pass
+        elif self.compress == "gzip":
+            self._stream.flush()
+        elif self.compress == "zstd":
+            self._stream.flush(zstandard.FLUSH_BLOCK)
+        if do_fsync:
+            os.fsync(self._raw.fileno())
+            self.stats["fsyncs"] += 1
+            self._dirty = False
+
+    def _close_file(self):
+        if self._stream is not self._raw:
+            self._stream.close()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        self._date = self._raw = self._stream = None
+        self._dirty = False
+
+    def _write_sync(self, pending: list, do_fsync: bool, final: bool):
+        # 날짜가 같은 연속 구간끼리 묶어서 write 한 번으로 처리
+        i = 0
+        while i < len(pending):
+            date_str = pending[i][0]
+            j = i
+            while j < len(pending) and pending[j][0] == date_str:
+                j += 1
+            chunk = b"".join(line for _, line in pending[i:j])
+            self._open(date_str)
+            if self.shared:
+                self._append_locked(chunk)
+            else:
+                self._stream.write(chunk)
+            self._dirty = True
+            self.stats["lines"] += j - i
+            self.stats["bytes"] += len(chunk)
+            i = j
+
+        if self._raw is not None:
+            if final:
+                self._close_file()
+            else:
+                self._sync_file(do_fsync)
+        self.stats["flushes"] += 1
+
+    def _append_locked(self, chunk: bytes):
+        if self.compress == "gzip":
+            chunk = gzip.compress(chunk)
+        elif self.compress == "zstd":
+            chunk = self._zstd.compress(chunk)
+        fcntl.flock(self._raw.fileno(), fcntl.LOCK_EX)
+        try:
+            self._raw.write(chunk)
+        finally:
+            fcntl.flock(self._raw.fileno(), fcntl.LOCK_UN)
+
+
+# ====== 수집 스풀 ======
+
+class IngestSpool:
+    """수집 행을 로컬 세그먼트 파일(NDJSON)에 먼저 기록하는 append-only 스풀.
+
+    append()는 메모리 버퍼에 넣기만 하고 run() 태스크가 SPOOL_FLUSH_SEC 마다 스레드에서 write 한다.
+    소비자는 read_batch() 로 읽고 DB 적재가 끝나면 commit() 으로 위치(세그먼트, 바이트)를 offset 파일에 남긴다.
+    다 읽은 세그먼트는 지운다. 재기동 시 offset 부터 이어서 읽는다 (적재 직후 비정상 종료 시 중복 가능).
+    """
+
+    def __init__(self, spool_dir: str):
+        self.dir = spool_dir
+        self._pending = []
+        self._pending_bytes = 0
+        self._wake = asyncio.Event()
+        self.readable = asyncio.Event()
+        self._closed = False
+        self._task = None
+        self._fh = None
+        self._last_fsync = 0.0
+        self._dirty = False
+
+        self._sizes = {}     # 닫힌 세그먼트 seq -> 크기
+        self.write_seq = 1
+        self.write_pos = 0
+        self.read_seq = 1
+        self.read_pos = 0
+        self.backlog = 0     # 파일에 쓰였지만 아직 commit 안 된 바이트
+        self.head_ts = None  # 처리 중인 가장 오래된 행의 ts_kst
+
+        self.stats = {
+            "appended": 0, "committed": 0, "dropped": 0,
+            "retries": 0, "bad_lines": 0, "errors": 0,
+        }
+
+    def seg_path(self, seq: int) -> str:
+        return os.path.join(self.dir, f"{seq:012d}.seg")
+
+    @property
+    def offset_path(self) -> str:
+        return os.path.join(self.dir, "offset")
+
+    def open(self):
+        os.makedirs(self.dir, exist_ok=True)
+        seqs = sorted(int(n[:-4]) for n in os.listdir(self.dir) if n.endswith(".seg") and n[:-4].isdigit())
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                off = json.load(f)
+            self.read_seq, self.read_pos = int(off["seq"]), int(off["pos"])
+        except (FileNotFoundError, ValueError, KeyError):
+            self.read_seq, self.read_pos = (seqs[0] if seqs else 1), 0
+
+        for s in seqs:
+            if s < self.read_seq:
+                os.remove(self.seg_path(s))
+            else:
+                self._sizes[s] = os.path.getsize(self.seg_path(s))
+        self.backlog = sum(self._sizes.values()) - min(self.read_pos, self._sizes.get(self.read_seq, 0))
+
+        # 이전 실행의 마지막 세그먼트는 끝이 잘렸을 수 있으므로 항상 새 세그먼트에 이어 쓴다
+        self.write_seq = max([*seqs, self.read_seq]) + 1
+        self._fh = open(self.seg_path(self.write_seq), "ab", buffering=0)
+
+    def append(self, row) -> bool:
+        """행 하나를 버퍼에 추가. 스풀이 SPOOL_MAX_BYTES 를 넘으면 False (버림)."""
+        line = json_dumps_bytes(row) + b"\n"
+        if self.backlog + self._pending_bytes + len(line) > SPOOL_MAX_BYTES:
+            self.stats["dropped"] += 1
+            return False
+        self._pending.append(line)
+        self._pending_bytes += len(line)
+        self.stats["appended"] += 1
+        if self._pending_bytes >= LOG_BUFFER_MAX:
+            self._wake.set()
+        return True
+
+    def snapshot(self) -> dict:
+        lag = 0.0
+        if self.head_ts and self.backlog:
+            lag = (now_kst_naive() - datetime.strptime(self.head_ts, "%Y-%m-%d %H:%M:%S")).total_seconds()
+        return dict(
+            self.stats,
+            backlog_bytes=self.backlog + self._pending_bytes,
+            segments=len(self._sizes) + 1,
+            lag_sec=max(lag, 0.0),
+        )
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=SPOOL_FLUSH_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self, final: bool = False):
+        pending, self._pending, self._pending_bytes = self._pending, [], 0
+        loop = asyncio.get_running_loop()
+        do_fsync = final or (loop.time() - self._last_fsync >= SPOOL_FSYNC_SEC)
+        data = b"".join(pending)
+        if not data and not (do_fsync and self._dirty):
+            return
+        try:
+            await asyncio.to_thread(self._write_sync, data, do_fsync)
+        except Exception:
+            self.stats["errors"] += 1
+            self.stats["dropped"] += len(pending)
+            return
+        if do_fsync:
+            self._last_fsync = loop.time()
+        if data:
+            self.write_pos += len(data)
+            self.backlog += len(data)
+            self.readable.set()
+        if self.write_pos >= SPOOL_SEGMENT_BYTES:
+            # 위치 갱신은 이벤트 루프에서: 소비자가 보는 (write_seq, write_pos) 는 항상 기록이 끝난 범위
+            fh = await asyncio.to_thread(self._rotate_sync, self.write_seq + 1)
+            self._sizes[self.write_seq] = self.write_pos
+            self._fh, self.write_seq, self.write_pos = fh, self.write_seq + 1, 0
+
+    async def commit(self, seq: int, pos: int, rows: int):
+        """(seq, pos) 이전까지 DB 적재 완료. 다 읽은 세그먼트는 삭제."""
+        consumed = -self.read_pos
+        for s in range(self.read_seq, seq):
+            consumed += self._sizes.pop(s, 0)
+        consumed += pos
+        removed = [s for s in range(self.read_seq, seq)]
+        self.read_seq, self.read_pos = seq, pos
+        self.backlog -= consumed
+        self.stats["committed"] += rows
+        await asyncio.to_thread(self._commit_sync, seq, pos, removed)
+
+    async def close(self):
+        self._closed = True
+        self._wake.set()
+        if self._task:
+            await self._task
+        await self.flush(final=True)
+
+    async def release(self):
+        """소비자가 끝난 뒤 파일 핸들 정리."""
+        if self._fh is not None:
+            await asyncio.to_thread(self._fh.close)
+            self._fh = None
+
+    # --- 아래는 스레드에서 실행 ---
+
+    def _write_sync(self, data: bytes, do_fsync: bool):
+        if data:
+            self._fh.write(data)
+            self._dirty = True
+        if do_fsync and self._dirty:
+            os.fsync(self._fh.fileno())
+            self._dirty = False
+
+    def _rotate_sync(self, next_seq: int):
+        os.fsync(self._fh.fileno())
+        self._fh.close()
+        self._dirty = False
+        return open(self.seg_path(next_seq), "ab", buffering=0)
+
+    def _commit_sync(self, seq: int, pos: int, removed: list):
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "pos": pos}, f)
+        os.replace(tmp, self.offset_path)
+        for s in removed:
+            try:
+                os.remove(self.seg_path(s))
+            except FileNotFoundError:
+                pass
+
+    def read_batch(self, max_rows: int, w_seq: int, w_pos: int):
+        """읽기 위치부터 최대 max_rows 행. (rows, seq, 행별 끝 위치 리스트, 마지막 위치) 반환.
+
+        w_seq / w_pos 는 호출 시점의 기록 완료 위치 (이벤트 루프에서 넘긴다). 한 번에 한 세그먼트만 읽는다.
+        """
+        seq, pos = self.read_seq, self.read_pos
+        rows, ends = [], []
+        while True:
+            path = self.seg_path(seq)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(pos)
+                    while len(rows) < max_rows:
+                        line = f.readline()
+                        if not line or (seq == w_seq and f.tell() > w_pos):
+                            break
+                        pos = f.tell()
+                        if not line.endswith(b"\n"):
+                            # 비정상 종료로 잘린 이전 세그먼트의 마지막 줄
+                            self.stats["bad_lines"] += 1
+                            break
+                        try:
+                            rows.append(tuple(json_loads(line)))
+                            ends.append(pos)
+                        except ValueError:
+                            self.stats["bad_lines"] += 1
+            if rows or seq >= w_seq:
+                return rows, seq, ends, pos
+            seq, pos = seq + 1, 0
+
+    def pending_head_ts(self):
+        """offset 이후 첫 행(아직 DB 에 commit 안 된 가장 오래된 행)의 ts_kst, 없으면 None.
+
+        파일만 읽으므로 다른 프로세스(실행 중인 서버)의 스풀에도 쓸 수 있다. 행은 수신 순서로 쓰이므로 첫 행이 가장 오래됐다.
+        """
+        seqs = sorted(int(n[:-4]) for n in os.listdir(self.dir) if n.endswith(".seg") and n[:-4].isdigit())
+        try:
+            with open(self.offset_path, encoding="utf-8") as f:
+                off = json.load(f)
+            read_seq, read_pos = int(off["seq"]), int(off["pos"])
+        except (FileNotFoundError, ValueError, KeyError):
+            read_seq, read_pos = (seqs[0] if seqs else 1), 0
+        for seq in seqs:
+            if seq < read_seq:
+                continue
+            try:
+                with open(self.seg_path(seq), "rb") as f:
+                    f.seek(read_pos if seq == read_seq else 0)
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        try:
+                            return json_loads(line)[TS_IDX]
+                        except (ValueError, IndexError):
+                            continue
+            except FileNotFoundError:
+                # 서버가 방금 다 읽고 지운 세그먼트
+                continue
+        return None
+
+
+# ====== 스키마 ======
+
+ROLLUP_COLS_DDL = ",\n  ".join(
+    f"`{c}_sum` DOUBLE NULL, `{c}_cnt` INT NOT NULL DEFAULT 0, `{c}_min` DOUBLE NULL, `{c}_max` DOUBLE NULL"
+    for c, _ in SIGNAL_METRICS
+)
+
+SCHEMA_SQL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS `router_info_hourly` (
+      `msisdn` VARCHAR(32) NOT NULL,
+      `h` DATETIME NOT NULL,
+      {ROLLUP_COLS_DDL},
+      PRIMARY KEY (`msisdn`, `h`)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS `router_info_daily` (
+      `msisdn` VARCHAR(32) NOT NULL,
+      `d` DATE NOT NULL,
+      {ROLLUP_COLS_DDL},
+      PRIMARY KEY (`msisdn`, `d`)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `rollup_state` (
+      `name` VARCHAR(32) NOT NULL PRIMARY KEY,
+      `watermark` DATETIME NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `device_outages` (
+      `msisdn` VARCHAR(32) NOT NULL,
+      `start_ts` DATETIME NOT NULL,
+      `end_ts` DATETIME NOT NULL,
+      PRIMARY KEY (`msisdn`, `end_ts`),
+      KEY `idx_end` (`end_ts`)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS `archive_state` (
+      `month` DATE NOT NULL PRIMARY KEY,
+      `n_rows` BIGINT NOT NULL DEFAULT 0,
+      `archived_at` DATETIME NULL,
+      `purged_at` DATETIME NULL
+    )
+    """,
+)
+
+
+async def ensure_schema(pool):
+    """서버가 관리하는 보조 테이블/컬럼 생성."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for sql in SCHEMA_SQL:
+                await cur.execute(sql)
+
+            await cur.execute(
+                """
+                SELECT `COLUMN_NAME` FROM information_schema.`COLUMNS`
+                WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'router_info'
+                """
+            )
+            existing = {r[0] for r in await cur.fetchall()}
+            for col, (col_type, _, _) in SIGNAL_NUM_COLS.items():
+                if f"{col}_num" not in existing:
+                    await cur.execute(f"ALTER TABLE `router_info` ADD COLUMN `{col}_num` {col_type} NULL")
+
+            # 기기별 마지막 수신 시각 + 마지막 신호값 (수집 시 devices upsert 로 갱신)
+            await cur.execute(
+                """
+                SELECT `COLUMN_NAME` FROM information_schema.`COLUMNS`
+                WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'devices'
+                """
+            )
+            existing = {r[0] for r in await cur.fetchall()}
+            if "last_seen_ts" not in existing:
+                await cur.execute("ALTER TABLE `devices` ADD COLUMN `last_seen_ts` DATETIME NULL")
+            for col, (col_type, _, _) in SIGNAL_NUM_COLS.items():
+                if f"last_{col}" not in existing:
+                    await cur.execute(f"ALTER TABLE `devices` ADD COLUMN `last_{col}` {col_type} NULL")
+
+
+# router_info 조회가 기대하는 인덱스: (앞쪽 컬럼들) -> 없을 때 만들 이름.
+# (ts_kst) 는 롤업(rollup_range)과 장애 계산(outage_select_sql)이 기기 구분 없이 시간 구간만 읽을 때 쓴다
+REQUIRED_INDEXES = {("msisdn", "ts_kst"): "idx_msisdn_ts", ("ts_kst",): "idx_ts_kst"}
+
+
+async def missing_indexes(cur) -> list:
+    """REQUIRED_INDEXES 중 router_info 에 (앞쪽 컬럼 기준) 없는 것."""
+    await cur.execute(
+        """
+        SELECT `INDEX_NAME`, `COLUMN_NAME` FROM information_schema.`STATISTICS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'router_info'
+        ORDER BY `INDEX_NAME`, `SEQ_IN_INDEX`
+        """
+    )
+    indexes = {}
+    for name, col in await cur.fetchall():
+        indexes.setdefault(name, []).append(col)
+    return [
+        cols for cols in REQUIRED_INDEXES
+        if not any(tuple(idx[:len(cols)]) == cols for idx in indexes.values())
+    ]
+
+
+async def verify_indexes(pool):
+    """기동 시 필수 인덱스 확인. 큰 테이블이라 여기서 만들지 않고 기록만 한다 (partition-init 이 생성)."""
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            missing = await missing_indexes(cur)
+    for cols in missing:
+        msg = f"router_info 에 ({', '.join(cols)}) 인덱스가 없습니다. `partition-init` 으로 생성하세요."
+        logger.warning(msg)
+        await log_error("INDEX_MISSING", RuntimeError(msg))
+    return missing
+
+
+def worker_pool_size(workers: int, total: int = DB_POOL_TOTAL, fixed: int = DB_POOL_MAX) -> int:
+    """워커 하나의 DB 풀 maxsize."""
+    return fixed or max(2, total // max(1, workers))
+
+
+def read_dsn() -> dict:
+    """조회 풀 접속 정보 (READ_DB_HOST 가 없으면 주 DB)."""
+    return {"host": READ_DB_HOST or DB_HOST, "port": READ_DB_PORT, "user": READ_DB_USER,
+            "password": READ_DB_PASS, "db": READ_DB_NAME}
+
+
+async def create_db_pool(maxsize: int = 10, name: str = "main", minsize: int = 1, timeout: float = 0.0, **dsn):
+    conn_args = {"host": DB_HOST, "port": DB_PORT, "user": DB_USER, "password": DB_PASS, "db": DB_NAME}
+    conn_args.update(dsn)
+    pool = await aiomysql.create_pool(
+        **conn_args,
+        autocommit=True,
+        minsize=min(minsize, maxsize),
+        maxsize=maxsize,
+        charset="utf8mb4",
+        cursorclass=TimedCursor,
+    )
+    return TimedPool(pool, name, timeout)
+
+
+# ====== 파티션 ======
+# router_info 는 RANGE COLUMNS(ts_kst) 월별 파티션 pYYYYMM + 마지막 pmax(MAXVALUE).
+# 파티션 키가 모든 유니크 키에 있어야 하므로 PK 는 (id, ts_kst) 가 된다.
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def add_months(dt: datetime, n: int) -> datetime:
+    y, m = divmod(dt.month - 1 + n, 12)
+    return datetime(dt.year + y, m + 1, 1)
+
+
+def partition_def(month: datetime) -> str:
+    return f"PARTITION `p{month:%Y%m}` VALUES LESS THAN ('{add_months(month, 1):%Y-%m-%d}')"
+
+
+async def fetch_partitions(cur) -> list:
+    """router_info 파티션 [(이름, 상한 datetime | None=MAXVALUE)] (순서대로). 파티션이 아니면 []."""
+    await cur.execute(
+        """
+        SELECT `PARTITION_NAME`, `PARTITION_DESCRIPTION` FROM information_schema.`PARTITIONS`
+        WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'router_info'
+          AND `PARTITION_NAME` IS NOT NULL
+        ORDER BY `PARTITION_ORDINAL_POSITION`
+        """
+    )
+    parts = []
+    for name, desc in await cur.fetchall():
+        desc = (desc or "").strip("'")
+        parts.append((name, None if desc.upper() == "MAXVALUE" else datetime.fromisoformat(desc)))
+    return parts
+
+
+async def ensure_partitions(cur, now: datetime) -> list:
+    """이번 달부터 PARTITION_AHEAD_MONTHS 달 뒤까지 파티션이 있도록 추가. 추가한 파티션 이름 반환."""
+    parts = await fetch_partitions(cur)
+    bounds = [upper for _, upper in parts if upper is not None]
+    if not parts or not bounds:
+        return []
+
+    target = add_months(month_start(now), PARTITION_AHEAD_MONTHS + 1)
+    months = []
+    month = max(bounds)
+    while month < target:
+        months.append(month)
+        month = add_months(month, 1)
+    if not months:
+        return []
+
+    defs = ", ".join(partition_def(m) for m in months)
+    last_name, last_upper = parts[-1]
+    if last_upper is None:
+        # pmax 가 비어 있으면(미래 데이터 없음) 메타데이터 변경만으로 끝난다
+        await cur.execute(
+            f"ALTER TABLE `router_info` REORGANIZE PARTITION `{last_name}` INTO "
+            f"({defs}, PARTITION `{last_name}` VALUES LESS THAN (MAXVALUE))"
+        )
+    else:
+        await cur.execute(f"ALTER TABLE `router_info` ADD PARTITION ({defs})")
+    return [f"p{m:%Y%m}" for m in months]
+
+
+async def expire_partitions(cur, now: datetime) -> list:
+    """RETENTION_MONTHS 이전 달 파티션을 DROP (archive 모드면 router_info_archive_YYYYMM 으로 떼어낸 뒤).
+
+    롤업(router_info_hourly / daily)은 그대로 남으므로 평균 조회는 계속 된다.
+    """
+    if RETENTION_MONTHS <= 0:
+        return []
+    cutoff = add_months(month_start(now), -RETENTION_MONTHS)
+    parts = await fetch_partitions(cur)
+    expired = [name for name, upper in parts if upper is not None and upper <= cutoff]
+
+    for name in expired:
+        if RETENTION_MODE == "archive":
+            arch = f"router_info_archive_{name[1:]}"
+            await cur.execute("SHOW TABLES LIKE %s", (arch,))
+            if await cur.fetchone():
+                await cur.execute(f"SELECT 1 FROM `{arch}` LIMIT 1")
+                if await cur.fetchone():
+                    raise RuntimeError(f"{arch} 가 이미 있고 비어 있지 않습니다")
+            else:
+                await cur.execute(f"CREATE TABLE `{arch}` LIKE `router_info`")
+                await cur.execute(f"ALTER TABLE `{arch}` REMOVE PARTITIONING")
+            await cur.execute(f"ALTER TABLE `router_info` EXCHANGE PARTITION `{name}` WITH TABLE `{arch}`")
+        await cur.execute(f"ALTER TABLE `router_info` DROP PARTITION `{name}`")
+    return expired
+
+
+async def run_partition_maintenance(app):
+    now = now_kst_naive()
+    async with app.ctx.pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            if not await fetch_partitions(cur):
+                return
+            await ensure_partitions(cur, now)
+            expired = await expire_partitions(cur, now)
+    if expired:
+        app.ctx.resp_cache.clear()
+        app.ctx.count_cache.clear()
+        notify_workers()
+
+
+async def partition_worker(app):
+    """파티션 선생성/보존기간 정리 백그라운드 태스크."""
+    stop = app.ctx.partition_stop
+    while not stop.is_set():
+        try:
+            await run_partition_maintenance(app)
+        except Exception as e:
+            await log_error("PARTITION_ERROR", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=PARTITION_CHECK_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ====== 다중 워커 ======
+# 워커마다 SPOOL_DIR/slotN.lock 을 flock 으로 잡아 슬롯 번호를 정한다. 슬롯 N 의 스풀은 N=0 이면 SPOOL_DIR,
+# 아니면 SPOOL_DIR/wN. 워커가 죽으면 잠금이 풀리므로 다시 뜬 워커가 같은 슬롯의 스풀을 이어서 적재한다.
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """프로세스 간 배타 잠금 (fcntl 이 없으면 잠그지 않음)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a+") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+async def acquire_worker_slot(workers: int, wait_sec: float = 30.0):
+    """잠기지 않은 가장 작은 슬롯 번호와 잠금 파일. 이전 워커가 아직 종료 중이면 wait_sec 까지 기다린다."""
+    if fcntl is None:
+        if workers > 1:
+            raise SystemExit("WORKERS > 1 은 fcntl(flock) 을 지원하는 OS 에서만 쓸 수 있습니다.")
+        return 0, None
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    deadline = time.monotonic() + wait_sec
+    while True:
+        for n in range(workers):
+            fh = open(os.path.join(SPOOL_DIR, f"slot{n}.lock"), "a+")
+            try:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                fh.close()
+                continue
+            return n, fh
+        if time.monotonic() > deadline:
+            raise SystemExit(f"빈 워커 슬롯이 없습니다 (WORKERS={workers}). 같은 SPOOL_DIR 를 쓰는 서버가 이미 실행 중인지 확인하세요.")
+        await asyncio.sleep(0.5)
+
+
+def spool_dir_for(slot: int) -> str:
+    return SPOOL_DIR if slot == 0 else os.path.join(SPOOL_DIR, f"w{slot}")
+
+
+def spool_pending_ts():
+    """SPOOL_DIR 의 모든 슬롯 스풀(워커 수를 줄여 남은 것 포함) 중 적재 대기 행의 가장 이른 ts_kst (없으면 None)."""
+    if not os.path.isdir(SPOOL_DIR):
+        return None
+    dirs = [SPOOL_DIR] + [
+        os.path.join(SPOOL_DIR, n) for n in sorted(os.listdir(SPOOL_DIR)) if re.fullmatch(r"w\d+", n)
+    ]
+    heads = [ts for ts in (IngestSpool(d).pending_head_ts() for d in dirs) if ts]
+    return min(heads) if heads else None
+
+
+def orphan_spools(workers: int) -> list:
+    """WORKERS 를 줄여서 더 이상 어느 워커도 적재하지 않는 슬롯 스풀 (세그먼트가 남아 있는 것만)."""
+    out = []
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        m = re.fullmatch(r"w(\d+)", name)
+        path = os.path.join(SPOOL_DIR, name)
+        if m and int(m.group(1)) >= workers and any(f.endswith(".seg") for f in os.listdir(path)):
+            out.append(path)
+    return out
+
+
+def notify_workers():
+    """다른 워커들이 조회 캐시를 비우고 기기 캐시를 다시 읽게 한다 (관리 API, 파티션 정리 후)."""
+    epoch = getattr(getattr(app, "shared_ctx", None), "cache_epoch", None) if app.ctx.workers > 1 else None
+    if epoch is None:
+        return
+    with epoch.get_lock():
+        epoch.value += 1
+        app.ctx.cache_epoch = epoch.value
+
+
+async def worker_sync(app):
+    """다중 워커 동기화 태스크 (WORKER_SYNC_SEC 마다).
+
+    notify_workers() 신호가 있으면 캐시를 비우고, 슬롯 0 이 아닌 워커는 롤업 워터마크와
+    아카이브 경계를 DB 에서 다시 읽는다 (롤업/아카이브 작업은 슬롯 0 만 하므로).
+    """
+    stop = app.ctx.sync_stop
+    epoch = app.shared_ctx.cache_epoch
+    while not stop.is_set():
+        try:
+            if epoch.value != app.ctx.cache_epoch:
+                app.ctx.cache_epoch = epoch.value
+                app.ctx.resp_cache.clear()
+                app.ctx.count_cache.clear()
+                await load_device_cache(app)
+
+            if not app.ctx.leader:
+                prev = app.ctx.rollup_watermark
+                async with app.ctx.pool.acquire() as conn:
+                    wm = app.ctx.rollup_watermark = await fetch_rollup_watermark(conn)
+                if prev is not None and (wm is None or wm < prev):
+                    app.ctx.resp_cache.clear()
+                    app.ctx.count_cache.clear()
+                until = await load_archive_until(app)
+                if until is not None:
+                    app.ctx.archive_until = until
+        except Exception as e:
+            await log_error("WORKER_SYNC_ERROR", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=WORKER_SYNC_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+@app.listener("main_process_start")
+async def main_start(app, _):
+    """워커 간 공유 객체: 워커 수, (다중 워커면) 캐시 무효화 번호, SSE 전달 큐와 슬롯별 구독자 수."""
+    workers = app.state.workers
+    app.shared_ctx.workers = multiprocessing.Value("i", workers, lock=False)
+    if workers <= 1:
+        return
+    app.shared_ctx.cache_epoch = multiprocessing.Value("q", 0)
+    app.shared_ctx.stream_queues = tuple(multiprocessing.Queue(STREAM_QUEUE_MAX * 4) for _ in range(workers))
+    app.shared_ctx.stream_clients = multiprocessing.Array("i", workers)
+
+
+def worker_count(app) -> int:
+    """app.run(workers=N) 의 N. 워커 프로세스는 모듈을 다시 import 하므로 main_start 가 shared_ctx 로 넘긴 값을 읽는다."""
+    value = getattr(getattr(app, "shared_ctx", None), "workers", None)
+    return value.value if value is not None else 1
+
+
+# ====== lifecycle ======
+
+@app.exception(PoolBusy)
+async def handle_pool_busy(request, exc):
+    return response.json({"error": "db_busy", "pool": exc.pool}, status=503, headers={"Retry-After": "5"})
+
+
+@app.exception(Exception)
+async def handle_ex(request, exc):
+    await log_error("UNHANDLED", exc)
+    return response.json({"error": "internal_error", "detail": repr(exc)}, status=500)
+
+
+@app.listener("before_server_start")
+async def before_start(app, _):
+    if RETENTION_MODE not in ("drop", "archive"):
+        raise SystemExit(f"RETENTION_MODE={RETENTION_MODE!r} 는 지원하지 않습니다. (drop, archive)")
+    if ARCHIVE_MONTHS > 0 and pq is None:
+        raise SystemExit("ARCHIVE_MONTHS 는 `pip install pyarrow` 가 필요합니다.")
+    if getattr(app, "shared_ctx", None) is None and app.state.workers > 1:
+        raise SystemExit("WORKERS > 1 은 Sanic 22.9 이상(shared_ctx)이 필요합니다.")
+    workers = app.ctx.workers = worker_count(app)
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    app.ctx.slot, app.ctx.slot_lock = await acquire_worker_slot(workers)
+    app.ctx.leader = app.ctx.slot == 0
+    logger.info("worker slot %d/%d pid=%d%s", app.ctx.slot, workers, os.getpid(), " (leader)" if app.ctx.leader else "")
+
+    app.ctx.log_dir = LOG_DIR
+    app.ctx.log_writer = RawLogWriter(LOG_DIR, LOG_COMPRESS, shared=workers > 1)
+    app.ctx.log_writer.start()
+
+    app.ctx.pool = await create_db_pool(
+        maxsize=worker_pool_size(workers), minsize=DB_POOL_MIN, timeout=DB_POOL_TIMEOUT_SEC,
+    )
+    app.ctx.read_pool = await create_db_pool(
+        maxsize=worker_pool_size(workers, READ_POOL_TOTAL, READ_POOL_MAX), name="read",
+        minsize=DB_POOL_MIN, timeout=READ_POOL_TIMEOUT_SEC, **read_dsn(),
+    )
+    app.ctx.csv_exports = asyncio.Semaphore(CSV_EXPORT_MAX)
+
+    # 여러 워커가 동시에 ALTER 하지 않도록 잠금 안에서 (먼저 끝낸 워커 뒤로는 확인만 하고 통과)
+    with file_lock(os.path.join(SPOOL_DIR, "schema.lock")):
+        await ensure_schema(app.ctx.pool)
+    if app.ctx.leader:
+        await verify_indexes(app.ctx.pool)
+        for path in orphan_spools(workers):
+            msg = f"{path} 에 적재되지 않은 스풀이 남아 있습니다. WORKERS 를 늘려 실행하면 적재됩니다."
+            logger.warning(msg)
+            await log_error("SPOOL_ORPHAN", RuntimeError(msg))
+    await load_device_cache(app)
+    app.ctx.last_seen_due = {}   # msisdn -> 다음에 devices.last_seen_ts 를 기록할 ts_kst (insert_db)
+
+    app.ctx.count_cache = TTLCache(COUNT_CACHE_MAX)
+    app.ctx.resp_cache = TTLCache(RESP_CACHE_MAX_BYTES)
+    app.ctx.stream_hub = StreamHub()
+
+    app.ctx.spool = IngestSpool(spool_dir_for(app.ctx.slot))
+    app.ctx.spool.open()
+    app.ctx.spool.start()
+    app.ctx.ingest_stop = asyncio.Event()
+    app.ctx.ingest_stats = {
+        "accepted": 0, "dropped": 0,
+        "flushed_rows": 0, "flushed_batches": 0, "failed_rows": 0, "db_unavailable": 0,
+    }
+    app.ctx.ingest_task = asyncio.create_task(ingest_consumer(app))
+
+    app.ctx.rollup_watermark = await load_rollup_watermark(app)
+    if READ_DB_HOST:
+        app.ctx.replica_watermark = await load_rollup_watermark(app, app.ctx.read_pool)
+        app.ctx.replica_stop = asyncio.Event()
+        app.ctx.replica_task = asyncio.create_task(replica_sync(app))
+    app.ctx.archive_until = await load_archive_until(app)
+    if app.ctx.archive_until and pq is None:
+        raise SystemExit("아카이브된 달이 있어 조회에 `pip install pyarrow` 가 필요합니다.")
+
+    # 롤업 / 파티션 / 아카이브는 슬롯 0 워커만
+    if app.ctx.leader:
+        app.ctx.rollup_stop = asyncio.Event()
+        app.ctx.rollup_task = asyncio.create_task(rollup_worker(app))
+
+        app.ctx.partition_stop = asyncio.Event()
+        app.ctx.partition_task = asyncio.create_task(partition_worker(app))
+
+        app.ctx.archive_stop = asyncio.Event()
+        app.ctx.archive_task = asyncio.create_task(archive_worker(app))
+
+    if workers > 1:
+        shared = app.shared_ctx
+        app.ctx.cache_epoch = shared.cache_epoch.value
+        app.ctx.stream_hub.attach_peers(app.ctx.slot, shared.stream_queues, shared.stream_clients)
+        app.ctx.sync_stop = asyncio.Event()
+        app.ctx.sync_task = asyncio.create_task(worker_sync(app))
+        app.ctx.peer_task = asyncio.create_task(app.ctx.stream_hub.peer_reader(app.ctx.sync_stop))
+
+
+@app.listener("before_server_stop")
+async def before_stop(app, _):
+    # 열린 SSE 연결이 graceful shutdown 을 붙잡지 않도록 먼저 끝낸다
+    hub = getattr(app.ctx, "stream_hub", None)
+    if hub:
+        hub.close()
+
+
+@app.listener("after_server_stop")
+async def after_stop(app, _):
+    sync_task = getattr(app.ctx, "sync_task", None)
+    if sync_task:
+        app.ctx.sync_stop.set()
+        await sync_task
+        await app.ctx.peer_task
+
+    replica_task = getattr(app.ctx, "replica_task", None)
+    if replica_task:
+        app.ctx.replica_stop.set()
+        await replica_task
+
+    rollup_task = getattr(app.ctx, "rollup_task", None)
+    if rollup_task:
+        app.ctx.rollup_stop.set()
+        await rollup_task
+
+    archive_task = getattr(app.ctx, "archive_task", None)
+    if archive_task:
+        app.ctx.archive_stop.set()
+        await archive_task
+
+    partition_task = getattr(app.ctx, "partition_task", None)
+    if partition_task:
+        app.ctx.partition_stop.set()
+        await partition_task
+
+    # 스풀 버퍼를 파일에 쓰고, 소비자가 SPOOL_DRAIN_SEC 동안 DB 에 넣은 뒤 풀을 닫는다
+    # (남은 행은 스풀 파일에 있으므로 다음 기동 때 이어서 적재)
+    spool = getattr(app.ctx, "spool", None)
+    if spool:
+        await spool.close()
+    task = getattr(app.ctx, "ingest_task", None)
+    if task:
+        app.ctx.ingest_stop.set()
+        await task
+    if spool:
+        await spool.release()
+
+    for name in ("read_pool", "pool"):
+        pool = getattr(app.ctx, name, None)
+        if pool:
+            pool.close()
+            await pool.wait_closed()
+
+    writer = getattr(app.ctx, "log_writer", None)
+    if writer:
+        await writer.close()
+
+    # 스풀을 다 닫은 뒤에 슬롯을 놓는다
+    slot_lock = getattr(app.ctx, "slot_lock", None)
+    if slot_lock:
+        slot_lock.close()
+
+
+# ====== 데이터 수집 ======
+
+# (router_info 컬럼, 수집 JSON 키). build_row 는 이 순서대로 값을 꺼내 튜플을 만든다
+PAYLOAD_FIELDS = (
+    ("datetime_str", "DATETIME"), ("msisdn", "MSISDN"), ("system", "SYSTEM"),
+    ("plmn", "PLMN"), ("band", "Band"), ("earfcn_dl", "EARFCN_DL"),
+    ("earfcn_ul", "EARFCN_UL"), ("bandwidth", "Bandwidth"), ("cell_id", "Cell_ID"),
+    ("pci", "PCI"), ("drx", "DRX"), ("rsrp", "RSRP"), ("rsrq", "RSRQ"),
+    ("rssi", "RSSI"), ("tac", "TAC"), ("sinr", "SINR"), ("rrc_st", "RRC_ST"),
+    ("emc_st", "EMC_ST"), ("scell_band", "SCELL_BAND"), ("scell_bw", "SCELL_BW"),
+    ("scell_status", "SCELL_STATUS"), ("latitude", "LATITUDE"),
+    ("longitude", "LONGITUDE"), ("ip_v4", "IP_v4"),
+)
+PAYLOAD_KEYS = tuple(k for _, k in PAYLOAD_FIELDS)
+PAYLOAD_SIGNAL_IDX = tuple(
+    [c for c, _ in PAYLOAD_FIELDS].index(col) for col in SIGNAL_NUM_COLS
+)
+EMPTY_PAYLOAD = (None,) * len(PAYLOAD_FIELDS)
+
+ROUTER_INFO_COLS = (
+    "ts_kst",
+    *(c for c, _ in PAYLOAD_FIELDS),
+    "client_ip", "raw_json",
+    *(f"{c}_num" for c in SIGNAL_NUM_COLS),
+)
+MSISDN_IDX = ROUTER_INFO_COLS.index("msisdn")
+TS_IDX = ROUTER_INFO_COLS.index("ts_kst")
+SIGNAL_NUM_IDX = tuple(ROUTER_INFO_COLS.index(f"{c}_num") for c in SIGNAL_NUM_COLS)
+
+ROUTER_INFO_INSERT_SQL = (
+    "INSERT INTO `router_info` ("
+    + ", ".join(f"`{c}`" for c in ROUTER_INFO_COLS)
+    + ") VALUES "
+)
+ROUTER_INFO_ROW_PH = "(" + ", ".join(["%s"] * len(ROUTER_INFO_COLS)) + ")"
+
+# 마지막 수신 정보 갱신. last_seen_ts 는 마지막에 대입해야 앞의 IF 가 기존 값과
+# 비교할 수 있다 (늦게 도착한 배치가 최신 값을 덮지 않도록).
+DEVICES_LAST_SEEN_SET = (
+    "".join(
+        f"last_{c} = IF(devices.last_seen_ts > new.last_seen_ts, devices.last_{c}, new.last_{c}),\n"
+        for c in SIGNAL_NUM_COLS
+    )
+    + "last_seen_ts = GREATEST(COALESCE(devices.last_seen_ts, new.last_seen_ts), new.last_seen_ts)"
+)
+DEVICES_LAST_COLS = "last_seen_ts, " + ", ".join(f"last_{c}" for c in SIGNAL_NUM_COLS)
+
+# 수집 시: 기기 활성화 + 마지막 수신 정보
+DEVICES_UPSERT_SQL = (
+    f"INSERT INTO devices (msisdn, dormant, dormant_at, {DEVICES_LAST_COLS}) VALUES {{values}} AS new\n"
+    "ON DUPLICATE KEY UPDATE\ndormant = 0,\ndormant_at = NULL,\n" + DEVICES_LAST_SEEN_SET
+)
+DEVICES_ROW_PH = "(%s, 0, NULL, %s, " + ", ".join(["%s"] * len(SIGNAL_NUM_COLS)) + ")"
+
+# replay 시: 과거 데이터이므로 휴면 상태는 건드리지 않고 마지막 수신 정보만
+DEVICES_SEEN_SQL = (
+    f"INSERT INTO devices (msisdn, {DEVICES_LAST_COLS}) VALUES {{values}} AS new\n"
+    "ON DUPLICATE KEY UPDATE\n" + DEVICES_LAST_SEEN_SET
+)
+DEVICES_SEEN_ROW_PH = "(%s, %s, " + ", ".join(["%s"] * len(SIGNAL_NUM_COLS)) + ")"
+
+
+def last_seen_params(rows) -> tuple:
+    """수집 행들 -> ({msisdn: 마지막 행}, devices upsert 파라미터). 기기별로 뒤쪽(최신) 행을 쓴다."""
+    last = {}
+    for r in rows:
+        if r[MSISDN_IDX]:
+            last[r[MSISDN_IDX]] = r
+    return last, [v for m, r in last.items() for v in (m, r[TS_IDX], *(r[i] for i in SIGNAL_NUM_IDX))]
+
+
+def append_raw(body: bytes, ts_kst: datetime):
+    """요청 바디 앞에 KST 타임스탬프 붙여서 log_writer 버퍼에 append."""
+    ts_str = ts_kst.strftime("%Y-%m-%d %H:%M:%S")
+    line = f"[{ts_str}] ".encode() + (body or b"")
+    if not line.endswith(b"\n"):
+        line += b"\n"
+    app.ctx.log_writer.write(ts_kst, line)
+
+
+def parse_payload(body: bytes) -> tuple:
+    """수집 바디 -> (PAYLOAD_FIELDS 순서의 값 튜플, raw_json). JSON 객체가 아니면 (EMPTY_PAYLOAD, None).
+
+    raw_json 은 다시 직렬화하지 않고 파싱에 성공한 원본 바디를 그대로 저장한다.
+    """
+    try:
+        payload = json_loads(body)
+        if not isinstance(payload, dict):
+            return EMPTY_PAYLOAD, None
+        raw = body.decode("utf-8").strip()
+    except (ValueError, TypeError):
+        return EMPTY_PAYLOAD, None
+    get = payload.get
+    return tuple([get(k) for k in PAYLOAD_KEYS]), raw
+
+
+@timed_stage("ingest_parse")
+def build_row(client_ip, ts_kst: datetime, body: bytes) -> tuple:
+    """JSON이면 각 필드 매핑하여 ROUTER_INFO_COLS 순서의 튜플로 반환."""
+    vals, raw = parse_payload(body)
+    return (
+        ts_kst.strftime("%Y-%m-%d %H:%M:%S"),
+        *vals,
+        client_ip, raw,
+        *[parse_signal(col, vals[i]) for col, i in zip(SIGNAL_NUM_COLS, PAYLOAD_SIGNAL_IDX)],
+    )
+
+
+async def load_device_cache(app):
+    """devices 테이블의 msisdn -> dormant 상태를 메모리에 적재."""
+    cache = {}
+    try:
+        async with app.ctx.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT msisdn, dormant FROM devices")
+                for msisdn, dormant in await cur.fetchall():
+                    cache[str(msisdn)] = bool(dormant)
+    except Exception as e:
+        await log_error("DEVICE_CACHE_ERROR", e)
+    app.ctx.device_cache = cache
+
+
+async def insert_db(rows: list):
+    """수집 행 묶음을 devices upsert 1회 + router_info multi-row INSERT 1회로 기록.
+
+    devices upsert 는 배치 안 기기별 마지막 행으로 last_seen_ts / last_* 를 갱신하되, 이미 활성으로 알고 있는
+    기기는 이 워커가 마지막으로 기록한 뒤 LAST_SEEN_WRITE_SEC 가 지나지 않은 보고면 건너뛴다.
+    그래서 기기 목록의 last_seen_ts / last_* 는 그만큼 늦을 수 있다 (진행 중 장애는 outages 가 원본으로 확인).
+    """
+    last, _ = last_seen_params(rows)   # 큐 순서 = 수신 순서이므로 뒤의 행이 최신
+    cache, due = app.ctx.device_cache, app.ctx.last_seen_due
+    upsert = [
+        r for m, r in last.items()
+        if cache.get(str(m)) is not False or r[TS_IDX] >= due.get(str(m), "")
+    ]
+
+    async with app.ctx.pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            if upsert:
+                _, params = last_seen_params(upsert)
+                await cur.execute(
+                    DEVICES_UPSERT_SQL.format(values=", ".join([DEVICES_ROW_PH] * len(upsert))),
+                    params,
+                )
+            # 스풀이 밀렸다가 적재된 행이 롤업이 이미 지나갔을 수 있는 시간에 속하면 INSERT 와 같은 트랜잭션에서
+            # 그 시간을 남긴다 (run_rollup 이 워터마크를 되돌림). 따로 커밋하면 기록 실패 시 재시도가 행을 중복 INSERT
+            oldest = min(r[TS_IDX] for r in rows)
+            rewind = oldest < rollup_target().strftime("%Y-%m-%d %H:%M:%S")
+            if rewind:
+                await conn.begin()
+            try:
+                await cur.execute(
+                    ROUTER_INFO_INSERT_SQL + ", ".join([ROUTER_INFO_ROW_PH] * len(rows)),
+                    [v for r in rows for v in r],
+                )
+                if rewind:
+                    await cur.execute(ROLLUP_LATE_SQL, (floor_hour(datetime.fromisoformat(oldest)),))
+                    await conn.commit()
+            except Exception:
+                if rewind:
+                    await conn.rollback()
+                raise
+
+    revived = [m for m in last if cache.get(str(m)) is not False]
+    for m in revived:
+        cache[str(m)] = False
+    step = timedelta(seconds=LAST_SEEN_WRITE_SEC)
+    for r in upsert:
+        due[str(r[MSISDN_IDX])] = (datetime.fromisoformat(r[TS_IDX]) + step).strftime("%Y-%m-%d %H:%M:%S")
+
+    # 새로 들어온 행이 보이도록 오늘이 포함된 응답 캐시를 비운다 (신규/복귀 기기는 목록도).
+    # 스풀이 밀렸다가 늦게 적재된 지난 날짜 행이 있으면 끝난 구간 응답과 records 건수도
+    today = floor_day(now_kst_naive()).strftime("%Y-%m-%d %H:%M:%S")
+    late = {r[MSISDN_IDX] for r in rows if r[TS_IDX] < today}
+    for m in last:
+        invalidate_responses(m, closed=m in late)
+        if m in late:
+            app.ctx.count_cache.drop_tag(str(m))
+    if revived:
+        invalidate_responses(devices=True)
+
+
+# 연결/서버 상태 문제라 다시 시도하면 되는 MySQL 에러 코드
+# (1040 too many connections, 1053 shutdown, 1205 lock wait, 1213 deadlock, 1290 read-only,
+#  1927 connection killed, 2002/2003 connect 실패, 2006 gone away, 2013 lost connection, 2055)
+TRANSIENT_DB_CODES = {1040, 1053, 1205, 1213, 1290, 1927, 2002, 2003, 2006, 2013, 2055}
+
+
+def is_transient_db_error(e: Exception) -> bool:
+    # PoolBusy: 조회 폭주 등으로 풀이 꽉 찬 것이라 행 문제가 아니다 -> 같은 위치부터 backoff 재시도
+    if isinstance(e, (asyncio.TimeoutError, ConnectionError, aiomysql.InterfaceError, PoolBusy)):
+        return True
+    return isinstance(e, aiomysql.OperationalError) and bool(e.args) and e.args[0] in TRANSIENT_DB_CODES
+
+
+async def flush_ingest(batch: list) -> int:
+    """배치 INSERT 후 처리가 끝난 행 수 반환.
+
+    len(batch) 보다 작으면 DB 연결 문제로 멈춘 것이고 그 뒤 행은 스풀에서 재시도한다.
+    데이터 문제로 실패하면 한 행씩 재시도해서 문제 행만 버린다.
+    """
+    stats = app.ctx.ingest_stats
+    try:
+        await insert_db(batch)
+        stats["flushed_rows"] += len(batch)
+        stats["flushed_batches"] += 1
+        return len(batch)
+    except Exception as e:
+        if is_transient_db_error(e):
+            stats["db_unavailable"] += 1
+            await log_error("DB_UNAVAILABLE", e)
+            return 0
+        if len(batch) == 1:
+            stats["failed_rows"] += 1
+            await log_error("DB_ERROR", e)
+            return 1
+
+    for i, row in enumerate(batch):
+        try:
+            await insert_db([row])
+            stats["flushed_rows"] += 1
+        except Exception as e:
+            if is_transient_db_error(e):
+                stats["db_unavailable"] += 1
+                await log_error("DB_UNAVAILABLE", e)
+                return i
+            stats["failed_rows"] += 1
+            await log_error("DB_ERROR", e)
+    stats["flushed_batches"] += 1
+    return len(batch)
+
+
+async def ingest_consumer(app):
+    """스풀 -> DB 적재 백그라운드 태스크.
+
+    DB 연결 문제면 같은 위치부터 지수 backoff(최대 SPOOL_RETRY_MAX_SEC)로 재시도한다.
+    배치가 INGEST_BATCH_SIZE 보다 작으면 INGEST_FLUSH_SEC 만큼 모았다가 넣는다.
+    종료 시에는 SPOOL_DRAIN_SEC 동안만 비우고 나머지는 스풀에 남긴다.
+    """
+    spool = app.ctx.spool
+    stop = app.ctx.ingest_stop
+    loop = asyncio.get_running_loop()
+    delay = 0.0
+    drain_until = None
+
+    while True:
+        if stop.is_set():
+            drain_until = drain_until or loop.time() + SPOOL_DRAIN_SEC
+            if loop.time() > drain_until:
+                break
+
+        rows, seq, ends, pos = await asyncio.to_thread(
+            spool.read_batch, INGEST_BATCH_SIZE, spool.write_seq, spool.write_pos
+        )
+        if not rows:
+            if (seq, pos) != (spool.read_seq, spool.read_pos):
+                await spool.commit(seq, pos, 0)   # 잘린 줄 / 다 읽은 세그먼트 건너뛰기
+            if stop.is_set():
+                break
+            try:
+                await asyncio.wait_for(spool.readable.wait(), timeout=INGEST_FLUSH_SEC)
+            except asyncio.TimeoutError:
+                pass
+            spool.readable.clear()
+            continue
+
+        spool.head_ts = rows[0][TS_IDX]
+        done = await flush_ingest(rows)
+        if done:
+            await spool.commit(seq, ends[done - 1], done)
+        if done < len(rows):
+            spool.stats["retries"] += 1
+            if stop.is_set():
+                break
+            delay = min(SPOOL_RETRY_MAX_SEC, delay * 2 if delay else 0.5)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        delay = 0.0
+        if len(rows) < INGEST_BATCH_SIZE and not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=INGEST_FLUSH_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+
+@app.route("/<path:path>", methods=["POST", "PUT", "PATCH"], name="log_any_path")
+@app.route("/", methods=["POST", "PUT", "PATCH"], name="log_any_root")
+async def log_any(request: Request, path: str = ""):
+    ts_kst = datetime.now(tz=KST)
+    body = request.body or b""
+
+    append_raw(body, ts_kst)
+
+    # 스풀에 쓰고 바로 응답 (DB 적재는 ingest_consumer). 스풀이 가득 차면 버린다 (원본은 .log 에 남아 있음)
+    # 실시간 구독자에게는 스풀이 받은 행만 보낸다 (DB 에 들어가지 않을 행을 화면에 보이지 않도록)
+    row = build_row(request.remote_addr or None, ts_kst, body)
+    if app.ctx.spool.append(row):
+        app.ctx.ingest_stats["accepted"] += 1
+        if row[MSISDN_IDX]:
+            app.ctx.stream_hub.publish(row)
+    else:
+        app.ctx.ingest_stats["dropped"] += 1
+        await log_error("INGEST_SPOOL_FULL", RuntimeError(f"spool > {SPOOL_MAX_BYTES} bytes"))
+
+    return response.text("ok\n")
+
+
+# ====== 롤업 ======
+
+ROLLUP_METRIC_COLS = ", ".join(
+    f"`{c}_sum`, `{c}_cnt`, `{c}_min`, `{c}_max`" for c, _ in SIGNAL_METRICS
+)
+
+
+# 늦게 적재된 행의 가장 이른 시간. 여러 워커가 INSERT 후 남기고 롤업(슬롯 0)이 꺼내서 hourly 워터마크를 되돌린다
+ROLLUP_LATE_SQL = """
+INSERT INTO `rollup_state` (`name`, `watermark`) VALUES ('late', %s) AS new
+ON DUPLICATE KEY UPDATE `watermark` = LEAST(`rollup_state`.`watermark`, new.`watermark`)
+"""
+
+
+def rollup_target() -> datetime:
+    """롤업이 집계하는 상한: 끝난 지 ROLLUP_DELAY_SEC 이상 지난 마지막 시간의 끝."""
+    return floor_hour(now_kst_naive() - timedelta(seconds=ROLLUP_DELAY_SEC))
+
+
+async def fetch_rollup_watermark(conn):
+    """rollup_state 의 워터마크(이 시각 이전은 롤업 완료) 조회."""
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT `watermark` FROM `rollup_state` WHERE `name` = 'hourly'")
+        row = await cur.fetchone()
+    return row[0] if row else None
+
+
+async def load_rollup_watermark(app, pool=None):
+    try:
+        async with (pool or app.ctx.pool).acquire() as conn:
+            return await fetch_rollup_watermark(conn)
+    except Exception as e:
+        await log_error("ROLLUP_ERROR", e)
+        return None
+
+
+def read_watermark(app):
+    """조회가 롤업 테이블을 쓸 수 있는 경계. 읽기 복제본이면 복제본에 반영된 워터마크."""
+    return app.ctx.replica_watermark if READ_DB_HOST else app.ctx.rollup_watermark
+
+
+async def replica_sync(app):
+    """READ_SYNC_SEC 마다 복제본의 롤업 워터마크를 읽는다.
+
+    주 DB 워터마크를 그대로 쓰면 복제 지연 동안 복제본에서 덜 채워진 롤업 구간을 읽어 캐시할 수 있다.
+    """
+    stop = app.ctx.replica_stop
+    while not stop.is_set():
+        try:
+            async with app.ctx.read_pool.acquire() as conn:
+                wm = await fetch_rollup_watermark(conn)
+            prev, app.ctx.replica_watermark = app.ctx.replica_watermark, wm
+            if prev is not None and (wm is None or wm < prev):
+                app.ctx.resp_cache.clear()
+                app.ctx.count_cache.clear()
+        except Exception as e:
+            await log_error("REPLICA_SYNC_ERROR", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=READ_SYNC_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def rollup_range(conn, lo: datetime, hi: datetime):
+    """[lo, hi) 시간별 롤업과, 그 사이에 끝난 날짜의 일별 롤업을 원본에서 다시 계산."""
+    raw_aggs = ", ".join(
+        f"SUM({signal_expr(c)}), COUNT({signal_expr(c)}), MIN({signal_expr(c)}), MAX({signal_expr(c)})"
+        for c, _ in SIGNAL_METRICS
+    )
+    hourly_aggs = ", ".join(
+        f"SUM(`{c}_sum`), SUM(`{c}_cnt`), MIN(`{c}_min`), MAX(`{c}_max`)" for c, _ in SIGNAL_METRICS
+    )
+    day_lo, day_hi = floor_day(lo), floor_day(hi)
+
+    async with conn.cursor() as cur:
+        await conn.begin()
+        try:
+            await cur.execute(
+                "DELETE FROM `router_info_hourly` WHERE `h` >= %s AND `h` < %s", (lo, hi)
+            )
+            await cur.execute(
+                f"""
+                INSERT INTO `router_info_hourly` (`msisdn`, `h`, {ROLLUP_METRIC_COLS})
+                SELECT `msisdn`, DATE_FORMAT(`ts_kst`, '%%Y-%%m-%%d %%H:00:00') AS hb, {raw_aggs}
+                FROM `router_info`
+                WHERE `ts_kst` >= %s AND `ts_kst` < %s AND `msisdn` IS NOT NULL
+                GROUP BY `msisdn`, hb
+                """,
+                (lo, hi),
+            )
+            if day_hi > day_lo:
+                await cur.execute(
+                    "DELETE FROM `router_info_daily` WHERE `d` >= %s AND `d` < %s",
+                    (day_lo.date(), day_hi.date()),
+                )
+                await cur.execute(
+                    f"""
+                    INSERT INTO `router_info_daily` (`msisdn`, `d`, {ROLLUP_METRIC_COLS})
+                    SELECT `msisdn`, DATE(`h`) AS db, {hourly_aggs}
+                    FROM `router_info_hourly`
+                    WHERE `h` >= %s AND `h` < %s
+                    GROUP BY `msisdn`, db
+                    """,
+                    (day_lo, day_hi),
+                )
+            await outage_range(cur, lo, hi)
+            await cur.execute(
+                """
+                INSERT INTO `rollup_state` (`name`, `watermark`) VALUES ('hourly', %s) AS new
+                ON DUPLICATE KEY UPDATE `watermark` = new.`watermark`
+                """,
+                (hi,),
+            )
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+
+def outage_select_sql(n_msisdns: int = 0) -> str:
+    """[lo, hi) 에 들어온 샘플 중 직전 샘플과 OUTAGE_GAP_SEC 이상 떨어진 것 -> (msisdn, start_ts, end_ts).
+
+    장애 구간은 gap_fill 이 가짜 포인트로 채우는 범위와 같은 [직전 샘플 + 5분, 다음 샘플).
+    직전 샘플은 LAG(), 구간 첫 샘플은 lo 이전 마지막 샘플(idx_msisdn_ts 1회 탐색). 파라미터: (lo, lo, hi, *msisdns)
+    """
+    in_msisdns = f" AND r.`msisdn` IN ({', '.join(['%s'] * n_msisdns)})" if n_msisdns else ""
+    return f"""
+    SELECT t.`msisdn`, DATE_ADD(t.`prev_ts`, INTERVAL {FIVE_MIN} SECOND), t.`ts_kst`
+    FROM (
+      SELECT w.`msisdn`, w.`ts_kst`,
+             COALESCE(w.`lag_ts`, (
+               SELECT MAX(p.`ts_kst`) FROM `router_info` p WHERE p.`msisdn` = w.`msisdn` AND p.`ts_kst` < %s
+             )) AS `prev_ts`
+      FROM (
+        SELECT r.`msisdn`, r.`ts_kst`, LAG(r.`ts_kst`) OVER (PARTITION BY r.`msisdn` ORDER BY r.`ts_kst`) AS `lag_ts`
+        FROM `router_info` r
+        WHERE r.`ts_kst` >= %s AND r.`ts_kst` < %s AND r.`msisdn` IS NOT NULL{in_msisdns}
+      ) w
+    ) t
+    WHERE t.`ts_kst` >= DATE_ADD(t.`prev_ts`, INTERVAL {OUTAGE_GAP_SEC} SECOND)
+    """
+
+
+def outage_straddle_sql(n_msisdns: int = 0) -> str:
+    """워터마크 wm 을 가로지르는 장애 (wm 이전 마지막 샘플 ~ wm 이후 첫 샘플) -> (msisdn, start_ts, end_ts).
+
+    조회 끝이 wm 이전이면 wm 이후에 끝난 장애 중 조회 구간에 걸치는 것은 이것뿐이라 원본 구간 계산 대신 쓴다.
+    기기마다 idx_msisdn_ts 2회 탐색. 파라미터: (wm, wm, *msisdns)
+    """
+    in_msisdns = f" AND d.`msisdn` IN ({', '.join(['%s'] * n_msisdns)})" if n_msisdns else ""
+    return f"""
+    SELECT t.`msisdn`, DATE_ADD(t.`prev_ts`, INTERVAL {FIVE_MIN} SECOND), t.`next_ts`
+    FROM (
+      SELECT d.`msisdn`,
+             (SELECT MAX(p.`ts_kst`) FROM `router_info` p WHERE p.`msisdn` = d.`msisdn` AND p.`ts_kst` < %s) AS `prev_ts`,
+             (SELECT MIN(p.`ts_kst`) FROM `router_info` p WHERE p.`msisdn` = d.`msisdn` AND p.`ts_kst` >= %s) AS `next_ts`
+      FROM `devices` d
+      WHERE d.`last_seen_ts` IS NOT NULL{in_msisdns}
+    ) t
+    WHERE t.`next_ts` >= DATE_ADD(t.`prev_ts`, INTERVAL {OUTAGE_GAP_SEC} SECOND)
+    """
+
+
+async def latest_samples(cur, msisdns: list) -> dict:
+    """msisdn -> 실제 마지막 샘플 시각. devices.last_seen_ts 는 LAST_SEEN_WRITE_SEC 만큼 늦을 수 있어
+    그 이후만 기기마다 idx_msisdn_ts 로 탐색한다."""
+    out = {}
+    for i in range(0, len(msisdns), 500):
+        chunk = msisdns[i:i + 500]
+        await cur.execute(
+            f"""
+            SELECT d.`msisdn`,
+                   (SELECT MAX(p.`ts_kst`) FROM `router_info` p WHERE p.`msisdn` = d.`msisdn` AND p.`ts_kst` >= d.`last_seen_ts`)
+            FROM `devices` d
+            WHERE d.`msisdn` IN ({", ".join(["%s"] * len(chunk))})
+            """,
+            chunk,
+        )
+        for m, ts in await cur.fetchall():
+            if ts is not None:
+                out[str(m)] = ts
+    return out
+
+
+async def outage_range(cur, lo: datetime, hi: datetime):
+    """[lo, hi) 에서 끝난 장애 구간을 원본에서 다시 계산. 끝 시각 기준이라 구간을 나눠 돌려도 겹치지 않는다."""
+    await cur.execute("DELETE FROM `device_outages` WHERE `end_ts` >= %s AND `end_ts` < %s", (lo, hi))
+    await cur.execute(
+        "INSERT IGNORE INTO `device_outages` (`msisdn`, `start_ts`, `end_ts`)" + outage_select_sql(),
+        (lo, lo, hi),
+    )
+
+
+async def take_late_rows(conn):
+    """insert_db 가 남긴 늦은 행 시간을 꺼내 hourly 워터마크를 그 시간으로 되돌린다.
+
+    INSERT 가 커밋된 뒤에 남긴 기록이므로, 여기서 꺼낸 뒤 시작하는 롤업은 그 행을 본다.
+    꺼낸 뒤에 남긴 기록은 다음 롤업이 처리한다.
+    """
+    async with conn.cursor() as cur:
+        await conn.begin()
+        try:
+            await cur.execute("SELECT `watermark` FROM `rollup_state` WHERE `name` = 'late' FOR UPDATE")
+            row = await cur.fetchone()
+            if row:
+                await cur.execute("DELETE FROM `rollup_state` WHERE `name` = 'late'")
+                await cur.execute(
+                    "UPDATE `rollup_state` SET `watermark` = LEAST(`watermark`, %s) WHERE `name` = 'hourly'",
+                    (row[0],),
+                )
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+
+async def run_rollup(app):
+    """워터마크부터 닫힌 시간까지 ROLLUP_CHUNK_HOURS 단위로 롤업을 전진."""
+    target = rollup_target()
+    async with app.ctx.pool.acquire() as conn:
+        await take_late_rows(conn)
+        # 늦은 행 / backfill-signals / replay 가 워터마크를 되돌릴 수 있으므로 매번 DB에서 읽는다.
+        # 되돌아갔으면 과거 구간 데이터가 바뀐 것이므로 조회 캐시를 비운다
+        prev = app.ctx.rollup_watermark
+        wm = app.ctx.rollup_watermark = await fetch_rollup_watermark(conn)
+        if prev is not None and (wm is None or wm < prev):
+            # 다른 워커는 worker_sync 주기 사이에 워터마크가 다시 전진하면 되돌아간 것을 못 보므로 알린다
+            app.ctx.resp_cache.clear()
+            app.ctx.count_cache.clear()
+            notify_workers()
+        if wm is None:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT `ts_kst` FROM `router_info` ORDER BY `id` ASC LIMIT 1")
+                row = await cur.fetchone()
+            if not row:
+                return
+            wm = floor_day(row[0])
+
+        while wm < target and not app.ctx.rollup_stop.is_set():
+            nxt = min(wm + timedelta(hours=ROLLUP_CHUNK_HOURS), target)
+            await rollup_range(conn, wm, nxt)
+            wm = app.ctx.rollup_watermark = nxt
+
+
+async def rollup_worker(app):
+    """롤업 백그라운드 태스크."""
+    stop = app.ctx.rollup_stop
+    while not stop.is_set():
+        try:
+            await run_rollup(app)
+        except Exception as e:
+            await log_error("ROLLUP_ERROR", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=ROLLUP_INTERVAL_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ====== 아카이브 ======
+# ARCHIVE_DIR/YYYYMM/{msisdn}.parquet. archive_state 에 기록된 달은 연속이며(가장 오래된 달부터),
+# app.ctx.archive_until 이전 구간은 조회 시 Parquet 에서, 이후는 router_info 에서 읽는다.
+
+ARCHIVE_COLS = ("id",) + ROUTER_INFO_COLS
+# 조회 시 ts_kst 대신 요청할 수 있는 가상 컬럼 (KST 벽시계 기준 epoch 초, TS_SEC_EXPR 과 같은 값)
+ARCHIVE_TS_SEC = "ts_sec"
+
+
+def archive_schema():
+    fields = [pa.field("id", pa.int64()), pa.field("ts_kst", pa.timestamp("s"))]
+    for c in ROUTER_INFO_COLS[1:]:
+        if c.endswith("_num"):
+            typ = pa.int16() if SIGNAL_NUM_COLS[c[:-4]][0] == "SMALLINT" else pa.float64()
+        else:
+            typ = pa.string()
+        fields.append(pa.field(c, typ))
+    return pa.schema(fields)
+
+
+def archive_name(msisdn) -> str:
+    """msisdn -> 파일 이름. ASCII 영숫자와 -+ 는 그대로, 나머지는 UTF-8 바이트별 _XX 로 (되돌릴 수 있어 서로 다른 번호가 겹치지 않는다)."""
+    if not msisdn:
+        return "_none"   # _ 뒤가 16진수 두 자리가 아니므로 인코딩 결과와 겹치지 않는다
+    return "".join(
+        ch if ch.isascii() and (ch.isalnum() or ch in "-+") else "".join(f"_{b:02X}" for b in ch.encode())
+        for ch in str(msisdn)
+    )
+
+
+def archive_path(month: datetime, msisdn) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{month:%Y%m}", f"{archive_name(msisdn)}.parquet")
+
+
+def remove_archive_files(msisdn) -> int:
+    """모든 달의 ARCHIVE_DIR/YYYYMM/{msisdn}.parquet 삭제 (기기 cascade 삭제). 지운 파일 수 반환."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return 0
+    removed = 0
+    for name in os.listdir(ARCHIVE_DIR):
+        if not re.fullmatch(r"\d{6}", name):
+            continue
+        try:
+            os.remove(archive_path(datetime.strptime(name, "%Y%m"), msisdn))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def write_archive_file(path: str, rows):
+    """ARCHIVE_COLS 순서의 행 -> zstd Parquet (임시 파일에 쓰고 rename)."""
+    schema = archive_schema()
+    cols = list(zip(*rows))
+    arrays = []
+    for i, field in enumerate(schema):
+        vals = cols[i]
+        if pa.types.is_string(field.type):
+            vals = [None if v is None else str(v) for v in vals]
+        arrays.append(pa.array(vals, type=field.type))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(pa.Table.from_arrays(arrays, schema=schema), tmp, compression="zstd")
+    os.replace(tmp, path)
+
+
+def read_archive_month(month: datetime, msisdn, lo: datetime, hi: datetime, columns) -> list:
+    """한 달치 아카이브에서 [lo, hi) 행을 columns 순서 튜플 리스트로 (ts_kst 오름차순)."""
+    path = archive_path(month, msisdn)
+    if not os.path.exists(path):
+        return []
+    read_cols = ["ts_kst" if c == ARCHIVE_TS_SEC else c for c in columns]
+    table = pq.read_table(
+        path, columns=list(dict.fromkeys(read_cols)),
+        filters=[("ts_kst", ">=", lo), ("ts_kst", "<", hi)],
+    )
+    out = []
+    for c in columns:
+        if c == ARCHIVE_TS_SEC:
+            # Parquet 에는 초 단위 timestamp 가 없어 ms 로 읽히므로 초로 맞춘 뒤 정수로
+            out.append(table.column("ts_kst").cast(pa.timestamp("s")).cast(pa.int64()).to_pylist())
+        else:
+            out.append(table.column(c).to_pylist())
+    return list(zip(*out))
+
+
+def archive_months(lo: datetime, hi: datetime) -> list:
+    """[lo, hi) 와 겹치는 달 시작 시각들."""
+    months, month = [], month_start(lo)
+    while month < hi:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+async def read_archive(msisdn, lo: datetime, hi: datetime, columns):
+    """[lo, hi) 중 아카이브된 부분의 행과, router_info 에서 읽기 시작할 시각 (live_lo)."""
+    until = app.ctx.archive_until
+    if until is None or lo >= until:
+        return [], lo
+    rows = []
+    for month in archive_months(lo, min(hi, until)):
+        rows.extend(await asyncio.to_thread(read_archive_month, month, msisdn, lo, hi, columns))
+    return rows, max(lo, until)
+
+
+async def load_archive_until(app):
+    """archive_state 의 마지막 달 다음 달 시작 (없으면 None)."""
+    try:
+        async with app.ctx.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT MAX(`month`) FROM `archive_state`")
+                row = await cur.fetchone()
+    except Exception as e:
+        await log_error("ARCHIVE_STATE_ERROR", e)
+        return None
+    if not row or row[0] is None:
+        return None
+    return add_months(datetime(row[0].year, row[0].month, 1), 1)
+
+
+async def archive_month(conn, month: datetime) -> int:
+    """한 달치를 기기별 Parquet 로 내보내고 archive_state 에 기록. 내보낸 행 수 반환."""
+    lo, hi = month, add_months(month, 1)
+    cols = ", ".join(f"`{c}`" for c in ARCHIVE_COLS)
+    total = 0
+    async with conn.cursor() as cur:
+        await cur.execute(
+            "SELECT DISTINCT `msisdn` FROM `router_info` WHERE `ts_kst` >= %s AND `ts_kst` < %s", (lo, hi)
+        )
+        msisdns = [r[0] for r in await cur.fetchall()]
+        for msisdn in msisdns:
+            await cur.execute(
+                f"""
+                SELECT {cols} FROM `router_info`
+                WHERE `msisdn` <=> %s AND `ts_kst` >= %s AND `ts_kst` < %s
+                ORDER BY `ts_kst`, `id`
+                """,
+                (msisdn, lo, hi),
+            )
+            rows = await cur.fetchall()
+            if rows:
+                await asyncio.to_thread(write_archive_file, archive_path(month, msisdn), rows)
+                total += len(rows)
+
+        await cur.execute(
+            """
+            INSERT INTO `archive_state` (`month`, `n_rows`, `archived_at`) VALUES (%s, %s, NOW()) AS new
+            ON DUPLICATE KEY UPDATE `n_rows` = new.`n_rows`, `archived_at` = new.`archived_at`, `purged_at` = NULL
+            """,
+            (lo.date(), total),
+        )
+    return total
+
+
+async def purge_archived_month(conn, month: datetime):
+    """아카이브된 달을 router_info 에서 제거 (월 파티션이 있으면 DROP, 없으면 기기별로 나눠 DELETE)."""
+    lo, hi = month, add_months(month, 1)
+    async with conn.cursor() as cur:
+        parts = {name for name, _ in await fetch_partitions(cur)}
+        if f"p{month:%Y%m}" in parts:
+            await cur.execute(f"ALTER TABLE `router_info` DROP PARTITION `p{month:%Y%m}`")
+        else:
+            await cur.execute(
+                "SELECT DISTINCT `msisdn` FROM `router_info` WHERE `ts_kst` >= %s AND `ts_kst` < %s", (lo, hi)
+            )
+            for (msisdn,) in await cur.fetchall():
+                while True:
+                    await cur.execute(
+                        """
+                        DELETE FROM `router_info`
+                        WHERE `msisdn` <=> %s AND `ts_kst` >= %s AND `ts_kst` < %s
+                        LIMIT 5000
+                        """,
+                        (msisdn, lo, hi),
+                    )
+                    if cur.rowcount < 5000:
+                        break
+        await cur.execute("UPDATE `archive_state` SET `purged_at` = NOW() WHERE `month` = %s", (lo.date(),))
+
+
+async def run_archive(app):
+    """롤업이 끝난 달 중 ARCHIVE_MONTHS 보다 오래된 달을 가장 오래된 달부터 하나씩 아카이브."""
+    if ARCHIVE_MONTHS <= 0 or app.ctx.rollup_watermark is None:
+        return
+    # 롤업은 router_info 에서 계산하므로 롤업이 끝난 달만 내보낸다
+    cutoff = min(add_months(month_start(now_kst_naive()), -ARCHIVE_MONTHS), app.ctx.rollup_watermark)
+    stop = app.ctx.archive_stop
+
+    async with app.ctx.pool.acquire() as conn:
+        # 이전 실행이 내보내기 후 삭제 전에 멈췄으면 삭제부터 마친다
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT `month` FROM `archive_state` WHERE `purged_at` IS NULL ORDER BY `month`")
+            pending = [datetime(d.year, d.month, 1) for (d,) in await cur.fetchall()]
+        for month in pending:
+            await purge_archived_month(conn, month)
+
+        while not stop.is_set():
+            month = app.ctx.archive_until
+            if month is None:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT `ts_kst` FROM `router_info` ORDER BY `id` ASC LIMIT 1")
+                    row = await cur.fetchone()
+                if not row:
+                    return
+                month = month_start(row[0])
+            if add_months(month, 1) > cutoff:
+                return
+
+            await archive_month(conn, month)
+            # 이 시점부터 조회는 이 달을 Parquet 에서 읽으므로 아래 삭제 도중에도 결과가 같다
+            app.ctx.archive_until = add_months(month, 1)
+            if app.ctx.workers > 1:
+                # 다른 워커가 worker_sync 로 새 경계를 읽을 때까지 기다린 뒤 삭제
+                await asyncio.sleep(WORKER_SYNC_SEC * 2 + 1)
+            await purge_archived_month(conn, month)
+
+
+async def archive_worker(app):
+    """콜드 데이터 아카이브 백그라운드 태스크."""
+    stop = app.ctx.archive_stop
+    while not stop.is_set():
+        try:
+            await run_archive(app)
+        except Exception as e:
+            await log_error("ARCHIVE_ERROR", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=ARCHIVE_CHECK_SEC)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ====== 실시간 스트림 ======
+
+# /api/records 와 같은 컬럼 (id 는 DB INSERT 전이라 없음)
+STREAM_RECORD_COLS = (
+    "ts_kst", "datetime_str", "system", "plmn", "band", "earfcn_dl", "earfcn_ul",
+    "bandwidth", "cell_id", "pci", "drx", "rsrp", "rsrq", "rssi", "tac", "sinr", "rrc_st", "emc_st",
+    "scell_band", "scell_bw", "scell_status", "latitude", "longitude", "ip_v4",
+)
+STREAM_RECORD_IDX = tuple(ROUTER_INFO_COLS.index(c) for c in STREAM_RECORD_COLS)
+STREAM_SIGNAL_KEYS = tuple(key for col, key in SIGNAL_METRICS)
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode()
+
+
+def sample_event(row: tuple) -> bytes:
+    """수집 행 -> SSE `sample` 이벤트. /api/metrics/raw 포인트 + /api/records 행 형식."""
+    data = {"msisdn": str(row[MSISDN_IDX]), "ts": row[TS_IDX], "is_fake": False}
+    data.update(zip(STREAM_SIGNAL_KEYS, (row[i] for i in SIGNAL_NUM_IDX)))
+    data["record"] = dict(zip(STREAM_RECORD_COLS, (row[i] for i in STREAM_RECORD_IDX)))
+    return sse_event("sample", data)
 
 
-# ====== 데이터 수집 ======
+class StreamClient:
+    def __init__(self, msisdns):
+        self.msisdns = msisdns
+        self.queue = asyncio.Queue(maxsize=STREAM_QUEUE_MAX)
+        self.lagged = False   # 큐가 넘쳐 이벤트를 버렸으면 다음에 resync 를 보낸다
 
-async def append_raw(body: bytes, log_dir: str, ts_kst: datetime):
-    """요청 바디 앞에 KST 타임스탬프 붙여서 파일에 append."""
-    date_str = ts_kst.strftime("%Y%m%d")
-    ts_str = ts_kst.strftime("%Y-%m-%d %H:%M:%S")
-    path = os.path.join(log_dir, f"{date_str}.log")
-    async with aiofiles.open(path, "ab") as f:
-        line = f"[{ts_str}] ".encode() + (body or b"")
-        if not line.endswith(b"\n"):
-            line += b"\n"
-        await f.write(line)
-
-
-async def insert_db(request: Request, ts_kst: datetime, body: bytes):
-    """JSON이면 각 필드 매핑하여 router_info에 INSERT."""
-    pool = app.ctx.pool
-    client_ip = request.remote_addr or None
-    ts_str = ts_kst.strftime("%Y-%m-%d %H:%M:%S")
 
-    row = {
-        "ts_kst": ts_str,
-        "datetime_str": None, "msisdn": None, "system": None, "plmn": None,
-        "band": None, "earfcn_dl": None, "earfcn_ul": None, "bandwidth": None,
-        "cell_id": None, "pci": None, "drx": None, "rsrp": None, "rsrq": None,
-        "rssi": None, "tac": None, "sinr": None, "rrc_st": None, "emc_st": None,
-        "scell_band": None, "scell_bw": None, "scell_status": None,
-        "latitude": None, "longitude": None, "ip_v4": None,
-        "client_ip": client_ip, "raw_json": None,
-    }
+class StreamHub:
+    """프로세스 내 pub/sub. msisdn 별 구독자에게 수집 행을 팬아웃하고 느린 클라이언트는 오래된 이벤트부터 버린다."""
 
-    try:
-        payload = json.loads(body.decode("utf-8"))
-        row["datetime_str"] = payload.get("DATETIME")
-        row["msisdn"]       = payload.get("MSISDN")
-        row["system"]       = payload.get("SYSTEM")
-        row["plmn"]         = payload.get("PLMN")
-        row["band"]         = payload.get("Band")
-        row["earfcn_dl"]    = payload.get("EARFCN_DL")
-        row["earfcn_ul"]    = payload.get("EARFCN_UL")
-        row["bandwidth"]    = payload.get("Bandwidth")
-        row["cell_id"]      = payload.get("Cell_ID")
-        row["pci"]          = payload.get("PCI")
-        row["drx"]          = payload.get("DRX")
-        row["rsrp"]         = payload.get("RSRP")
-        row["rsrq"]         = payload.get("RSRQ")
-        row["rssi"]         = payload.get("RSSI")
-        row["tac"]          = payload.get("TAC")
-        row["sinr"]         = payload.get("SINR")
-        row["rrc_st"]       = payload.get("RRC_ST")
-        row["emc_st"]       = payload.get("EMC_ST")
-        row["scell_band"]   = payload.get("SCELL_BAND")
-        row["scell_bw"]     = payload.get("SCELL_BW")
-        row["scell_status"] = payload.get("SCELL_STATUS")
-        row["latitude"]     = payload.get("LATITUDE")
-        row["longitude"]    = payload.get("LONGITUDE")
-        row["ip_v4"]        = payload.get("IP_v4")
-        row["raw_json"]     = json.dumps(payload, ensure_ascii=False)
-    except Exception:
-        pass
+    def __init__(self):
+        self.subs = {}   # msisdn -> set(StreamClient)
+        self.clients = 0
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "rejected": 0, "peer_dropped": 0}
+        # 다중 워커: 슬롯별 multiprocessing.Queue 와 구독자 수 배열 (attach_peers)
+        self.slot = 0
+        self.peer_queues = None
+        self.peer_clients = None
 
-    sql = """
-    INSERT INTO `router_info` (
-      `ts_kst`, `datetime_str`, `msisdn`, `system`, `plmn`, `band`,
-      `earfcn_dl`, `earfcn_ul`, `bandwidth`, `cell_id`, `pci`, `drx`,
-      `rsrp`, `rsrq`, `rssi`, `tac`, `sinr`, `rrc_st`, `emc_st`,
-      `scell_band`, `scell_bw`, `scell_status`, `latitude`, `longitude`,
-      `ip_v4`, `client_ip`, `raw_json`
-    ) VALUES (
-      %(ts_kst)s, %(datetime_str)s, %(msisdn)s, %(system)s, %(plmn)s, %(band)s,
-      %(earfcn_dl)s, %(earfcn_ul)s, %(bandwidth)s, %(cell_id)s, %(pci)s, %(drx)s,
-      %(rsrp)s, %(rsrq)s, %(rssi)s, %(tac)s, %(sinr)s, %(rrc_st)s, %(emc_st)s,
-      %(scell_band)s, %(scell_bw)s, %(scell_status)s, %(latitude)s, %(longitude)s,
-      %(ip_v4)s, %(client_ip)s, %(raw_json)s
-    )
-    """
-    async with pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            if row["msisdn"]:
-                await cur.execute(
-                    """
-                    INSERT INTO devices (msisdn, dormant, dormant_at) VALUES (%s, 0, NULL) AS new
-                    ON DUPLICATE KEY UPDATE
-                    msisdn = new.msisdn,
-                    dormant = 0,
-                    dormant_at = NULL
-                    """,
-                    (row["msisdn"],)
-                )
-            await cur.execute(sql, row)
+    def attach_peers(self, slot: int, queues, clients):
+        self.slot, self.peer_queues, self.peer_clients = slot, queues, clients
 
+    def subscribe(self, msisdns):
+        if self.clients >= STREAM_MAX_CLIENTS:
+            self.stats["rejected"] += 1
+            return None
+        client = StreamClient(msisdns)
+        for m in msisdns:
+            self.subs.setdefault(m, set()).add(client)
+        self.clients += 1
+        self._share_count()
+        return client
 
-@app.route("/<path:path>", methods=["POST", "PUT", "PATCH"], name="log_any_path")
-@app.route("/", methods=["POST", "PUT", "PATCH"], name="log_any_root")
-async def log_any(request: Request, path: str = ""):
-    ts_kst = datetime.now(tz=KST)
-    body = request.body or b""
+    def unsubscribe(self, client: StreamClient):
+        for m in client.msisdns:
+            subs = self.subs.get(m)
+            if subs is not None:
+                subs.discard(client)
+                if not subs:
+                    del self.subs[m]
+        self.clients -= 1
+        self._share_count()
 
-    await append_raw(body, app.ctx.log_dir, ts_kst)
+    def _share_count(self):
+        if self.peer_clients is not None:
+            self.peer_clients[self.slot] = self.clients
 
-    try:
-        await insert_db(request, ts_kst, body)
-    except Exception as e:
-        await log_error("DB_ERROR", e)
+    def publish(self, row: tuple):
+        """이 워커의 구독자 + 구독자가 있는 다른 워커로 전달."""
+        self.deliver(row)
+        if self.peer_queues is None:
+            return
+        counts = self.peer_clients.get_obj()   # 읽기만 하므로 잠금 없이
+        for slot, q in enumerate(self.peer_queues):
+            if slot != self.slot and counts[slot] > 0:
+                try:
+                    q.put_nowait(row)
+                except queue.Full:
+                    self.stats["peer_dropped"] += 1
 
-    return response.text("ok\n")
+    async def peer_reader(self, stop: asyncio.Event):
+        """다른 워커가 보낸 행을 이 워커의 구독자에게 전달하는 태스크."""
+        q = self.peer_queues[self.slot]
+        while not stop.is_set():
+            try:
+                row = await asyncio.to_thread(q.get, True, 0.5)
+            except queue.Empty:
+                continue
+            self.deliver(row)
+
+    def deliver(self, row: tuple):
+        subs = self.subs.get(str(row[MSISDN_IDX]))
+        if not subs:
+            return
+        payload = sample_event(row)   # 구독자가 여럿이어도 직렬화는 한 번
+        self.stats["published"] += 1
+        for client in subs:
+            q = client.queue
+            if q.full():
+                q.get_nowait()
+                client.lagged = True
+                self.stats["dropped"] += 1
+            q.put_nowait(payload)
+            self.stats["delivered"] += 1
+
+    def close(self):
+        """서버 종료: 모든 스트림 핸들러가 끝나도록 None 을 넣는다."""
+        for client in {c for subs in self.subs.values() for c in subs}:
+            if client.queue.full():
+                client.queue.get_nowait()
+            client.queue.put_nowait(None)
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, clients=self.clients, msisdns=len(self.subs))
 
 
 # ====== API 엔드포인트 ======
 
 # 1) 기기 리스트
+
+def _last_seen_minutes(r, now):
+    ts = r["last_seen_ts"]
+    return None if ts is None else int((now - ts).total_seconds() // 60)
+
+
+# list_msisdns 의 fields 파라미터로 고를 수 있는 추가 필드 -> (devices 행, 현재 시각) 으로 값 계산
+DEVICE_FIELDS = {
+    "last_seen": lambda r, now: r["last_seen_ts"].strftime("%Y-%m-%d %H:%M:%S") if r["last_seen_ts"] else None,
+    "minutes_since": _last_seen_minutes,
+    **{f"last_{c}": (lambda r, now, c=c: r[f"last_{c}"]) for c in SIGNAL_NUM_COLS},
+}
+
 @app.get("/api/msisdns", name="list_msisdns")
+@cached_response
 async def list_msisdns(req: Request):
     include_dormant = (req.args.get("include_dormant", "0") in ("1", "true", "yes"))
 
-    cutoff_dt = (datetime.now(tz=KST) - timedelta(hours=24)).strftime("%Y-%m-%d %H:%M:%S")
+    # fields=last_seen,last_rsrp,minutes_since ... : devices 행에 이미 있는 값이라 추가 비용 없음
+    fields = [f.strip() for f in (req.args.get("fields") or "").split(",") if f.strip()]
+    unknown = [f for f in fields if f not in DEVICE_FIELDS]
+    if unknown:
+        raise InvalidUsage("unknown fields: " + ", ".join(unknown) + " (allowed: " + ", ".join(DEVICE_FIELDS) + ")")
+
+    now = now_kst_naive()
+    cutoff_dt = (now - timedelta(hours=24)).strftime("%Y-%m-%d %H:%M:%S")
 
     where_dormant = "" if include_dormant else "WHERE d.dormant = 0"
 
@@ -231,11 +3062,9 @@ async def list_msisdns(req: Request):
       d.msisdn,
       d.alias,
       d.dormant,
-      EXISTS(
-        SELECT 1 FROM router_info r
-        WHERE r.msisdn = d.msisdn
-          AND r.ts_kst >= %s
-      ) AS has_recent
+      COALESCE(d.last_seen_ts >= %s, 0) AS has_recent,
+      d.last_seen_ts,
+      {", ".join(f"d.last_{c}" for c in SIGNAL_NUM_COLS)}
     FROM devices d
     {where_dormant}
     ORDER BY
@@ -244,23 +3073,29 @@ async def list_msisdns(req: Request):
       d.msisdn ASC
     """
 
-    async with app.ctx.pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cur:
+    async with app.ctx.read_pool.acquire() as conn:
+        async with conn.cursor(TimedDictCursor) as cur:
             await cur.execute(sql, (cutoff_dt,))
             rows = await cur.fetchall()
 
-    devices = [{
-        "msisdn": r["msisdn"],
-        "alias": r["alias"],
-        "dormant": bool(r["dormant"]),
-        "has_recent": bool(r["has_recent"]),
-    } for r in rows]
+    devices = []
+    for r in rows:
+        item = {
+            "msisdn": r["msisdn"],
+            "alias": r["alias"],
+            "dormant": bool(r["dormant"]),
+            "has_recent": bool(r["has_recent"]),
+        }
+        for f in fields:
+            item[f] = DEVICE_FIELDS[f](r, now)
+        devices.append(item)
 
     return response.json({"devices": devices})
 
 
 # 2) 일별 평균
 @app.get("/api/metrics/daily_avg", name="daily_avg")
+@cached_response
 async def daily_avg(req: Request):
     msisdn = req.args.get("msisdn")
     raw_days = (req.args.get("days", "7") or "7").strip()
@@ -271,22 +3106,30 @@ async def daily_avg(req: Request):
     if not msisdn:
         raise InvalidUsage("msisdn is required")
 
-    has_range = bool(start and end)
-    sql = build_avg_sql("DATE(`ts_kst`)", "d", has_range)
-    params = (msisdn, start, end) if has_range else (msisdn, days)
+    fmt = parse_format(req)
+    lo, hi = resolve_range(days, start, end)
+    sql = build_avg_sql("d")
+    params = build_avg_params("d", msisdn, lo, hi, read_watermark(app))
 
     try:
-        async with app.ctx.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
+        async with app.ctx.read_pool.acquire() as conn:
+            async with conn.cursor(TimedDictCursor) as cur:
                 await cur.execute(sql, params)
                 rows = await cur.fetchall()
 
-        for r in rows:
-            if hasattr(r.get("d"), "strftime"):
-                r["d"] = r["d"].strftime("%Y-%m-%d")
         rows_decimal_to_float(rows)
+        out = {"msisdn": msisdn, "days": days, "start": start, "end": end}
+        if fmt == "columnar":
+            out.update(avg_columnar(rows, "d", wants_msgpack(req)))
+        else:
+            for r in rows:
+                if hasattr(r.get("d"), "strftime"):
+                    r["d"] = r["d"].strftime("%Y-%m-%d")
+            out["data"] = rows
 
-        return response.json({"msisdn": msisdn, "days": days, "start": start, "end": end, "data": rows})
+        return encode_response(req, out)
+    except PoolBusy:
+        raise   # 503 (handle_pool_busy)
     except Exception as e:
         await log_error("DAILY_AVG_ERROR", e)
         return response.json({"error": "query_failed", "detail": repr(e)}, status=500)
@@ -294,6 +3137,7 @@ async def daily_avg(req: Request):
 
 # 2-1) 시간별 평균
 @app.get("/api/metrics/hourly_avg", name="hourly_avg")
+@cached_response
 async def hourly_avg(req: Request):
     msisdn = req.args.get("msisdn")
     raw_days = (req.args.get("days", "7") or "7").strip()
@@ -304,26 +3148,51 @@ async def hourly_avg(req: Request):
     if not msisdn:
         raise InvalidUsage("msisdn is required")
 
-    has_range = bool(start and end)
-    sql = build_avg_sql(r"DATE_FORMAT(`ts_kst`, '%%Y-%%m-%%d %%H:00:00')", "h", has_range)
-    params = (msisdn, start, end) if has_range else (msisdn, days)
+    fmt = parse_format(req)
+    lo, hi = resolve_range(days, start, end)
+    sql = build_avg_sql("h")
+    params = build_avg_params("h", msisdn, lo, hi, read_watermark(app))
 
     try:
-        async with app.ctx.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
+        async with app.ctx.read_pool.acquire() as conn:
+            async with conn.cursor(TimedDictCursor) as cur:
                 await cur.execute(sql, params)
                 rows = await cur.fetchall()
 
         rows_decimal_to_float(rows)
+        out = {"msisdn": msisdn, "days": days, "start": start, "end": end}
+        if fmt == "columnar":
+            out.update(avg_columnar(rows, "h", wants_msgpack(req)))
+        else:
+            out["data"] = rows
 
-        return response.json({"msisdn": msisdn, "days": days, "start": start, "end": end, "data": rows})
+        return encode_response(req, out)
+    except PoolBusy:
+        raise   # 503 (handle_pool_busy)
     except Exception as e:
         await log_error("HOURLY_AVG_ERROR", e)
         return response.json({"error": "query_failed", "detail": repr(e)}, status=500)
 
 
+def parse_downsample_args(req: Request):
+    """max_points 가 있으면 결측 채우기 후 모양을 유지하는 다운샘플 적용 (minmax | lttb)."""
+    try:
+        max_points = int(req.args.get("max_points", "0") or 0)
+    except ValueError:
+        raise InvalidUsage("max_points must be an integer")
+    ds_method = (req.args.get("downsample") or "minmax").lower()
+    if ds_method not in DOWNSAMPLERS:
+        raise InvalidUsage("downsample must be one of: " + ", ".join(DOWNSAMPLERS))
+    if 0 < max_points < DOWNSAMPLE_MIN_POINTS[ds_method]:
+        raise InvalidUsage(f"max_points must be 0 or >= {DOWNSAMPLE_MIN_POINTS[ds_method]} for {ds_method}")
+    return max_points, ds_method
+
+
 # 2-2) 원시 시계열
+RAW_ARCHIVE_COLS = (ARCHIVE_TS_SEC, "rsrp_num", "rsrq_num", "sinr_num", "rssi_num")
+
 @app.get("/api/metrics/raw", name="metrics_raw")
+@cached_response
 async def metrics_raw(req: Request):
     msisdn = req.args.get("msisdn")
     days   = int(req.args.get("days", "7"))
@@ -333,139 +3202,287 @@ async def metrics_raw(req: Request):
     if not msisdn:
         raise InvalidUsage("msisdn is required")
 
-    if start and end:
-        sql = """
-        SELECT
-          ts_kst,
-          CAST(NULLIF(rsrp,'')  AS DECIMAL(10,3)) AS rsrp,
-          CAST(NULLIF(rsrq,'')  AS DECIMAL(10,3)) AS rsrq,
-          CAST(NULLIF(sinr,'')  AS DECIMAL(10,3)) AS sinr,
-          CAST(NULLIF(rssi,'')  AS DECIMAL(10,3)) AS router_rssi
-        FROM router_info
-        WHERE msisdn = %s
-          AND ts_kst >= %s
-          AND ts_kst < DATE_ADD(%s, INTERVAL 1 DAY)
-        ORDER BY ts_kst ASC
-        """
-        params = (msisdn, start, end)
-        try:
-            range_end_boundary = datetime.strptime(end, "%Y-%m-%d").replace(tzinfo=KST) + timedelta(days=1)
-        except Exception:
-            range_end_boundary = datetime.now(tz=KST)
-    else:
-        cutoff = (datetime.now(tz=KST) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
-        sql = """
-        SELECT
-          ts_kst,
-          CAST(NULLIF(rsrp,'')  AS DECIMAL(10,3)) AS rsrp,
-          CAST(NULLIF(rsrq,'')  AS DECIMAL(10,3)) AS rsrq,
-          CAST(NULLIF(sinr,'')  AS DECIMAL(10,3)) AS sinr,
-          CAST(NULLIF(rssi,'')  AS DECIMAL(10,3)) AS router_rssi
-        FROM router_info
-        WHERE msisdn = %s
-          AND ts_kst >= %s
-        ORDER BY ts_kst ASC
-        """
-        params = (msisdn, cutoff)
-        range_end_boundary = datetime.now(tz=KST)
+    max_points, ds_method = parse_downsample_args(req)
+    fmt = parse_format(req)
+    lo, hi, now = raw_range(days, start, end)
+
+    sql = f"""
+    SELECT
+      {TS_SEC_EXPR} AS ts_sec,
+      rsrp_num AS rsrp,
+      rsrq_num AS rsrq,
+      sinr_num AS sinr,
+      rssi_num AS router_rssi
+    FROM router_info
+    WHERE msisdn = %s
+      AND ts_kst >= %s
+      AND ts_kst < %s
+    ORDER BY ts_kst ASC
+    """
 
     try:
-        async with app.ctx.pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute(sql, params)
-                rows = await cur.fetchall()
+        rows, live_lo = await read_archive(msisdn, lo, hi, RAW_ARCHIVE_COLS)
+        async with app.ctx.read_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, (msisdn, live_lo, hi))
+                rows += await cur.fetchall()
 
-        def to_float(v):
-            if v is None:
-                return None
-            try:
-                return float(v)
-            except Exception:
-                return None
-
-        raw_points = []
-        for r in rows:
-            ts_dt = r["ts_kst"]
-            if isinstance(ts_dt, datetime) and ts_dt.tzinfo is None:
-                ts_dt = ts_dt.replace(tzinfo=KST)
-            raw_points.append({
-                "ts": ts_dt,
-                "rsrp": to_float(r.get("rsrp")),
-                "rsrq": to_float(r.get("rsrq")),
-                "sinr": to_float(r.get("sinr")),
-                "router_rssi": to_float(r.get("router_rssi")),
-                "is_fake": False,
-            })
-
-        filled = []
-        FIVE_MIN = 300
-
-        prev = None
-        for p in raw_points:
-            if prev is not None:
-                delta_sec = (p["ts"] - prev["ts"]).total_seconds()
-                gaps = int(delta_sec // FIVE_MIN) - 1
-                if gaps > 0:
-                    for i in range(1, gaps + 1):
-                        ts_fake = prev["ts"] + timedelta(minutes=5 * i)
-                        filled.append({
-                            "ts": ts_fake,
-                            "rsrp": -125.0,
-                            "rsrq": -15.0,
-                            "sinr": 5.0,
-                            "router_rssi": -100.0,
-                            "is_fake": True,
-                        })
-            filled.append(p)
-            prev = p
-
-        if raw_points:
-            last = raw_points[-1]
-            now_kst = datetime.now(tz=KST)
-            tail_to = min(range_end_boundary, now_kst)
-
-            if tail_to > last["ts"]:
-                delta_sec = (tail_to - last["ts"]).total_seconds()
-                gaps_tail = int(delta_sec // FIVE_MIN) - 1
-                if gaps_tail > 0:
-                    for i in range(1, gaps_tail + 1):
-                        ts_fake = last["ts"] + timedelta(minutes=5 * i)
-                        if ts_fake >= tail_to:
-                            break
-                        filled.append({
-                            "ts": ts_fake,
-                            "rsrp": -125.0,
-                            "rsrq": -15.0,
-                            "sinr": 5.0,
-                            "router_rssi": -100.0,
-                            "is_fake": True,
-                        })
+        ts, vals = rows_to_columns(rows)
+        ts, vals, is_fake = gap_fill(ts, vals, wall_seconds(min(hi, now)))
+        total = len(ts)
+        ts, vals, is_fake = downsample(ts, vals, is_fake, max_points, ds_method)
+
+        out = {"msisdn": msisdn, "days": days, "start": start, "end": end, "total_points": total}
+        if fmt == "columnar":
+            out.update(columnar_payload(ts, dict(zip(RAW_KEYS, vals.T)), is_fake, wants_msgpack(req)))
         else:
-            filled = []
+            out["data"] = format_points(ts, vals, is_fake)
 
-        filled.sort(key=lambda x: x["ts"])
+        return encode_response(req, out)
+    except PoolBusy:
+        raise   # 503 (handle_pool_busy)
+    except Exception as e:
+        await log_error("METRICS_RAW_ERROR", e)
+        return response.json({"error": "query_failed", "detail": repr(e)}, status=500)
 
-        out = []
-        for p in filled:
-            out.append({
-                "ts": p["ts"].strftime("%Y-%m-%d %H:%M:%S"),
-                "rsrp": p["rsrp"],
-                "rsrq": p["rsrq"],
-                "sinr": p["sinr"],
-                "router_rssi": p["router_rssi"],
-                "is_fake": p["is_fake"],
-            })
 
+# 2-3) 여러 기기 한 번에: msisdn IN (...) 쿼리 1회, 기기별 컬럼 배열 응답
+BATCH_METRICS = ("hourly_avg", "daily_avg", "raw")
+
+
+@app.get("/api/metrics/batch", name="metrics_batch")
+@cached_response
+async def metrics_batch(req: Request):
+    metric = req.args.get("metric", "hourly_avg")
+    msisdns = list(dict.fromkeys(m.strip() for m in (req.args.get("msisdns") or "").split(",") if m.strip()))
+    raw_days = (req.args.get("days", "7") or "7").strip()
+    days = int(float(raw_days or 7))
+    start = req.args.get("start")
+    end   = req.args.get("end")
+
+    if metric not in BATCH_METRICS:
+        raise InvalidUsage("metric must be one of: " + ", ".join(BATCH_METRICS))
+    if not msisdns:
+        raise InvalidUsage("msisdns is required (comma separated)")
+    if len(msisdns) > METRICS_BATCH_MAX:
+        raise InvalidUsage(f"too many msisdns (max {METRICS_BATCH_MAX})")
+    max_points, ds_method = parse_downsample_args(req)
+
+    out = {"metric": metric, "days": days, "start": start, "end": end}
+    try:
+        if metric == "raw":
+            lo, hi, now = raw_range(days, start, end)
+            by_msisdn = {}
+            live_lo = lo
+            for m in msisdns:
+                by_msisdn[m], live_lo = await read_archive(m, lo, hi, RAW_ARCHIVE_COLS)
+            sql = f"""
+            SELECT
+              msisdn,
+              {TS_SEC_EXPR} AS ts_sec,
+              rsrp_num, rsrq_num, sinr_num, rssi_num
+            FROM router_info
+            WHERE msisdn IN ({", ".join(["%s"] * len(msisdns))})
+              AND ts_kst >= %s
+              AND ts_kst < %s
+            ORDER BY msisdn, ts_kst ASC
+            """
+            async with app.ctx.read_pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(sql, (*msisdns, live_lo, hi))
+                    rows = await cur.fetchall()
+
+            for r in rows:
+                by_msisdn.setdefault(r[0], []).append(r[1:])
+
+            tail_to = wall_seconds(min(hi, now))
+            devices, totals = {}, {}
+            for m, dev_rows in by_msisdn.items():
+                ts, vals = rows_to_columns(dev_rows)
+                ts, vals, is_fake = gap_fill(ts, vals, tail_to)
+                totals[m] = len(ts)
+                devices[m] = format_columns(*downsample(ts, vals, is_fake, max_points, ds_method))
+            out.update(devices=devices, total_points=totals)
+        else:
+            bucket = "d" if metric == "daily_avg" else "h"
+            lo, hi = resolve_range(days, start, end)
+            sql = build_avg_sql(bucket, batch=len(msisdns))
+            params = build_avg_params(bucket, msisdns, lo, hi, read_watermark(app))
+            async with app.ctx.read_pool.acquire() as conn:
+                async with conn.cursor(TimedDictCursor) as cur:
+                    await cur.execute(sql, params)
+                    rows = await cur.fetchall()
+
+            rows_decimal_to_float(rows)
+            keys = (bucket,) + tuple(f"{key}_avg" for _, key in SIGNAL_METRICS)
+            devices = {m: {k: [] for k in keys} for m in msisdns}
+            for r in rows:
+                if hasattr(r.get("d"), "strftime"):
+                    r["d"] = r["d"].strftime("%Y-%m-%d")
+                cols = devices.setdefault(r["msisdn"], {k: [] for k in keys})
+                for k in keys:
+                    cols[k].append(r[k])
+            out["devices"] = devices
+
+        return response.json(out)
+    except PoolBusy:
+        raise   # 503 (handle_pool_busy)
+    except Exception as e:
+        await log_error("METRICS_BATCH_ERROR", e)
+        return response.json({"error": "query_failed", "detail": repr(e)}, status=500)
+
+
+# 2-4) 가용성: 기기별 장애 구간으로 가동률 / 장애 횟수·시간 / 최장 장애
+def fmt_dt(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S") if dt else None
+
+
+def outage_stats(spans, lo: datetime, hi: datetime) -> dict:
+    """장애 구간 [(start, end), ...] 를 [lo, hi) 로 잘라 가동률과 장애 합계/최장을 계산."""
+    window = (hi - lo).total_seconds()
+    total, count, longest = 0.0, 0, None
+    for s, e in spans:
+        sec = (min(e, hi) - max(s, lo)).total_seconds()
+        if sec <= 0:
+            continue
+        total += sec
+        count += 1
+        if longest is None or sec > longest[0]:
+            longest = (sec, s, e)
+    return {
+        "uptime_pct": round(100.0 * (1 - total / window), 3) if window > 0 else None,
+        "outage_count": count,
+        "outage_sec": int(total),
+        "longest_sec": int(longest[0]) if longest else 0,
+        "longest_start": fmt_dt(longest[1]) if longest else None,
+        "longest_end": fmt_dt(longest[2]) if longest else None,
+    }
+
+
+@timed_stage("outages")
+def summarize_outages(devices, spans, lo: datetime, hi: datetime, by_day: bool):
+    """devices 행(msisdn, alias) 과 기기별 장애 구간 -> 기기별(by_day 면 날짜별 포함) 통계와 전체 요약."""
+    out = []
+    for msisdn, alias in devices:
+        mine = spans.get(msisdn, [])
+        item = {"msisdn": msisdn, "alias": alias, **outage_stats(mine, lo, hi)}
+        item["ongoing"] = any(s < hi <= e for s, e in mine)
+        if by_day:
+            days, d = [], floor_day(lo)
+            while d < hi:
+                nxt = d + timedelta(days=1)
+                day_spans = [sp for sp in mine if sp[0] < nxt and sp[1] > d]
+                days.append({"date": d.strftime("%Y-%m-%d"), **outage_stats(day_spans, max(d, lo), min(nxt, hi))})
+                d = nxt
+            item["days"] = days
+        out.append(item)
+    out.sort(key=lambda x: (x["uptime_pct"] if x["uptime_pct"] is not None else 101, x["msisdn"]))
+
+    worst = max(out, key=lambda x: x["longest_sec"], default=None)
+    ups = [x["uptime_pct"] for x in out if x["uptime_pct"] is not None]
+    fleet = {
+        "devices": len(out),
+        "uptime_pct": round(sum(ups) / len(ups), 3) if ups else None,
+        "outage_count": sum(x["outage_count"] for x in out),
+        "outage_sec": sum(x["outage_sec"] for x in out),
+        "longest_sec": worst["longest_sec"] if worst else 0,
+        "longest_msisdn": worst["msisdn"] if worst and worst["longest_sec"] else None,
+    }
+    return out, fleet
+
+
+@app.get("/api/outages", name="outages")
+@cached_response
+async def outages(req: Request):
+    """기기별 가용성. 롤업 워터마크 이전은 device_outages, 이후는 원본에서 같은 계산, 진행 중 장애는 last_seen_ts 로.
+
+    첫 수신 전 기간은 가동으로 계산하고, 한 번도 수신하지 않은 기기는 제외한다.
+    스풀 적재가 OUTAGE_GAP_SEC 넘게 밀려 있으면 last_seen_ts 가 실제보다 이르므로 진행 중 장애는
+    적재가 끝난 시각(스풀 맨 앞 행)까지만 세고 ongoing_suppressed 로 알린다.
+    """
+    msisdns = list(dict.fromkeys(m.strip() for m in (req.args.get("msisdns") or "").split(",") if m.strip()))
+    raw_days = (req.args.get("days", "7") or "7").strip()
+    days = int(float(raw_days or 7))
+    start = req.args.get("start")
+    end   = req.args.get("end")
+    by = (req.args.get("by") or "device").lower()
+    include_dormant = (req.args.get("include_dormant", "0") in ("1", "true", "yes"))
+
+    if by not in ("device", "day"):
+        raise InvalidUsage("by must be one of: device, day")
+    if len(msisdns) > METRICS_BATCH_MAX:
+        raise InvalidUsage(f"too many msisdns (max {METRICS_BATCH_MAX})")
+
+    lo, hi = resolve_range(days, start, end)
+    now = now_kst_naive()
+    until = min(hi, now)
+    wm = read_watermark(app)
+    live_lo = max(lo, wm) if wm else lo
+    lag = app.ctx.spool.snapshot()["lag_sec"]
+    seen_until = now - timedelta(seconds=lag) if lag > OUTAGE_GAP_SEC else now
+
+    in_msisdns = f" AND `msisdn` IN ({', '.join(['%s'] * len(msisdns))})" if msisdns else ""
+    dev_sql = f"""
+    SELECT `msisdn`, `alias`, `last_seen_ts` FROM `devices`
+    WHERE `last_seen_ts` IS NOT NULL{"" if include_dormant else " AND `dormant` = 0"}{in_msisdns}
+    """
+    stored_sql = f"""
+    SELECT `msisdn`, `start_ts`, `end_ts` FROM `device_outages`
+    WHERE `end_ts` > %s AND `end_ts` < %s AND `start_ts` < %s{in_msisdns}
+    """
+
+    try:
+        async with app.ctx.read_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(dev_sql, msisdns)
+                devices = await cur.fetchall()
+                await cur.execute(stored_sql, (lo, live_lo, until, *msisdns))
+                rows = list(await cur.fetchall())
+                if live_lo < until or wm is None:
+                    await cur.execute(outage_select_sql(len(msisdns)), (live_lo, live_lo, now, *msisdns))
+                    rows += await cur.fetchall()
+                elif wm is not None and wm < now:
+                    # 조회 끝이 워터마크 이전: 워터마크 이후 원본은 wm 을 가로지르는 장애만 보면 된다
+                    await cur.execute(outage_straddle_sql(len(msisdns)), (wm, wm, *msisdns))
+                    rows += await cur.fetchall()
+                # last_seen_ts 는 기록 간격만큼 늦을 수 있으므로 장애로 보이는 기기만 원본의 마지막 샘플로 확인
+                stale = [str(m) for m, _, ls in devices if (seen_until - ls).total_seconds() >= OUTAGE_GAP_SEC]
+                latest = await latest_samples(cur, stale) if stale and LAST_SEEN_WRITE_SEC > 0 else {}
+
+        spans = {}
+        for m, s, e in rows:
+            spans.setdefault(str(m), []).append((s, e))
+        for m, _, last_seen in devices:
+            # 아직 끝나지 않은 장애: 마지막 수신 + 5분부터 지금까지 (적재가 밀려 있으면 seen_until 까지)
+            last_seen = max(last_seen, latest.get(str(m), last_seen))
+            if (seen_until - last_seen).total_seconds() >= OUTAGE_GAP_SEC:
+                spans.setdefault(str(m), []).append((last_seen + timedelta(seconds=FIVE_MIN), seen_until))
+        for v in spans.values():
+            v.sort()
+
+        result, fleet = summarize_outages(
+            [(str(m), alias) for m, alias, _ in devices], spans, lo, until, by == "day",
+        )
         return response.json({
-            "msisdn": msisdn, "days": days,
-            "start": start, "end": end, "data": out,
+            "start": fmt_dt(lo), "end": fmt_dt(until), "by": by, "gap_sec": OUTAGE_GAP_SEC,
+            "ingest_lag_sec": round(lag, 1), "ongoing_suppressed": seen_until < now,
+            "fleet": fleet, "devices": result,
         })
+    except PoolBusy:
+        raise   # 503 (handle_pool_busy)
     except Exception as e:
-        await log_error("METRICS_RAW_ERROR", e)
+        await log_error("OUTAGES_ERROR", e)
         return response.json({"error": "query_failed", "detail": repr(e)}, status=500)
 
 
 # 3) 상세 레코드 (페이징)
+RECORD_COLS = (
+    "id", "ts_kst", "datetime_str", "system", "plmn", "band", "earfcn_dl", "earfcn_ul",
+    "bandwidth", "cell_id", "pci", "drx", "rsrp", "rsrq", "rssi", "tac", "sinr", "rrc_st", "emc_st",
+    "scell_band", "scell_bw", "scell_status", "latitude", "longitude", "ip_v4",
+)
+
+
 @app.get("/api/records", name="records")
 async def records(req: Request):
     msisdn = req.args.get("msisdn")
@@ -473,6 +3490,7 @@ async def records(req: Request):
     end    = req.args.get("end")
     page   = int(req.args.get("page", "1"))
     size   = int(req.args.get("page_size", "200"))
+    cursor = req.args.get("cursor")
     order = (req.args.get("order") or "desc").lower()
     order_sql = "ASC" if order == "asc" else "DESC"
     if not (msisdn and start and end):
@@ -480,7 +3498,32 @@ async def records(req: Request):
 
     page   = max(1, page)
     size   = max(1, min(size, 1000))
-    offset = (page - 1) * size
+    lo, hi = resolve_range(0, start, end)
+
+    # cursor 가 있으면 (ts_kst, id) 키 기준으로 이어서 읽는다 (깊은 페이지도 비용 동일).
+    # cursor 없이 page 만 오면 예전 클라이언트용 OFFSET 경로.
+    keyset, key_params, direction, offset = "", (), "next", (page - 1) * size
+    scan_sql = order_sql
+    if cursor:
+        c_ts, c_id, direction = decode_cursor(cursor)
+        forward = (order_sql == "DESC") == (direction == "next")
+        op = "<" if forward else ">"
+        keyset = f"AND (`ts_kst` {op} %s OR (`ts_kst` = %s AND `id` {op} %s))"
+        key_params = (c_ts, c_ts, c_id)
+        scan_sql = "DESC" if op == "<" else "ASC"
+        offset = 0
+
+    # 아카이브된 달은 Parquet 에서 읽어 DB 행 앞(오름차순) 또는 뒤(내림차순)에 잇는다 (records_csv 와 같음)
+    archived, live_lo = await read_archive(msisdn, lo, hi, RECORD_COLS)
+    archived = [dict(zip(RECORD_COLS, r)) for r in archived]
+    total_archived = len(archived)
+    if cursor:
+        def after_cursor(r) -> bool:
+            k = (r["ts_kst"].strftime("%Y-%m-%d %H:%M:%S"), r["id"])
+            return k < (c_ts, c_id) if op == "<" else k > (c_ts, c_id)
+        archived = [r for r in archived if after_cursor(r)]
+    if scan_sql == "DESC":
+        archived.reverse()
 
     sql = f"""
     SELECT
@@ -490,33 +3533,71 @@ async def records(req: Request):
     FROM `router_info`
     WHERE `msisdn`=%s
       AND `ts_kst` >= %s
-      AND `ts_kst` < DATE_ADD(%s, INTERVAL 1 DAY)
-    ORDER BY `ts_kst` {order_sql}
-    LIMIT {size} OFFSET {offset}
+      AND `ts_kst` < %s
+      {keyset}
+    ORDER BY `ts_kst` {scan_sql}, `id` {scan_sql}
     """
 
-    async with app.ctx.pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute(sql, (msisdn, start, end))
-            rows = await cur.fetchall()
+    count_key = (msisdn, start, end)
+    total = app.ctx.count_cache.get(count_key)
+    limit = size + 1
 
-            for r in rows:
-                if isinstance(r.get("ts_kst"), datetime):
-                    r["ts_kst"] = r["ts_kst"].strftime("%Y-%m-%d %H:%M:%S")
+    async with app.ctx.read_pool.acquire() as conn:
+        async with conn.cursor(TimedDictCursor) as cur:
+            async def fetch(n: int, skip: int) -> list:
+                await cur.execute(f"{sql} LIMIT {n} OFFSET {skip}", (msisdn, live_lo, hi) + key_params)
+                return list(await cur.fetchall())
 
-            await cur.execute("""
-                SELECT COUNT(*) AS cnt
-                FROM `router_info`
-                WHERE `msisdn`=%s
-                  AND `ts_kst` >= %s
-                  AND `ts_kst` < DATE_ADD(%s, INTERVAL 1 DAY)
-            """, (msisdn, start, end))
-            total = (await cur.fetchone())["cnt"]
+            if total is None:
+                await cur.execute("""
+                    SELECT COUNT(*) AS cnt
+                    FROM `router_info`
+                    WHERE `msisdn`=%s
+                      AND `ts_kst` >= %s
+                      AND `ts_kst` < %s
+                """, (msisdn, live_lo, hi))
+                total = (await cur.fetchone())["cnt"] + total_archived
+                ttl = COUNT_CACHE_TTL_CLOSED if range_is_closed(hi) else COUNT_CACHE_TTL_OPEN
+                app.ctx.count_cache.set(count_key, total, ttl, tag=msisdn)
 
-            return response.json({
-                "msisdn": msisdn, "start": start, "end": end,
-                "page": page, "page_size": size, "total": total, "rows": rows
-            })
+            if scan_sql == "ASC":
+                rows = archived[offset:offset + limit]
+                if len(rows) < limit:
+                    rows += await fetch(limit - len(rows), max(0, offset - total_archived))
+            else:
+                rows = await fetch(limit, offset)
+                if len(rows) < limit and archived:
+                    # DB 행을 다 지나친 OFFSET 이면 그만큼 아카이브에서 건너뛴다
+                    skip = 0 if rows else max(0, offset - (total - total_archived))
+                    rows += archived[skip:skip + limit - len(rows)]
+
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if scan_sql != order_sql:
+        rows.reverse()
+
+    for r in rows:
+        if isinstance(r.get("ts_kst"), datetime):
+            r["ts_kst"] = r["ts_kst"].strftime("%Y-%m-%d %H:%M:%S")
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = rows[0], rows[-1]
+        if direction == "next":
+            if has_more:
+                next_cursor = encode_cursor(last["ts_kst"], last["id"], "next")
+            if cursor or offset > 0:
+                prev_cursor = encode_cursor(first["ts_kst"], first["id"], "prev")
+        else:
+            if has_more:
+                prev_cursor = encode_cursor(first["ts_kst"], first["id"], "prev")
+            next_cursor = encode_cursor(last["ts_kst"], last["id"], "next")
+
+    return response.json({
+        "msisdn": msisdn, "start": start, "end": end,
+        "page": page, "page_size": size, "total": total, "rows": rows,
+        "next_cursor": next_cursor, "prev_cursor": prev_cursor,
+    })
 
 
 # 4) CSV 다운로드
@@ -543,6 +3624,7 @@ async def records_csv(req: Request):
         ext = "csv"
 
     filename = f"router_{msisdn}_{start}_{end}.{ext}"
+    lo, hi = resolve_range(0, start, end)
 
     headers_cols = [
         "id","ts_kst","datetime_str","system","plmn","band","earfcn_dl","earfcn_ul",
@@ -558,10 +3640,17 @@ async def records_csv(req: Request):
     FROM `router_info`
     WHERE `msisdn`=%s
       AND `ts_kst` >= %s
-      AND `ts_kst` < DATE_ADD(%s, INTERVAL 1 DAY)
+      AND `ts_kst` < %s
     ORDER BY `ts_kst` {order_sql}
     """
 
+    # 아카이브된 달은 Parquet 에서 (asc 면 DB 행보다 먼저, desc 면 나중에)
+    until = app.ctx.archive_until
+    live_lo = max(lo, until) if until else lo
+    months = archive_months(lo, min(hi, until)) if until and lo < until else []
+    if order_sql == "DESC":
+        months.reverse()
+
     sio = io.StringIO(newline="")
     writer = csv.writer(
         sio,
@@ -571,28 +3660,119 @@ async def records_csv(req: Request):
         quotechar='"',
         escapechar=None,
     )
+    sio.write("\ufeff")
     writer.writerow(headers_cols)
 
-    async with app.ctx.pool.acquire() as conn:
-        async with conn.cursor() as cur:
-            await cur.execute(sql, (msisdn, start, end))
-            while True:
-                rows = await cur.fetchmany(2000)
-                if not rows:
-                    break
-                for row in rows:
-                    row = list(row)
-                    if isinstance(row[1], datetime):
-                        row[1] = row[1].strftime("%Y-%m-%d %H:%M:%S")
-                    writer.writerow(row)
+    # gzip=1 이면 Content-Encoding: gzip 으로 압축하면서 보낸다 (브라우저가 자동 해제)
+    use_gzip = req.args.get("gzip", "0") in ("1", "true", "yes")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
 
-    content = "\ufeff" + sio.getvalue()
     headers_resp = {
-        "Content-Type": "text/csv; charset=utf-8",
         "Content-Disposition": f'attachment; filename="{filename}"',
         "Cache-Control": "no-store",
+        "X-Accel-Buffering": "no",
     }
-    return response.raw(content.encode("utf-8"), headers=headers_resp)
+    if use_gzip:
+        headers_resp["Content-Encoding"] = "gzip"
+        headers_resp["Vary"] = "Accept-Encoding"
+
+    def take_chunk() -> bytes:
+        data = sio.getvalue().encode("utf-8")
+        sio.seek(0)
+        sio.truncate(0)
+        return compressor.compress(data) if compressor else data
+
+    async def send_rows(rows):
+        for row in rows:
+            row = list(row)
+            if isinstance(row[1], datetime):
+                row[1] = row[1].strftime("%Y-%m-%d %H:%M:%S")
+            writer.writerow(row)
+        chunk = take_chunk()
+        if chunk:
+            await resp.send(chunk)
+
+    async def send_archive():
+        for month in months:
+            rows = await asyncio.to_thread(read_archive_month, month, msisdn, lo, hi, headers_cols)
+            if order_sql == "DESC":
+                rows.reverse()
+            await send_rows(rows)
+
+    # 긴 내보내기가 조회 풀을 다 차지하지 않도록 워커당 CSV_EXPORT_MAX 개까지만
+    if app.ctx.csv_exports.locked():
+        return response.json({"error": "too_many_exports"}, status=503, headers={"Retry-After": "30"})
+
+    # SSCursor: 결과를 서버에서 조금씩 받아오므로 fetchmany 한 묶음만 메모리에 있다
+    async with app.ctx.csv_exports, app.ctx.read_pool.acquire() as conn:
+        resp = await req.respond(headers=headers_resp, content_type="text/csv; charset=utf-8")
+        try:
+            if order_sql == "ASC":
+                await send_archive()
+            cur = await conn.cursor(TimedSSCursor)
+            await cur.execute(sql, (msisdn, live_lo, hi))
+            while True:
+                rows = await cur.fetchmany(2000)
+                if not rows:
+                    break
+                await send_rows(rows)
+            await cur.close()
+            if order_sql == "DESC":
+                await send_archive()
+        except Exception as e:
+            # 스트림 도중 실패(클라이언트 끊김 등): cursor.close() 는 남은 결과를 끝까지
+            # 읽으므로 호출하지 않고 연결째 버린다
+            conn.close()
+            await log_error("RECORDS_CSV_ERROR", e)
+            return
+
+    tail = take_chunk()
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        await resp.send(tail)
+    await resp.eof()
+
+
+# 실시간 스트림: 구독한 기기에 새 수집 행이 들어오면 바로 push (SSE)
+@app.get("/api/stream", name="stream")
+async def stream(req: Request):
+    """text/event-stream. `sample` = 새 행, `resync` = 이벤트가 밀려 버려졌으니 다시 조회, 주석 줄 = keep-alive."""
+    raw = req.args.get("msisdns") or req.args.get("msisdn") or ""
+    msisdns = list(dict.fromkeys(m.strip() for m in raw.split(",") if m.strip()))
+    if not msisdns:
+        raise InvalidUsage("msisdns is required")
+    if len(msisdns) > STREAM_MAX_MSISDNS:
+        raise InvalidUsage(f"at most {STREAM_MAX_MSISDNS} msisdns per stream")
+
+    hub = app.ctx.stream_hub
+    client = hub.subscribe(msisdns)
+    if client is None:
+        return response.json({"error": "too_many_streams"}, status=503, headers={"Retry-After": "30"})
+
+    try:
+        resp = await req.respond(
+            content_type="text/event-stream",
+            headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        )
+        await resp.send(f"retry: 5000\n: subscribed {','.join(msisdns)}\n\n".encode())
+        while True:
+            try:
+                payload = await asyncio.wait_for(client.queue.get(), timeout=STREAM_PING_SEC)
+            except asyncio.TimeoutError:
+                await resp.send(b": ping\n\n")
+                continue
+            if payload is None:
+                break
+            if client.lagged:
+                client.lagged = False
+                await resp.send(sse_event("resync", {"reason": "client_too_slow"}))
+            await resp.send(payload)
+        await resp.eof()
+    except ConnectionError:
+        pass   # 클라이언트 끊김
+    finally:
+        hub.unsubscribe(client)
 
 
 # 5) 기기 설정
@@ -621,6 +3801,11 @@ async def set_alias(req: Request):
             """
             await cur.execute(sql, (msisdn, alias, alias))
 
+    # 신규 행이면 dormant 기본값을 알 수 없으므로 다음 수집 때 upsert 하도록 캐시에서 제거
+    app.ctx.device_cache.pop(str(msisdn), None)
+    invalidate_responses(devices=True)
+    notify_workers()
+
     return response.json({"ok": True, "msisdn": msisdn, "alias": alias})
 
 
@@ -632,17 +3817,30 @@ async def delete_device(req: Request):
     if not msisdn:
         raise InvalidUsage("msisdn is required")
 
+    archive_files = 0
     async with app.ctx.pool.acquire() as conn:
         async with conn.cursor() as cur:
             if cascade:
+                app.ctx.count_cache.drop_tag(msisdn)
                 await cur.execute("DELETE FROM router_info WHERE msisdn=%s", (msisdn,))
+                await cur.execute("DELETE FROM router_info_hourly WHERE msisdn=%s", (msisdn,))
+                await cur.execute("DELETE FROM router_info_daily WHERE msisdn=%s", (msisdn,))
+                await cur.execute("DELETE FROM device_outages WHERE msisdn=%s", (msisdn,))
+                # 아카이브된 달도 raw / batch / CSV 조회에 합쳐지므로 Parquet 파일까지 지운다
+                archive_files = await asyncio.to_thread(remove_archive_files, msisdn)
 
             await cur.execute(
                 "UPDATE devices SET dormant=1, dormant_at=NOW() WHERE msisdn=%s",
                 (msisdn,)
             )
 
-    return response.json({"ok": True, "msisdn": msisdn, "cascade": cascade, "dormant": True})
+    app.ctx.device_cache[str(msisdn)] = True
+    invalidate_responses(msisdn if cascade else None, closed=True, devices=True)
+    notify_workers()
+
+    return response.json({
+        "ok": True, "msisdn": msisdn, "cascade": cascade, "dormant": True, "archive_files": archive_files,
+    })
 
 
 @app.post("/api/devices/activate", name="activate_device")
@@ -658,14 +3856,464 @@ async def activate_device(req: Request):
                 "UPDATE devices SET dormant=0, dormant_at=NULL WHERE msisdn=%s",
                 (msisdn,)
             )
+            changed = cur.rowcount
+
+    # 행이 없거나 이미 활성이었으면 상태를 확정할 수 없으므로 캐시에서 제거
+    if changed > 0:
+        app.ctx.device_cache[str(msisdn)] = False
+    else:
+        app.ctx.device_cache.pop(str(msisdn), None)
+    invalidate_responses(devices=True)
+    notify_workers()
 
     return response.json({"ok": True, "msisdn": msisdn, "dormant": False})
 
 
+@app.get("/metrics", name="prometheus_metrics")
+async def prometheus_metrics(_):
+    return response.text(METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+SLOW_QUERY_SORTS = ("total_sec", "max_sec", "count")
+
+
+@app.get("/api/debug/slow-queries", name="slow_queries")
+async def slow_queries(req: Request):
+    """최근 SLOW_QUERY_WINDOW_SEC 동안 느린 쿼리 상위 N (쿼리 종류별 합계/최대/횟수, 가장 느린 파라미터, EXPLAIN)."""
+    sort = req.args.get("sort") or "total_sec"
+    if sort not in SLOW_QUERY_SORTS:
+        raise InvalidUsage("sort must be one of: " + ", ".join(SLOW_QUERY_SORTS))
+    try:
+        top = int(req.args.get("top") or SLOW_QUERY_TOP)
+    except ValueError:
+        raise InvalidUsage("top must be an integer")
+    return response.json(SLOW_QUERIES.report(max(1, min(top, 500)), sort))
+
+
 @app.get("/healthz", name="healthz")
 async def health(_):
-    return response.json({"status": "ok"})
+    ingest = dict(app.ctx.ingest_stats, spool=app.ctx.spool.snapshot())
+    return response.json({
+        "status": "ok", "ingest": ingest, "log_writer": app.ctx.log_writer.snapshot(),
+        "resp_cache": app.ctx.resp_cache.snapshot(), "stream": app.ctx.stream_hub.snapshot(),
+        "pools": {"write": app.ctx.pool.snapshot(), "read": app.ctx.read_pool.snapshot()},
+    })
+
+
+# ====== CLI ======
+
+def backfill_signals_sql() -> str:
+    """문자열 신호 컬럼 -> `{col}_num` 변환 UPDATE.
+
+    parse_signal 과 같은 문법(SIGNAL_NUM_PATTERN)과 정밀도(DECIMAL(10,3) = SIGNAL_NUM_STEP)를 쓴다.
+    """
+    sets = []
+    for col, (_, lo, hi) in SIGNAL_NUM_COLS.items():
+        num = f"CAST(TRIM(`{col}`) AS DECIMAL(10,3))"
+        sets.append(
+            f"`{col}_num` = IF(TRIM(`{col}`) REGEXP '{SIGNAL_NUM_PATTERN}' "
+            f"AND {num} BETWEEN {lo} AND {hi}, {num}, NULL)"
+        )
+    return "UPDATE `router_info` SET " + ", ".join(sets) + " WHERE `id` >= %s AND `id` < %s"
+
+
+async def backfill_signals(batch: int, start_id: int):
+    """기존 행의 숫자 신호 컬럼을 id 구간 단위로 채운다. 재실행해도 안전."""
+    pool = await create_db_pool(maxsize=1)
+    try:
+        await ensure_schema(pool)
+        sql = backfill_signals_sql()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT MIN(`id`), MAX(`id`) FROM `router_info`")
+                min_id, max_id = await cur.fetchone()
+                if min_id is None:
+                    print("router_info 가 비어 있습니다.")
+                    return
+
+                cur_id = max(min_id, start_id)
+                await cur.execute(
+                    "SELECT MIN(`ts_kst`) FROM `router_info` WHERE `id` >= %s AND `id` <= %s", (cur_id, max_id)
+                )
+                (oldest,) = await cur.fetchone()
+                while cur_id <= max_id:
+                    await cur.execute(sql, (cur_id, cur_id + batch))
+                    cur_id += batch
+                    print(f"id < {cur_id} / {max_id}", flush=True)
+
+                # 롤업은 숫자 컬럼 기준이므로 채운 행의 가장 이른 시간부터 다시 계산하도록 'late' 기록을 남긴다.
+                # hourly 워터마크를 지우면 실행 중인 서버의 다음 롤업이 자기 구간 끝으로 다시 만들어 버린다
+                if oldest is not None:
+                    await cur.execute(ROLLUP_LATE_SQL, (floor_hour(oldest),))
+        print("완료. 롤업은 서버가 다시 계산합니다.")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def backfill_last_seen():
+    """devices.last_seen_ts / last_* 를 router_info 의 기기별 마지막 행으로 채운다. 재실행해도 안전."""
+    pool = await create_db_pool(maxsize=1)
+    cols = ", ".join(f"`{c}_num`" for c in SIGNAL_NUM_COLS)
+    sets = ", ".join(f"`last_{c}` = %s" for c in SIGNAL_NUM_COLS)
+    try:
+        await ensure_schema(pool)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT `msisdn` FROM `devices` ORDER BY `msisdn`")
+                msisdns = [r[0] for r in await cur.fetchall()]
+                for i, msisdn in enumerate(msisdns, 1):
+                    await cur.execute(
+                        f"""
+                        SELECT `ts_kst`, {cols} FROM `router_info`
+                        WHERE `msisdn` = %s
+                        ORDER BY `ts_kst` DESC, `id` DESC
+                        LIMIT 1
+                        """,
+                        (msisdn,),
+                    )
+                    row = await cur.fetchone()
+                    if row is None:
+                        continue
+                    # 서버가 이미 더 최신 값을 기록했으면 건드리지 않는다
+                    await cur.execute(
+                        f"""
+                        UPDATE `devices` SET {sets}, `last_seen_ts` = %s
+                        WHERE `msisdn` = %s AND (`last_seen_ts` IS NULL OR `last_seen_ts` < %s)
+                        """,
+                        (*row[1:], row[0], msisdn, row[0]),
+                    )
+                    if i % 100 == 0 or i == len(msisdns):
+                        print(f"{i} / {len(msisdns)}", flush=True)
+        print("완료.")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def backfill_outages(start):
+    """롤업 워터마크 이전 구간의 device_outages 를 원본에서 하루 단위로 다시 계산. 재실행해도 안전."""
+    pool = await create_db_pool(maxsize=1)
+    try:
+        await ensure_schema(pool)
+        async with pool.acquire() as conn:
+            wm = await fetch_rollup_watermark(conn)
+            if wm is None:
+                print("롤업 워터마크가 없습니다. 서버가 롤업하면서 장애 구간도 함께 계산합니다.")
+                return
+            if start:
+                lo = datetime.fromisoformat(start)
+            else:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT `ts_kst` FROM `router_info` ORDER BY `id` ASC LIMIT 1")
+                    row = await cur.fetchone()
+                if not row:
+                    return
+                lo = floor_day(row[0])
+
+            while lo < wm:
+                hi = min(lo + timedelta(days=1), wm)
+                async with conn.cursor() as cur:
+                    await conn.begin()
+                    try:
+                        await outage_range(cur, lo, hi)
+                        await conn.commit()
+                    except Exception:
+                        await conn.rollback()
+                        raise
+                print(f"{lo:%Y-%m-%d} 완료", flush=True)
+                lo = hi
+        print("완료.")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def partition_init():
+    """router_info 필수 인덱스 생성 + 월별 RANGE 파티션으로 전환 (테이블 재작성, 1회성)."""
+    pool = await create_db_pool(maxsize=1)
+    try:
+        await ensure_schema(pool)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                for cols in await missing_indexes(cur):
+                    name = REQUIRED_INDEXES[cols]
+                    print(f"인덱스 {name} 생성 중...", flush=True)
+                    await cur.execute(
+                        f"ALTER TABLE `router_info` ADD INDEX `{name}` ("
+                        + ", ".join(f"`{c}`" for c in cols) + "), ALGORITHM=INPLACE, LOCK=NONE"
+                    )
+
+                if await fetch_partitions(cur):
+                    print("이미 파티션된 테이블입니다. 파티션만 보충합니다.")
+                    added = await ensure_partitions(cur, now_kst_naive())
+                    print("추가:", ", ".join(added) or "-")
+                    return
+
+                # 파티션 키(ts_kst)가 없는 유니크 키가 있으면 전환할 수 없다
+                await cur.execute(
+                    """
+                    SELECT `INDEX_NAME` FROM information_schema.`STATISTICS`
+                    WHERE `TABLE_SCHEMA` = DATABASE() AND `TABLE_NAME` = 'router_info'
+                      AND `NON_UNIQUE` = 0 AND `INDEX_NAME` <> 'PRIMARY'
+                    GROUP BY `INDEX_NAME`
+                    HAVING SUM(`COLUMN_NAME` = 'ts_kst') = 0
+                    """
+                )
+                blockers = [r[0] for r in await cur.fetchall()]
+                if blockers:
+                    print("ts_kst 가 없는 유니크 인덱스를 먼저 정리하세요:", ", ".join(blockers))
+                    return
+
+                await cur.execute("SELECT MIN(`ts_kst`) FROM `router_info`")
+                first = (await cur.fetchone())[0] or now_kst_naive()
+                now = now_kst_naive()
+                months, month = [], month_start(first)
+                while month < add_months(month_start(now), PARTITION_AHEAD_MONTHS + 1):
+                    months.append(month)
+                    month = add_months(month, 1)
+
+                print(f"{len(months)}개 월 파티션으로 전환 중 (테이블 전체 재작성)...", flush=True)
+                await cur.execute(
+                    "ALTER TABLE `router_info` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `ts_kst`) "
+                    "PARTITION BY RANGE COLUMNS(`ts_kst`) ("
+                    + ", ".join(partition_def(m) for m in months)
+                    + ", PARTITION `pmax` VALUES LESS THAN (MAXVALUE))"
+                )
+        print("완료.")
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+LOG_LINE_PREFIX = re.compile(rb"^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\] ")
+
+
+def open_raw_log(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise SystemExit(f"{path}: `pip install zstandard` 가 필요합니다.")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), read_across_frames=True)
+        return io.BufferedReader(reader)
+    return open(path, "rb")
+
+
+def read_log_records(path: str) -> list:
+    """원본 로그 -> [(ts_kst, body)]. 접두어 없는 줄은 앞 레코드 본문에 이어 붙인다.
+
+    기록 중인 압축 파일처럼 끝이 잘려 있으면 읽은 데까지만 반환.
+    """
+    truncated = (EOFError, zstandard.ZstdError) if zstandard else (EOFError,)
+    records = []
+    ts, body = None, []
+    try:
+        with open_raw_log(path) as f:
+            for line in f:
+                m = LOG_LINE_PREFIX.match(line)
+                if m:
+                    if ts is not None:
+                        records.append((ts, b"".join(body).rstrip(b"\n")))
+                    ts = datetime.strptime(m.group(1).decode(), "%Y-%m-%d %H:%M:%S")
+                    body = [line[m.end():]]
+                elif ts is not None:
+                    body.append(line)
+    except truncated:
+        pass
+    if ts is not None:
+        records.append((ts, b"".join(body).rstrip(b"\n")))
+    return records
+
+
+def load_checkpoint(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"done": {}}
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+async def replay_day(pool, day: datetime, batch: int, until: str) -> dict:
+    """하루치 원본 로그를 읽어 DB 에 없는 행만 multi-row INSERT. 재실행해도 중복되지 않는다.
+
+    ts_kst 가 until 이후인 행은 서버 스풀이 아직 적재 중일 수 있으므로 넣지 않는다 (held).
+    """
+    paths = [
+        p for p in (os.path.join(LOG_DIR, f"{day:%Y%m%d}{s}") for s in RawLogWriter.SUFFIX.values())
+        if os.path.exists(p)
+    ]
+    records = []
+    for p in paths:
+        records.extend(await asyncio.to_thread(read_log_records, p))
+
+    # JSON 이 아니거나 MSISDN 이 없는 줄(에러 로그 등)은 제외
+    rows = [r for r in (build_row(None, ts, body) for ts, body in records) if r[MSISDN_IDX]]
+    held = sum(1 for r in rows if r[TS_IDX] >= until)
+    rows = sorted((r for r in rows if r[TS_IDX] < until), key=lambda r: r[TS_IDX])
+    msisdns = sorted({str(r[MSISDN_IDX]) for r in rows})
+
+    # 같은 (msisdn, 초) 에 여러 행이 있을 수 있으므로 개수 기준으로 중복 제거
+    existing = Counter()
+    lo, hi = day, day + timedelta(days=1)
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            for i in range(0, len(msisdns), 500):
+                chunk = msisdns[i:i + 500]
+                await cur.execute(
+                    f"""
+                    SELECT `msisdn`, `ts_kst` FROM `router_info`
+                    WHERE `msisdn` IN ({", ".join(["%s"] * len(chunk))})
+                      AND `ts_kst` >= %s AND `ts_kst` < %s
+                    """,
+                    (*chunk, lo, hi),
+                )
+                for m, ts in await cur.fetchall():
+                    existing[(str(m), ts.strftime("%Y-%m-%d %H:%M:%S"))] += 1
+
+            new_rows = []
+            for r in rows:
+                key = (str(r[MSISDN_IDX]), r[TS_IDX])
+                if existing[key] > 0:
+                    existing[key] -= 1
+                else:
+                    new_rows.append(r)
+
+            for i in range(0, len(new_rows), batch):
+                chunk = new_rows[i:i + batch]
+                last, params = last_seen_params(chunk)
+                await cur.execute(
+                    DEVICES_SEEN_SQL.format(values=", ".join([DEVICES_SEEN_ROW_PH] * len(last))), params
+                )
+                await cur.execute(
+                    ROUTER_INFO_INSERT_SQL + ", ".join([ROUTER_INFO_ROW_PH] * len(chunk)),
+                    [v for r in chunk for v in r],
+                )
+
+    return {"files": len(paths), "records": len(records), "inserted": len(new_rows),
+            "skipped": len(rows) - len(new_rows), "held": held,
+            "oldest": new_rows[0][TS_IDX] if new_rows else None}
+
+
+async def replay(start: str, end: str, jobs: int, batch: int, checkpoint: str):
+    """LOG_DIR 의 날짜별 원본 로그를 DB 로 다시 적재 (날짜 단위 병렬, 체크포인트로 재개)."""
+    try:
+        first = datetime.fromisoformat(start)
+        last = datetime.fromisoformat(end) if end else floor_day(now_kst_naive())
+    except ValueError:
+        raise SystemExit("--start, --end 는 YYYY-MM-DD 형식입니다.")
+
+    state = load_checkpoint(checkpoint)
+    days = []
+    day = first
+    while day <= last:
+        if f"{day:%Y%m%d}" not in state["done"]:
+            days.append(day)
+        day += timedelta(days=1)
+
+    # 서버 스풀에 남은 행은 원본 로그에도 있으므로 여기서 넣으면 스풀 소비자가 한 번 더 넣는다.
+    # 적재 대기 중인 가장 오래된 행부터는 건너뛴다. 스풀이 비어 있어도 방금 받은 행은 아직 메모리 버퍼에 있을 수 있다
+    until = (now_kst_naive() - timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S")
+    pending = await asyncio.to_thread(spool_pending_ts)
+    if pending and pending < until:
+        until = pending
+        print(f"스풀에 적재 대기 행이 있어 {pending} 이후 행은 건너뜁니다 (서버가 적재). "
+              "스풀이 비면(/healthz 의 ingest.spool.backlog_bytes = 0) 다시 실행하세요.", flush=True)
+    until_day = floor_day(datetime.fromisoformat(until))
+
+    pool = await create_db_pool(maxsize=jobs)
+    try:
+        await ensure_schema(pool)
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT MAX(`month`) FROM `archive_state`")
+                row = await cur.fetchone()
+        archived = add_months(datetime(row[0].year, row[0].month, 1), 1) if row and row[0] else None
+
+        sem = asyncio.Semaphore(jobs)
+        changed = []
+
+        async def run(day):
+            key = f"{day:%Y%m%d}"
+            if archived and day < archived:
+                print(f"{key}: Parquet 로 아카이브된 달이라 건너뜀", flush=True)
+                return
+            if day > until_day:
+                print(f"{key}: 스풀 적재 대기 중이라 건너뜀", flush=True)
+                return
+            async with sem:
+                t0 = time.monotonic()
+                result = await replay_day(pool, day, batch, until)
+            result["sec"] = round(time.monotonic() - t0, 1)
+            print(f"{key}: {result}", flush=True)
+            # 오늘 파일(아직 기록 중)과 스풀 대기 행 때문에 일부를 건너뛴 날은 완료로 남기지 않는다
+            if day < until_day:
+                state["done"][key] = result
+                save_checkpoint(checkpoint, state)
+            if result["inserted"]:
+                changed.append(result["oldest"])
+
+        await asyncio.gather(*(run(d) for d in days))
+
+        # 롤업이 이미 지나간 시간에 행이 추가됐으면 'late' 기록을 남겨 서버 롤업이 워터마크를 되돌리게 한다.
+        # hourly 워터마크를 직접 바꾸면 실행 중인 서버의 다음 롤업이 메모리의 워터마크로 덮어쓴다
+        if changed:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute(ROLLUP_LATE_SQL, (floor_hour(datetime.fromisoformat(min(changed))),))
+        print(f"완료. {len(changed)}일에 행 추가." + (" 롤업은 서버가 다시 계산합니다." if changed else ""))
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Router Info 수집/조회 서버")
+    sub = parser.add_subparsers(dest="cmd")
+    parser.set_defaults(host="0.0.0.0", port=35443, workers=WORKERS)
+    p = sub.add_parser("serve", help="서버 실행 (기본)")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=35443)
+    p.add_argument("--workers", type=int, default=WORKERS, help="워커 프로세스 수 (기본: WORKERS 환경변수)")
+
+    p = sub.add_parser("backfill-signals", help="기존 행의 rsrp_num/rsrq_num/sinr_num/rssi_num 채우기")
+    p.add_argument("--batch", type=int, default=20000, help="UPDATE 1회당 id 구간 크기")
+    p.add_argument("--start-id", type=int, default=0, help="중단된 경우 마지막 출력 id 부터 재개")
+
+    sub.add_parser("backfill-last-seen", help="devices 의 last_seen_ts / last_* 를 기존 데이터로 채우기")
+    p = sub.add_parser("backfill-outages", help="롤업 워터마크 이전 구간의 기기 장애 구간(device_outages) 계산")
+    p.add_argument("--start", help="시작 날짜 YYYY-MM-DD (기본: 가장 오래된 행)")
+    sub.add_parser("partition-init", help="router_info (msisdn, ts_kst) 인덱스 생성 + 월별 파티션 전환")
+
+    p = sub.add_parser("replay", help="날짜별 원본 로그(.log/.log.gz/.log.zst)를 DB 에 다시 적재")
+    p.add_argument("--start", required=True, help="시작 날짜 YYYY-MM-DD")
+    p.add_argument("--end", help="끝 날짜 YYYY-MM-DD (포함, 기본: 오늘)")
+    p.add_argument("--jobs", type=int, default=4, help="동시에 처리할 날짜 수")
+    p.add_argument("--batch", type=int, default=2000, help="INSERT 1회당 행 수")
+    p.add_argument("--checkpoint", default=os.path.join(LOG_DIR, "replay_checkpoint.json"),
+                   help="완료한 날짜 기록 파일 (지우면 처음부터)")
+
+    args = parser.parse_args()
+    if args.cmd == "backfill-signals":
+        asyncio.run(backfill_signals(args.batch, args.start_id))
+    elif args.cmd == "backfill-last-seen":
+        asyncio.run(backfill_last_seen())
+    elif args.cmd == "backfill-outages":
+        asyncio.run(backfill_outages(args.start))
+    elif args.cmd == "partition-init":
+        asyncio.run(partition_init())
+    elif args.cmd == "replay":
+        asyncio.run(replay(args.start, args.end, args.jobs, args.batch, args.checkpoint))
+    else:
+        app.run(host=args.host, port=args.port, workers=args.workers, access_log=False)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=35443, access_log=False)
+    main()
@@ -5,6 +5,9 @@ import "uplot/dist/uPlot.min.css";
 // Nginx가 /api/ 를 sanic(35443)로 프록시하는 구성이라면 빈 문자열 유지
 const API = "";
 
+/** raw 차트 최대 포인트 수 (서버에서 min/max 다운샘플) */
+const RAW_MAX_POINTS = 2000;
+
 /** 지표 기준/상한(요청 반영: 하한 삭제, 상한만) */
 const REF = {
   rsrp: { center: -100, upper: -84 },
@@ -27,6 +30,20 @@ const CHART_MODE_CONFIG = {
   daily_avg:  { suffix: "_avg", xKey: "d" },
 };
 
+/** batch 응답의 컬럼 배열({ts: [...], rsrp: [...]}) -> 기존 행 배열([{ts, rsrp}, ...]) */
+function columnsToRows(cols) {
+  if (!cols) return [];
+  const keys = Object.keys(cols);
+  const n = keys.length ? cols[keys[0]].length : 0;
+  const rows = new Array(n);
+  for (let i = 0; i < n; i++) {
+    const row = {};
+    for (const k of keys) row[k] = cols[k][i];
+    rows[i] = row;
+  }
+  return rows;
+}
+
 export default function Dashboard({ user, onLogout }) {
   // devices
   const [devices, setDevices] = useState([]);
@@ -53,6 +70,9 @@ export default function Dashboard({ user, onLogout }) {
   const [page, setPage] = useState(1);
   const [total, setTotal] = useState(0);
   const pageSize = 200;
+  // 커서 페이징: 서버가 준 이전/다음 커서, 현재 페이지를 읽을 커서(조회 조건이 바뀌면 무효)
+  const [cursors, setCursors] = useState({ next: "", prev: "" });
+  const [pageCursor, setPageCursor] = useState({ key: "", cursor: "" });
 
   // ordering
   const [sortOrder, setSortOrder] = useState("desc"); // asc | desc
@@ -61,6 +81,7 @@ export default function Dashboard({ user, onLogout }) {
   const [lastUpdated, setLastUpdated] = useState("");
   const [autoRefresh, setAutoRefresh] = useState(false);
   const [refreshSec, setRefreshSec] = useState(30);
+  const [live, setLive] = useState(false);
 
   // RSSI only mode
   const [rssiOnly, setRssiOnly] = useState(false);
@@ -156,23 +177,28 @@ export default function Dashboard({ user, onLogout }) {
     }
 
     // raw
-    const r = await fetch(`${API}/api/metrics/raw?${qs}`);
+    const r = await fetch(`${API}/api/metrics/raw?${qs}&max_points=${RAW_MAX_POINTS}`);
     const d = await r.json();
     setRaw(d.data || []);
   }, [msisdn, chartMode, chartStart, chartEnd]);
 
+  const tableKey = `${msisdn}|${start}|${end}|${sortOrder}`;
+
   const fetchTable = useCallback(async () => {
     if (!msisdn) return;
+    const cursor = page > 1 && pageCursor.key === tableKey ? pageCursor.cursor : "";
     const url =
       `${API}/api/records?msisdn=${encodeURIComponent(msisdn)}` +
       `&start=${encodeURIComponent(start)}&end=${encodeURIComponent(end)}` +
-      `&page=${page}&page_size=${pageSize}&order=${sortOrder}`;
+      `&page=${page}&page_size=${pageSize}&order=${sortOrder}` +
+      (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "");
 
     const r = await fetch(url);
     const d = await r.json();
     setRows(d.rows || []);
     setTotal(d.total || 0);
-  }, [msisdn, start, end, page, sortOrder]);
+    setCursors({ next: d.next_cursor || "", prev: d.prev_cursor || "" });
+  }, [msisdn, start, end, page, sortOrder, pageCursor, tableKey]);
 
   const fetchAllDeviceRssi = useCallback(async () => {
     const activeDevices = (showDormant ? devices : devices.filter(d => !d.dormant))
@@ -182,18 +208,21 @@ export default function Dashboard({ user, onLogout }) {
     const endpoint = chartMode === "hourly_avg" ? "hourly_avg"
       : chartMode === "daily_avg" ? "daily_avg" : "raw";
 
-    const results = await Promise.all(
-      activeDevices.map(async (dev) => {
-        const qs = `msisdn=${encodeURIComponent(dev.msisdn)}&start=${encodeURIComponent(chartStart)}&end=${encodeURIComponent(chartEnd)}`;
-        try {
-          const r = await fetch(`${API}/api/metrics/${endpoint}?${qs}`);
-          const d = await r.json();
-          return { msisdn: dev.msisdn, alias: dev.alias || "", data: d.data || [] };
-        } catch {
-          return { msisdn: dev.msisdn, alias: dev.alias || "", data: [] };
-        }
-      })
-    );
+    // 전체 기기를 /api/metrics/batch 한 번으로 조회 (응답은 기기별 컬럼 배열)
+    const qs = `metric=${endpoint}` +
+      `&msisdns=${activeDevices.map(d => encodeURIComponent(d.msisdn)).join(",")}` +
+      `&start=${encodeURIComponent(chartStart)}&end=${encodeURIComponent(chartEnd)}` +
+      (endpoint === "raw" ? `&max_points=${RAW_MAX_POINTS}` : "");
+    let byMsisdn = {};
+    try {
+      const r = await fetch(`${API}/api/metrics/batch?${qs}`);
+      const d = await r.json();
+      byMsisdn = d.devices || {};
+    } catch {}
+
+    const results = activeDevices.map(dev => ({
+      msisdn: dev.msisdn, alias: dev.alias || "", data: columnsToRows(byMsisdn[dev.msisdn]),
+    }));
     setAllDeviceRssi(results.filter(r => r.data.length > 0));
   }, [devices, showDormant, chartMode, chartStart, chartEnd]);
 
@@ -300,6 +329,39 @@ export default function Dashboard({ user, onLogout }) {
     };
   }, [autoRefresh, refreshSec, refreshAll]);
 
+  // 실시간: 오늘이 포함된 raw 차트 / 최신순 첫 페이지 표는 /api/stream(SSE) 으로 새 행만 받아 붙인다
+  const liveTarget = !live || !msisdn ? null
+    : tab === "chart" && chartMode === "raw" && !rssiOnly && chartEnd >= todayOffset(0) ? "chart"
+    : tab === "table" && page === 1 && sortOrder === "desc" && end >= todayOffset(0) ? "table"
+    : null;
+  const liveRefetchRef = useRef(null);
+  liveRefetchRef.current = liveTarget === "chart" ? fetchChart : fetchTable;
+  // 실시간 행은 DB id 가 없으므로 표 key 용 번호를 따로 붙인다
+  const liveSeqRef = useRef(0);
+
+  useEffect(() => {
+    if (!liveTarget || typeof EventSource === "undefined") return;
+    const es = new EventSource(`${API}/api/stream?msisdns=${encodeURIComponent(msisdn)}`);
+    es.addEventListener("sample", (e) => {
+      const { msisdn: _m, record, ...point } = JSON.parse(e.data);
+      if (liveTarget === "chart") {
+        // 탭을 오래 열어 둬도 처음 받은 raw 와 같은 크기(RAW_MAX_POINTS)까지만 두고 오래된 점부터 버린다
+        setRaw((prev) => [...prev, point].slice(-RAW_MAX_POINTS));
+      } else {
+        liveSeqRef.current += 1;
+        const liveRow = { ...record, liveKey: `live-${liveSeqRef.current}` };
+        setRows((prev) => [liveRow, ...prev].slice(0, pageSize));
+        setTotal((t) => t + 1);
+      }
+      stampUpdated();
+    });
+    // 서버가 이벤트를 버렸으면(연결이 느림) 전체를 한 번 다시 읽는다
+    es.addEventListener("resync", () => {
+      liveRefetchRef.current?.().catch(() => {});
+    });
+    return () => es.close();
+  }, [liveTarget, msisdn]);
+
   // ---------- actions ----------
   async function handleSaveAlias() {
     if (!msisdn) return;
@@ -378,6 +440,10 @@ export default function Dashboard({ user, onLogout }) {
               <option key={n} value={n}>{n}s</option>
             ))}
           </select>
+          <label style={styles.checkboxLabel}>
+            <input type="checkbox" checked={live} onChange={(e) => setLive(e.target.checked)} />
+            <span style={{ marginLeft: 6 }}>실시간</span>
+          </label>
           <div style={{ width: 12 }} />
           <button onClick={() => refreshAll()} style={styles.primaryBtn}>
             새로고침
@@ -542,7 +608,7 @@ export default function Dashboard({ user, onLogout }) {
               </div>
 
               <button
-                onClick={() => setSortOrder((o) => (o === "desc" ? "asc" : "desc"))}
+                onClick={() => { setSortOrder((o) => (o === "desc" ? "asc" : "desc")); setPage(1); }}
                 style={styles.ghostBtn}
                 title="정렬 토글"
               >
@@ -575,7 +641,7 @@ export default function Dashboard({ user, onLogout }) {
                   const zebra = idx % 2 === 0 ? "#ffffff" : "#f9fafb";
                   return (
                     <tr
-                      key={r.id || idx}
+                      key={r.id ?? r.liveKey ?? idx}
                       style={{ background: zebra, transition: "background 0.15s ease" }}
                       onMouseEnter={(e) => (e.currentTarget.style.background = "#eef2ff")}
                       onMouseLeave={(e) => (e.currentTarget.style.background = zebra)}
@@ -592,7 +658,14 @@ export default function Dashboard({ user, onLogout }) {
 
           {/* 오른쪽에 떠다니는 페이징 */}
           <div style={styles.floatingPager}>
-            <button disabled={page <= 1} onClick={() => setPage((p) => p - 1)} style={styles.pagerBtn}>
+            <button
+              disabled={page <= 1}
+              onClick={() => {
+                setPageCursor({ key: tableKey, cursor: page - 1 > 1 ? cursors.prev : "" });
+                setPage((p) => p - 1);
+              }}
+              style={styles.pagerBtn}
+            >
               이전
             </button>
             <div style={styles.pagerInfo}>
@@ -600,8 +673,11 @@ export default function Dashboard({ user, onLogout }) {
               <div style={{ fontSize: 12, color: "#6b7280", marginTop: 4 }}>총 {total}건</div>
             </div>
             <button
-              disabled={page >= Math.ceil(total / pageSize)}
-              onClick={() => setPage((p) => p + 1)}
+              disabled={!cursors.next}
+              onClick={() => {
+                setPageCursor({ key: tableKey, cursor: cursors.next });
+                setPage((p) => p + 1);
+              }}
               style={styles.pagerBtn}
             >
               다음
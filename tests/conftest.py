@@ -0,0 +1,18 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytest  # noqa: E402
+
+import router_info_server as srv  # noqa: E402
+
+
+@pytest.fixture
+def app_ctx(monkeypatch):
+    """app.ctx 속성을 테스트 동안만 바꾼다 (끝나면 원래대로)."""
+    def set_ctx(**attrs):
+        for name, value in attrs.items():
+            monkeypatch.setattr(srv.app.ctx, name, value, raising=False)
+        return srv.app.ctx
+    return set_ctx
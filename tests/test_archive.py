@@ -0,0 +1,153 @@
+"""콜드 데이터 아카이브 파일 경로, 기기 cascade 삭제, /api/records 의 아카이브 합치기."""
+import asyncio
+import contextlib
+import json
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sanic.request import RequestParameters
+
+import router_info_server as srv
+
+
+def test_remove_archive_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "ARCHIVE_DIR", str(tmp_path))
+    months = [datetime(2025, 11, 1), datetime(2025, 12, 1), datetime(2026, 1, 1)]
+    for month in months:
+        for msisdn in ("01012345678", "01099999999"):
+            path = srv.archive_path(month, msisdn)
+            (tmp_path / f"{month:%Y%m}").mkdir(exist_ok=True)
+            open(path, "wb").close()
+    (tmp_path / "202602").mkdir()          # 이 기기 파일이 없는 달
+    (tmp_path / "tmp").mkdir()             # 달 디렉터리가 아닌 것
+
+    assert srv.remove_archive_files("01012345678") == 3
+    assert not any((tmp_path / f"{m:%Y%m}" / "01012345678.parquet").exists() for m in months)
+    assert all((tmp_path / f"{m:%Y%m}" / "01099999999.parquet").exists() for m in months)
+    assert srv.remove_archive_files("01012345678") == 0
+
+
+def test_remove_archive_files_without_archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "ARCHIVE_DIR", str(tmp_path / "missing"))
+    assert srv.remove_archive_files("01012345678") == 0
+
+
+def test_archive_path_is_sanitized(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "ARCHIVE_DIR", str(tmp_path))
+    path = srv.archive_path(datetime(2026, 1, 1), "../../etc/x")
+    assert path == str(tmp_path / "202601" / "_2E_2E_2F_2E_2E_2Fetc_2Fx.parquet")
+    assert srv.archive_path(datetime(2026, 1, 1), "+82-10-1234") == str(tmp_path / "202601" / "+82-10-1234.parquet")
+    assert srv.archive_path(datetime(2026, 1, 1), None).endswith("_none.parquet")
+
+
+def test_archive_name_keeps_distinct_msisdns_apart():
+    names = ["010 1234", "010_1234", "010.1234", "010/1234", "010_201234", "０１０", "_none", None]
+    encoded = [srv.archive_name(m) for m in names]
+    assert len(set(encoded)) == len(names)
+    assert all(re.fullmatch(r"[0-9A-Za-z+_-]+", n) for n in encoded)
+
+
+ARCHIVE_UNTIL = datetime(2026, 2, 1)
+
+
+def record(i: int, ts: datetime) -> dict:
+    return dict(zip(srv.RECORD_COLS, (i, ts) + (None,) * (len(srv.RECORD_COLS) - 2)))
+
+
+class FakeRecordsPool:
+    """router_info 조회를 흉내: ORDER BY 방향, keyset 조건, LIMIT/OFFSET, COUNT(*) 를 적용."""
+
+    def __init__(self, rows):
+        self.rows = rows      # ts_kst 오름차순 dict 행 (ARCHIVE_UNTIL 이후)
+        self.result = []
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    def cursor(self, *_):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args):
+        _, lo, hi = args[:3]
+        rows = [r for r in self.rows if lo <= r["ts_kst"] < hi]
+        if "COUNT(*)" in sql:
+            self.result = [{"cnt": len(rows)}]
+            return
+        if len(args) > 3:
+            key = (datetime.fromisoformat(args[3]), args[5])
+            less = "`ts_kst` < %s OR" in sql
+            rows = [r for r in rows if ((r["ts_kst"], r["id"]) < key) == less and (r["ts_kst"], r["id"]) != key]
+        if "`ts_kst` DESC" in sql:
+            rows = rows[::-1]
+        n, skip = map(int, re.search(r"LIMIT (\d+) OFFSET (\d+)", sql).groups())
+        self.result = [dict(r) for r in rows[skip:skip + n]]
+
+    async def fetchall(self):
+        return self.result
+
+    async def fetchone(self):
+        return self.result[0]
+
+
+@pytest.fixture
+def records(app_ctx, monkeypatch):
+    """1월 5행은 아카이브, 2월 5행은 DB. id 는 시각 순서."""
+    base = datetime(2026, 1, 31, 23, 55)
+    all_rows = [record(i, base + timedelta(minutes=2 * i)) for i in range(10)]
+    archived = [r for r in all_rows if r["ts_kst"] < ARCHIVE_UNTIL]
+
+    def read_month(month, msisdn, lo, hi, columns):
+        assert msisdn == "010" and tuple(columns) == srv.RECORD_COLS
+        return [tuple(r.values()) for r in archived if r["ts_kst"].month == month.month and lo <= r["ts_kst"] < hi]
+
+    monkeypatch.setattr(srv, "read_archive_month", read_month)
+    app_ctx(
+        archive_until=ARCHIVE_UNTIL,
+        read_pool=FakeRecordsPool([r for r in all_rows if r["ts_kst"] >= ARCHIVE_UNTIL]),
+        count_cache=srv.TTLCache(1 << 20),
+    )
+
+    def call(**args):
+        args = {"msisdn": "010", "start": "2026-01-31", "end": "2026-02-01", **args}
+        req = SimpleNamespace(args=RequestParameters({k: [str(v)] for k, v in args.items()}))
+        resp = asyncio.run(srv.records(req))
+        assert resp.status == 200
+        return json.loads(resp.body)
+    return call
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_records_merges_archive_pages(records, order):
+    expected = list(range(10)) if order == "asc" else list(range(9, -1, -1))
+    seen = []
+    for page in range(1, 5):
+        body = records(order=order, page=page, page_size=3)
+        assert body["total"] == 10
+        seen += [r["id"] for r in body["rows"]]
+    assert seen == expected
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_records_merges_archive_with_cursor(records, order):
+    expected = list(range(10)) if order == "asc" else list(range(9, -1, -1))
+    seen, cursor = [], None
+    while True:
+        body = records(order=order, page_size=3, **({"cursor": cursor} if cursor else {}))
+        seen += [r["id"] for r in body["rows"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected
+
+    # 마지막 페이지에서 prev 로 되돌아가면 바로 앞 3행
+    body = records(order=order, page_size=3, cursor=body["prev_cursor"])
+    assert [r["id"] for r in body["rows"]] == expected[-4:-1]
@@ -0,0 +1,65 @@
+"""조회 응답 캐시 TTLCache: TTL, 크기 기준 LRU, tag 무효화와 세대."""
+import router_info_server as srv
+
+
+def test_clear_bumps_every_generation():
+    cache = srv.TTLCache(100)
+    cache.set("a", 1, ttl=60, tag=("m", False))
+    before = {t: cache.generation(t) for t in (("m", False), ("m", True), srv.DEVICES_TAG)}
+    cache.clear()
+    assert cache.get("a") is None and cache.size == 0
+    for tag, gen in before.items():
+        assert cache.generation(tag) != gen
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(srv.time, "monotonic", lambda: now[0])
+    cache = srv.TTLCache(10)
+    cache.set("a", 1, ttl=5)
+    now[0] += 4.9
+    assert cache.get("a") == 1
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.size == 0 and cache.snapshot()["items"] == 0
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_lru_by_size():
+    cache = srv.TTLCache(100)
+    cache.set("a", "A", ttl=60, size=40)
+    cache.set("b", "B", ttl=60, size=40)
+    assert cache.get("a") == "A"          # a 가 최근 사용 -> b 가 먼저 밀려난다
+    cache.set("c", "C", ttl=60, size=40)
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.size == 80 and cache.stats["evictions"] == 1
+
+    cache.set("big", "X", ttl=60, size=101)   # 상한보다 큰 항목은 넣지 않고 기존 항목도 그대로
+    assert cache.get("big") is None and cache.size == 80
+
+    cache.set("a", "A2", ttl=60, size=10)     # 덮어쓰면 크기도 바뀐다
+    assert cache.get("a") == "A2" and cache.size == 50
+
+
+def test_drop_tag_and_generation():
+    cache = srv.TTLCache(100)
+    t1, t2 = ("010", False), ("010", True)
+    cache.set("open", 1, ttl=60, tag=t1)
+    cache.set("closed", 2, ttl=60, tag=t2)
+    cache.set("other", 3, ttl=60, tag=("011", False))
+    g1, g2 = cache.generation(t1), cache.generation(t2)
+
+    cache.drop_tag(t1)
+    assert cache.get("open") is None and cache.get("closed") == 2 and cache.get("other") == 3
+    assert cache.generation(t1) == g1 + 1 and cache.generation(t2) == g2
+    assert cache.stats["invalidations"] == 1
+
+    # 항목이 없는 tag 도 세대는 올라간다 (조회 도중 무효화된 응답을 저장하지 않도록)
+    g = cache.generation("nothing")
+    cache.drop_tag("nothing")
+    assert cache.generation("nothing") == g + 1
+
+    # 만료로 지워진 항목의 tag 정리
+    cache.set("short", 4, ttl=-1, tag=("012", False))
+    assert cache.get("short") is None
+    assert ("012", False) not in cache._tags
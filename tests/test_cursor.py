@@ -0,0 +1,42 @@
+"""/api/records keyset 커서 토큰 인코딩과 잘못된 토큰 거부."""
+import base64
+import json
+
+import pytest
+from sanic.exceptions import InvalidUsage
+
+import router_info_server as srv
+
+
+def token(raw) -> str:
+    data = raw if isinstance(raw, bytes) else json.dumps(raw).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("direction", ["next", "prev"])
+def test_round_trip(direction):
+    tok = srv.encode_cursor("2026-03-07 12:34:56", 123456789, direction)
+    assert "=" not in tok and "/" not in tok and "+" not in tok
+    assert srv.decode_cursor(tok) == ("2026-03-07 12:34:56", 123456789, direction)
+
+
+@pytest.mark.parametrize("tok", [
+    "",
+    "!!!",
+    token(b"not json"),
+    token({"ts": "2026-03-07 12:34:56"}),
+    token(["2026-03-07 12:34:56", 1]),
+    token(["2026-03-07 12:34:56", 1, "next", "extra"]),
+    token(["2026-03-07", 1, "next"]),
+    token(["2026-03-07 12:34:56'; DROP TABLE x; --", 1, "next"]),
+    token(["2026-03-07 12:34:56", "1 OR 1=1", "next"]),
+    token(["2026-03-07 12:34:56", 1, "sideways"]),
+])
+def test_rejects_tampered(tok):
+    with pytest.raises(InvalidUsage):
+        srv.decode_cursor(tok)
+
+
+def test_tampered_id_stays_integer():
+    ts, row_id, _ = srv.decode_cursor(token(["2026-03-07 12:34:56", "42", "next"]))
+    assert row_id == 42 and isinstance(row_id, int)
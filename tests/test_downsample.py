@@ -0,0 +1,99 @@
+"""metrics_raw 후처리: gap_fill 가짜 포인트, 다운샘플 (minmax / lttb) 결과 크기와 모양."""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sanic.exceptions import InvalidUsage
+
+import router_info_server as srv
+
+
+def series(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ts = np.arange(n, dtype=np.int64) * srv.FIVE_MIN
+    vals = rng.normal(size=(n, len(srv.RAW_KEYS)))
+    vals[rng.random(vals.shape) < 0.05] = np.nan
+    return ts, vals, np.zeros(n, dtype=bool)
+
+
+@pytest.mark.parametrize("method", list(srv.DOWNSAMPLERS))
+@pytest.mark.parametrize("n", [11, 12, 50, 1000, 10007])
+def test_never_exceeds_max_points(method, n):
+    ts, vals, is_fake = series(n, seed=n)
+    low = srv.DOWNSAMPLE_MIN_POINTS[method]
+    for max_points in sorted({low, low + 1, low + 7, 2 * low, 100, 1000, n - 1}):
+        if max_points < low or max_points >= n:
+            continue
+        idx = srv.DOWNSAMPLERS[method](ts, vals, max_points)
+        assert len(idx) <= max_points, (method, n, max_points)
+        assert idx[0] == 0 and idx[-1] == n - 1
+        assert np.all(np.diff(idx) > 0)
+
+
+def test_minmax_rejects_too_few_points():
+    ts, vals, _ = series(100)
+    for max_points in range(1, srv.DOWNSAMPLE_MIN_POINTS["minmax"]):
+        with pytest.raises(ValueError):
+            srv.minmax_indices(ts, vals, max_points)
+
+
+def test_minmax_keeps_extremes_and_fake_points():
+    ts, vals, is_fake = series(2000)
+    vals[700] = [-200.0, -200.0, -200.0, -200.0]
+    vals[1500, 2] = 500.0
+    idx = srv.minmax_indices(ts, vals, 100)
+    assert 700 in idx and 1500 in idx
+
+
+def test_downsample_passthrough():
+    ts, vals, is_fake = series(50)
+    for max_points in (0, -1, 50, 60):
+        out = srv.downsample(ts, vals, is_fake, max_points, "minmax")
+        assert len(out[0]) == 50
+    out_ts, out_vals, out_fake = srv.downsample(ts, vals, is_fake, 20, "lttb")
+    assert len(out_ts) == 20 and out_vals.shape == (20, len(srv.RAW_KEYS)) and len(out_fake) == 20
+
+
+@pytest.mark.parametrize("method", list(srv.DOWNSAMPLERS))
+def test_parse_downsample_args_bounds(method):
+    low = srv.DOWNSAMPLE_MIN_POINTS[method]
+    req = lambda mp: SimpleNamespace(args={"max_points": str(mp), "downsample": method})
+    assert srv.parse_downsample_args(req(0)) == (0, method)
+    assert srv.parse_downsample_args(req(low)) == (low, method)
+    for mp in range(1, low):
+        with pytest.raises(InvalidUsage):
+            srv.parse_downsample_args(req(mp))
+    with pytest.raises(InvalidUsage):
+        srv.parse_downsample_args(SimpleNamespace(args={"max_points": "x"}))
+
+
+def test_gap_fill():
+    m = srv.FIVE_MIN
+    ts = np.array([0, m, 4 * m, 4 * m + 30], dtype=np.int64)
+    vals = np.arange(16, dtype=np.float64).reshape(4, 4)
+    out_ts, out_vals, is_fake = srv.gap_fill(ts, vals, tail_to=7 * m)
+
+    # m 과 4m 사이 2개, 마지막 포인트(4m+30) 뒤로 7m 전까지 1개
+    assert out_ts.tolist() == [0, m, 2 * m, 3 * m, 4 * m, 4 * m + 30, 5 * m + 30]
+    assert is_fake.tolist() == [False, False, True, True, False, False, True]
+    assert np.array_equal(out_vals[~is_fake], vals)
+    assert (out_vals[is_fake] == srv.FAKE_VALUES).all()
+    assert np.all(np.diff(out_ts) > 0)
+
+
+def test_gap_fill_edges():
+    empty = srv.gap_fill(np.zeros(0, dtype=np.int64), np.zeros((0, 4)), tail_to=1000)
+    assert len(empty[0]) == 0 and len(empty[2]) == 0
+
+    m = srv.FIVE_MIN
+    ts, vals = np.array([0, m - 1, 2 * m - 2], dtype=np.int64), np.zeros((3, 4))
+    out_ts, _, is_fake = srv.gap_fill(ts, vals, tail_to=2 * m)   # 5분 미만 간격, 꼬리도 5분 미만
+    assert out_ts.tolist() == ts.tolist() and not is_fake.any()
+
+
+def test_lttb_keeps_spike():
+    ts, vals, _ = series(1000)
+    vals[:] = 0.0
+    vals[613, 0] = 100.0
+    idx = srv.lttb_indices(ts, vals, 50)
+    assert 613 in idx and len(idx) == 50
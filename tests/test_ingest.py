@@ -0,0 +1,224 @@
+"""수집 적재: build_row 행 구성, insert_db 의 devices upsert 생략, flush_ingest 의 재시도 판단."""
+import asyncio
+import contextlib
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import router_info_server as srv
+
+
+class FakeCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        self.pool.executed.append((sql, args))
+        if self.pool.fail is not None:
+            raise self.pool.fail
+
+    async def fetchone(self):
+        return self.pool.results.pop(0) if self.pool.results else None
+
+
+class FakeConn:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, *_):
+        return FakeCursor(self.pool)
+
+    async def begin(self):
+        self.pool.executed.append(("BEGIN", None))
+
+    async def commit(self):
+        self.pool.executed.append(("COMMIT", None))
+
+    async def rollback(self):
+        self.pool.executed.append(("ROLLBACK", None))
+
+
+class FakePool:
+    """acquire() 마다 실행한 SQL 을 기록. fail 은 execute 에서, busy 는 acquire 에서 던질 예외."""
+
+    def __init__(self):
+        self.executed = []
+        self.fail = None
+        self.busy = None
+        self.results = []   # fetchone() 이 차례로 돌려줄 행
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        if self.busy is not None:
+            raise self.busy
+        yield FakeConn(self)
+
+    def statements(self, prefix: str) -> list:
+        return [(sql, args) for sql, args in self.executed if sql.lstrip().startswith(prefix)]
+
+
+def row(msisdn: str, ts: str, rsrp: str = "-85"):
+    body = json.dumps({"MSISDN": msisdn, "RSRP": rsrp}).encode()
+    return srv.build_row("10.0.0.1", datetime.fromisoformat(ts), body)
+
+
+@pytest.fixture
+def ingest(app_ctx):
+    pool = FakePool()
+    ctx = app_ctx(
+        pool=pool, device_cache={}, last_seen_due={},
+        resp_cache=srv.TTLCache(1 << 20), count_cache=srv.TTLCache(100),
+        ingest_stats={"flushed_rows": 0, "flushed_batches": 0, "failed_rows": 0, "db_unavailable": 0},
+        log_writer=None,
+    )
+    return pool, ctx
+
+
+def upserted(pool) -> list:
+    """devices upsert 마다 msisdn 목록 (행당 파라미터: msisdn, last_seen_ts, last_* 신호값)."""
+    per_row = 2 + len(srv.SIGNAL_NUM_COLS)
+    return [args[0::per_row] for _, args in pool.statements("INSERT INTO devices")]
+
+
+def test_insert_db_throttles_upsert_at_report_cadence(ingest, monkeypatch):
+    monkeypatch.setattr(srv, "LAST_SEEN_WRITE_SEC", 900)
+    pool, ctx = ingest
+    day = srv.now_kst_naive().strftime("%Y-%m-%d")
+    at = lambda m, s: datetime.fromisoformat(f"{day} 10:00:{s:02d}") + timedelta(minutes=m)
+    report = lambda msisdn, m, s=0: row(msisdn, at(m, s).strftime("%Y-%m-%d %H:%M:%S"))
+
+    # 기기 2대가 5분마다 보고 (한 배치에 한 번씩), 1시간 동안
+    per_batch = []
+    for m in range(0, 60, 5):
+        pool.executed.clear()
+        asyncio.run(srv.insert_db([report("010", m, 5), report("011", m, 7)]))
+        assert len(pool.statements("INSERT INTO `router_info`")) == 1
+        per_batch.append(upserted(pool))
+    # 처음 보고와, 마지막 기록 후 15분이 지난 보고만 upsert (12번 중 4번)
+    assert per_batch == [[["010", "011"]] if m % 15 == 0 else [] for m in range(0, 60, 5)]
+    assert ctx.device_cache == {"010": False, "011": False}
+    assert ctx.last_seen_due == {"010": at(60, 5).strftime("%Y-%m-%d %H:%M:%S"),
+                                 "011": at(60, 7).strftime("%Y-%m-%d %H:%M:%S")}
+
+    # 그 사이 휴면 처리된 기기는 기록 간격과 관계없이 바로 upsert
+    ctx.device_cache["011"] = True
+    pool.executed.clear()
+    asyncio.run(srv.insert_db([report("010", 60, 0), report("011", 60, 0)]))
+    assert upserted(pool) == [["011"]] and ctx.device_cache["011"] is False
+
+
+def test_insert_db_upserts_every_report_when_throttle_off(ingest, monkeypatch):
+    monkeypatch.setattr(srv, "LAST_SEEN_WRITE_SEC", 0)
+    pool, _ = ingest
+    for m in ("10:00:05", "10:05:05"):
+        pool.executed.clear()
+        asyncio.run(srv.insert_db([row("010", f"2026-03-07 {m}")]))
+        assert upserted(pool) == [["010"]]
+
+
+def test_insert_db_keeps_cache_on_failure(ingest):
+    pool, ctx = ingest
+    pool.fail = srv.aiomysql.OperationalError(2013, "lost connection")
+    with pytest.raises(srv.aiomysql.OperationalError):
+        asyncio.run(srv.insert_db([row("010", "2026-01-01 10:00:00")]))
+    assert ctx.device_cache == {} and ctx.last_seen_due == {}
+
+
+def test_insert_db_marks_rows_behind_rollup(ingest):
+    pool, _ = ingest
+    now = srv.now_kst_naive()
+    asyncio.run(srv.insert_db([row("010", now.strftime("%Y-%m-%d %H:%M:%S"))]))
+    assert [sql for sql, _ in pool.executed if sql in ("BEGIN", "COMMIT")] == []
+    assert pool.statements("INSERT INTO `rollup_state`") == []
+
+    # 스풀이 밀려 3시간 전 행이 이제 적재됨: INSERT 와 같은 트랜잭션에서 그 시간을 남긴다
+    pool.executed.clear()
+    old = now - timedelta(hours=3)
+    asyncio.run(srv.insert_db([
+        row("010", (old + timedelta(minutes=5)).strftime("%Y-%m-%d %H:%M:%S")),
+        row("011", old.strftime("%Y-%m-%d %H:%M:%S")),
+    ]))
+    names = [sql.split("(")[0].strip() if sql not in ("BEGIN", "COMMIT") else sql for sql, _ in pool.executed]
+    assert names[-4:] == ["BEGIN", "INSERT INTO `router_info`", "INSERT INTO `rollup_state`", "COMMIT"]
+    (_, args), = pool.statements("INSERT INTO `rollup_state`")
+    assert args == (srv.floor_hour(old.replace(microsecond=0)),)
+
+
+def test_insert_db_rolls_back_marker_with_rows(ingest):
+    pool, ctx = ingest
+    ctx.device_cache["010"], ctx.last_seen_due["010"] = False, "2020-01-01 10:15:00"   # upsert 생략
+    pool.fail = srv.aiomysql.OperationalError(2013, "lost connection")
+    with pytest.raises(srv.aiomysql.OperationalError):
+        asyncio.run(srv.insert_db([row("010", "2020-01-01 10:00:00")]))
+    assert [sql for sql, _ in pool.executed if sql in ("BEGIN", "COMMIT", "ROLLBACK")] == ["BEGIN", "ROLLBACK"]
+
+
+def test_take_late_rows_rewinds_hourly_watermark():
+    pool = FakePool()
+    late = datetime(2026, 1, 1, 7)
+    pool.results = [(late,)]
+    asyncio.run(srv.take_late_rows(FakeConn(pool)))
+    sqls = [sql for sql, _ in pool.executed]
+    assert sqls[0] == "BEGIN" and sqls[-1] == "COMMIT"
+    assert any(s.startswith("DELETE FROM `rollup_state` WHERE `name` = 'late'") for s in sqls)
+    (_, args), = pool.statements("UPDATE `rollup_state` SET `watermark` = LEAST(")
+    assert args == (late,)
+
+    pool.executed.clear()
+    asyncio.run(srv.take_late_rows(FakeConn(pool)))
+    assert [sql for sql, _ in pool.executed if not sql.startswith("SELECT")] == ["BEGIN", "COMMIT"]
+
+
+def test_pool_busy_is_transient():
+    assert srv.is_transient_db_error(srv.PoolBusy("main"))
+    assert srv.is_transient_db_error(srv.aiomysql.OperationalError(2013, "lost connection"))
+    assert not srv.is_transient_db_error(srv.aiomysql.IntegrityError(1062, "duplicate"))
+
+
+def test_flush_ingest_keeps_rows_when_pool_busy(ingest):
+    pool, ctx = ingest
+    pool.busy = srv.PoolBusy("main")
+    batch = [row("010", "2026-01-01 10:00:00"), row("011", "2026-01-01 10:00:05")]
+    # 0 -> ingest_consumer 가 커밋하지 않고 같은 오프셋부터 재시도 (한 행씩 재시도하며 버리지 않는다)
+    assert asyncio.run(srv.flush_ingest(batch)) == 0
+    assert ctx.ingest_stats["db_unavailable"] == 1
+    assert ctx.ingest_stats["failed_rows"] == 0 and ctx.ingest_stats["flushed_rows"] == 0
+
+    pool.busy = None
+    assert asyncio.run(srv.flush_ingest(batch)) == 2
+    assert ctx.ingest_stats["flushed_rows"] == 2
+
+
+def test_parse_payload():
+    body = b'{"MSISDN": "01012345678", "RSRP": "-85", "Band": 3, "unknown": 1}\n'
+    vals, raw = srv.parse_payload(body)
+    fields = dict(zip(srv.PAYLOAD_KEYS, vals))
+    assert fields["MSISDN"] == "01012345678" and fields["RSRP"] == "-85" and fields["Band"] == 3
+    assert fields["SINR"] is None and "unknown" not in fields
+    assert raw == body.decode().strip()   # 다시 직렬화하지 않은 원본
+
+    for bad in (b"", b"not json", b"[1, 2]", b'"str"', b"\xff\xfe", b'{"MSISDN": '):
+        assert srv.parse_payload(bad) == (srv.EMPTY_PAYLOAD, None)
+
+
+def test_build_row():
+    ts = datetime(2026, 3, 7, 10, 0, 5)
+    body = json.dumps({"MSISDN": "010", "RSRP": " -85.6 ", "RSRQ": "-9.5", "SINR": "abc", "RSSI": 5}).encode()
+    r = srv.build_row("10.0.0.1", ts, body)
+    assert len(r) == len(srv.ROUTER_INFO_COLS)
+    cols = dict(zip(srv.ROUTER_INFO_COLS, r))
+    assert cols["ts_kst"] == "2026-03-07 10:00:05" and r[srv.TS_IDX] == cols["ts_kst"]
+    assert cols["msisdn"] == r[srv.MSISDN_IDX] == "010"
+    assert cols["client_ip"] == "10.0.0.1" and json.loads(cols["raw_json"])["RSRP"] == " -85.6 "
+    assert cols["rsrp"] == " -85.6 "   # 원본 컬럼은 받은 값 그대로
+    assert (cols["rsrp_num"], cols["rsrq_num"], cols["sinr_num"], cols["rssi_num"]) == (-86, -9.5, None, None)
+
+    empty = srv.build_row("10.0.0.1", ts, b"garbage")
+    assert empty[srv.MSISDN_IDX] is None and dict(zip(srv.ROUTER_INFO_COLS, empty))["raw_json"] is None
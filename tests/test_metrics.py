@@ -0,0 +1,31 @@
+"""SQL 라벨 sql_fingerprint: 값만 다른 SQL 은 같은 라벨."""
+import pytest
+
+import router_info_server as srv
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT * FROM `router_info` WHERE id = 1", "SELECT  *\n FROM `router_info`  WHERE id = 22"),
+    ("SELECT a FROM t WHERE m IN (%s)", "SELECT a FROM t WHERE m IN (%s, %s, %s)"),
+    ("INSERT INTO `router_info` (a, b) VALUES (%s, %s)",
+     "INSERT INTO `router_info` (a, b) VALUES (%s, %s), (%s, %s), (%s,%s)"),
+    ("UPDATE devices SET x = NULL WHERE id = 5", "UPDATE devices SET x = NULL WHERE id = 6"),
+])
+def test_same_shape_same_label(a, b):
+    assert srv.sql_fingerprint(a) == srv.sql_fingerprint(b)
+
+
+def test_label_parts():
+    label, norm = srv.sql_fingerprint("SELECT `msisdn` FROM `devices` WHERE `dormant` = 0 AND id IN (%s, %s)")
+    verb, table, digest = label.split(":")
+    assert (verb, table, len(digest)) == ("select", "devices", 8)
+    assert norm == "SELECT `msisdn` FROM `devices` WHERE `dormant` = N AND id IN (?)"
+
+    assert srv.sql_fingerprint("COMMIT")[0].startswith("commit:-:")
+    assert srv.sql_fingerprint("DELETE FROM a WHERE x = 1")[0] != srv.sql_fingerprint("DELETE FROM b WHERE x = 1")[0]
+    assert srv.sql_fingerprint("SELECT 1 FROM t WHERE a = %s")[0] != srv.sql_fingerprint("SELECT 1 FROM t WHERE b = %s")[0]
+
+
+def test_cached_fingerprint_matches():
+    sql = "SELECT * FROM `router_info_hourly` WHERE `h` >= %s"
+    assert srv.cached_sql_fingerprint(sql) == srv.sql_fingerprint(sql)
@@ -0,0 +1,215 @@
+"""/api/outages: 장애 구간 집계, 워터마크 이전 구간의 원본 조회 생략, 적재 지연 중 진행 중 장애 처리."""
+import asyncio
+import contextlib
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sanic.request import RequestParameters
+
+import router_info_server as srv
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+
+class FakeReadPool:
+    """SQL 종류별로 fetchall() 결과를 돌려주고 실행한 SQL 을 기록."""
+
+    def __init__(self, devices=(), stored=(), live=(), straddle=(), latest=()):
+        self.executed = []
+        self.devices, self.stored, self.live, self.straddle = devices, stored, live, straddle
+        self.latest = latest
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    def cursor(self, *_):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, args=None):
+        self.executed.append((sql, args))
+
+    async def fetchall(self):
+        sql = self.executed[-1][0]
+        if "`device_outages`" in sql:
+            return list(self.stored)
+        if "LAG(" in sql:
+            return list(self.live)
+        if "`next_ts`" in sql:
+            return list(self.straddle)
+        if "p.`ts_kst` >= d.`last_seen_ts`" in sql:
+            return list(self.latest)
+        return list(self.devices)
+
+    def ran(self, marker: str) -> list:
+        return [args for sql, args in self.executed if marker in sql]
+
+
+class FakeSpool:
+    def __init__(self, lag_sec=0.0):
+        self.lag_sec = lag_sec
+
+    def snapshot(self):
+        return {"lag_sec": self.lag_sec}
+
+
+@pytest.fixture
+def outages(app_ctx, monkeypatch):
+    monkeypatch.setattr(srv, "now_kst_naive", lambda: NOW)
+
+    def call(pool, wm, lag_sec=0.0, **args):
+        app_ctx(read_pool=pool, rollup_watermark=wm, replica_watermark=wm, spool=FakeSpool(lag_sec))
+        req = SimpleNamespace(args=RequestParameters({k: [v] for k, v in args.items()}))
+        resp = asyncio.run(srv.outages.__wrapped__(req))
+        assert resp.status == 200
+        return json.loads(resp.body)
+    return call
+
+
+def test_closed_range_before_watermark_skips_live_scan(outages):
+    wm = NOW - timedelta(hours=1)
+    until = datetime(2026, 3, 8)   # end=2026-03-07 -> [.., 03-08)
+    pool = FakeReadPool(
+        devices=[("010", "a", NOW), ("011", "b", NOW)],
+        straddle=[("010", until - timedelta(hours=1), wm + timedelta(minutes=10))],
+    )
+    body = outages(pool, wm, start="2026-03-07", end="2026-03-07")
+
+    assert pool.ran("LAG(") == []
+    assert pool.ran("`next_ts`") == [(wm, wm)]
+    (stored_args,) = pool.ran("`device_outages`")
+    assert stored_args == (datetime(2026, 3, 7), wm, until)
+    dev = {d["msisdn"]: d for d in body["devices"]}
+    assert dev["010"]["outage_sec"] == 3600 and dev["010"]["ongoing"] is True
+    assert dev["011"]["outage_count"] == 0 and dev["011"]["ongoing"] is False
+
+
+def test_open_range_runs_live_scan(outages):
+    wm = NOW - timedelta(hours=1)
+    pool = FakeReadPool(devices=[("010", "a", NOW)])
+    outages(pool, wm, days="1")
+    assert pool.ran("LAG(") == [(wm, wm, NOW)]
+    assert pool.ran("`next_ts`") == []
+
+
+def test_ongoing_suppressed_while_spool_lags(outages):
+    last_seen = NOW - timedelta(minutes=30)
+    pool = FakeReadPool(devices=[("010", "a", last_seen)])
+
+    body = outages(pool, NOW - timedelta(hours=1), days="1")
+    assert body["ongoing_suppressed"] is False
+    assert body["devices"][0]["ongoing"] is True
+
+    # 40분 밀린 스풀에는 last_seen 이후 행이 있을 수 있다: 적재된 시각(NOW-40분)까지만 센다
+    body = outages(pool, NOW - timedelta(hours=1), lag_sec=2400, days="1")
+    assert body["ongoing_suppressed"] is True and body["ingest_lag_sec"] == 2400
+    assert body["devices"][0]["ongoing"] is False and body["devices"][0]["outage_count"] == 0
+
+    # 적재된 시각 전에 이미 장애였으면 그 시각까지는 장애로 센다
+    pool = FakeReadPool(devices=[("010", "a", NOW - timedelta(hours=2))])
+    body = outages(pool, NOW - timedelta(hours=1), lag_sec=2400, days="1")
+    assert body["devices"][0]["outage_sec"] == int((timedelta(hours=2, minutes=-40 - 5)).total_seconds())
+    assert body["devices"][0]["ongoing"] is False
+
+
+def test_ongoing_checks_raw_when_last_seen_is_throttled(outages):
+    wm = NOW - timedelta(hours=1)
+    # 두 기기 모두 last_seen_ts 는 14분 전 (기록 간격 때문). 010 은 실제로 3분 전에 보고했다
+    pool = FakeReadPool(
+        devices=[("010", "a", NOW - timedelta(minutes=14)), ("011", "b", NOW - timedelta(minutes=14))],
+        latest=[("010", NOW - timedelta(minutes=3)), ("011", None)],
+    )
+    body = outages(pool, wm, days="1")
+    assert pool.ran("p.`ts_kst` >= d.`last_seen_ts`") == [["010", "011"]]
+    dev = {d["msisdn"]: d for d in body["devices"]}
+    assert dev["010"]["ongoing"] is False and dev["010"]["outage_count"] == 0
+    assert dev["011"]["ongoing"] is True and dev["011"]["outage_sec"] == 9 * 60
+
+    # 장애로 보이는 기기가 없으면 원본을 보지 않는다
+    pool = FakeReadPool(devices=[("010", "a", NOW - timedelta(minutes=3))])
+    outages(pool, wm, days="1")
+    assert pool.ran("p.`ts_kst` >= d.`last_seen_ts`") == []
+
+
+def test_without_watermark_uses_live_scan(outages):
+    pool = FakeReadPool(devices=[("010", "a", NOW)])
+    outages(pool, None, start="2026-03-07", end="2026-03-07")
+    assert pool.ran("LAG(") == [(datetime(2026, 3, 7), datetime(2026, 3, 7), NOW)]
+
+    # 미래 구간이라 조회 끝이 시작보다 앞이어도 500 이 아니다
+    pool = FakeReadPool(devices=[("010", "a", NOW)])
+    body = outages(pool, None, start="2026-03-20", end="2026-03-21")
+    assert body["devices"][0]["outage_count"] == 0 and pool.ran("`next_ts`") == []
+
+
+def test_fleet_report_cache_invalidated_by_late_rows(app_ctx, monkeypatch):
+    monkeypatch.setattr(srv, "now_kst_naive", lambda: NOW)
+    pool = FakeReadPool(devices=[("010", "a", NOW)])
+    cache = srv.TTLCache(1 << 20)
+    app_ctx(read_pool=pool, rollup_watermark=NOW - timedelta(hours=1), spool=FakeSpool(), resp_cache=cache)
+    req = SimpleNamespace(args=RequestParameters({"start": ["2026-03-01"], "end": ["2026-03-07"]}), headers={})
+
+    def fetch():
+        pool.executed.clear()
+        assert asyncio.run(srv.outages(req)).status == 200
+        return len(pool.executed)
+
+    assert fetch() > 0 and fetch() == 0            # 끝난 구간: 두 번째는 캐시
+    srv.invalidate_responses("011")                 # 오늘 행만 들어온 기기: 끝난 구간 응답은 그대로
+    assert fetch() == 0
+    srv.invalidate_responses("011", closed=True)    # 지난 날짜 행이 늦게 적재된 기기
+    assert fetch() > 0 and fetch() == 0
+    srv.invalidate_responses(devices=True)          # 별칭/휴면 변경
+    assert fetch() > 0
+
+
+def test_summarize_ongoing_ignores_spans_after_range():
+    lo, hi = datetime(2026, 3, 7), datetime(2026, 3, 8)
+    spans = {"010": [(datetime(2026, 3, 9), datetime(2026, 3, 9, 1))]}
+    result, _ = srv.summarize_outages([("010", None)], spans, lo, hi, False)
+    assert result[0]["ongoing"] is False and result[0]["outage_count"] == 0
+
+
+def test_outage_stats_clips_to_range():
+    lo, hi = datetime(2026, 3, 7), datetime(2026, 3, 8)
+    spans = [
+        (lo - timedelta(hours=2), lo + timedelta(hours=1)),        # 앞쪽 1시간만
+        (lo + timedelta(hours=5), lo + timedelta(hours=5, minutes=30)),
+        (hi - timedelta(hours=2), hi + timedelta(hours=3)),        # 뒤쪽 2시간만 (최장)
+        (hi + timedelta(hours=4), hi + timedelta(hours=5)),        # 범위 밖
+    ]
+    st = srv.outage_stats(spans, lo, hi)
+    assert st["outage_count"] == 3
+    assert st["outage_sec"] == 3600 + 1800 + 7200
+    assert st["longest_sec"] == 7200
+    assert st["longest_start"] == srv.fmt_dt(hi - timedelta(hours=2))
+    assert st["uptime_pct"] == round(100 * (1 - 12600 / 86400), 3)
+
+    assert srv.outage_stats([], lo, hi) == {
+        "uptime_pct": 100.0, "outage_count": 0, "outage_sec": 0,
+        "longest_sec": 0, "longest_start": None, "longest_end": None,
+    }
+    assert srv.outage_stats([], lo, lo)["uptime_pct"] is None
+
+
+def test_summarize_by_day_and_fleet():
+    lo, hi = datetime(2026, 3, 7), datetime(2026, 3, 9)
+    spans = {"010": [(datetime(2026, 3, 7, 23), datetime(2026, 3, 8, 1))]}
+    result, fleet = srv.summarize_outages([("011", "b"), ("010", "a")], spans, lo, hi, True)
+
+    assert [d["msisdn"] for d in result] == ["010", "011"]   # 가동률 낮은 순
+    days = result[0]["days"]
+    assert [d["date"] for d in days] == ["2026-03-07", "2026-03-08"]
+    assert [d["outage_sec"] for d in days] == [3600, 3600]
+    assert result[0]["outage_count"] == 1 and result[0]["outage_sec"] == 7200
+    assert fleet["devices"] == 2 and fleet["outage_count"] == 1 and fleet["outage_sec"] == 7200
+    assert fleet["longest_sec"] == 7200
+    assert fleet["uptime_pct"] == round((result[0]["uptime_pct"] + 100.0) / 2, 3)
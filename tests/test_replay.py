@@ -0,0 +1,80 @@
+"""replay: 원본 로그 재적재 후 롤업 워터마크는 'late' 기록으로만 되돌리고, 서버 스풀에 남은 행은 건너뛴다."""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+
+import router_info_server as srv
+from test_ingest import FakePool
+
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """replay_day 를 흉내내 (날짜, until) 호출을 기록. 돌려주는 값은 {날짜: 가장 이른 추가 행}."""
+    pool = FakePool()
+    pool.calls = []
+    oldest_by_day = {}
+
+    async def create_db_pool(**_):
+        return pool
+
+    async def noop(*_):
+        pass
+
+    async def replay_day(_pool, day, _batch, until):
+        pool.calls.append((f"{day:%Y%m%d}", until))
+        oldest = oldest_by_day.get(f"{day:%Y%m%d}")
+        return {"files": 1, "records": 1, "inserted": 1 if oldest else 0, "skipped": 0, "held": 0, "oldest": oldest}
+
+    pool.close, pool.wait_closed = lambda: None, noop
+    monkeypatch.setattr(srv, "create_db_pool", create_db_pool)
+    monkeypatch.setattr(srv, "ensure_schema", noop)
+    monkeypatch.setattr(srv, "replay_day", replay_day)
+    monkeypatch.setattr(srv, "now_kst_naive", lambda: NOW)
+    monkeypatch.setattr(srv, "SPOOL_DIR", str(tmp_path / "spool"))
+    checkpoint = str(tmp_path / "ck.json")
+
+    def run(start, end, oldest=None):
+        oldest_by_day.clear()
+        oldest_by_day.update(oldest or {})
+        pool.calls.clear()
+        asyncio.run(srv.replay(start, end, 2, 100, checkpoint))
+        with open(checkpoint, encoding="utf-8") as f:
+            return pool, sorted(json.load(f)["done"])
+    return run
+
+
+def test_replay_marks_late_instead_of_moving_watermark(replay):
+    pool, _ = replay("2026-03-01", "2026-03-03",
+                     {"20260301": "2026-03-01 13:20:00", "20260302": "2026-03-02 00:05:00"})
+
+    # 실행 중인 서버의 롤업이 덮어쓰지 않도록 hourly 워터마크는 직접 바꾸지 않는다
+    assert pool.statements("UPDATE `rollup_state`") == []
+    (sql, args), = pool.statements("INSERT INTO `rollup_state`")
+    assert sql == srv.ROLLUP_LATE_SQL and args == (datetime(2026, 3, 1, 13),)
+
+
+def test_replay_stops_at_pending_spool_rows(replay, tmp_path):
+    async def leave_pending_row():
+        spool = srv.IngestSpool(str(tmp_path / "spool"))
+        spool.open()
+        spool.append(("2026-03-08 09:30:00", "010"))
+        await spool.flush(final=True)
+        await spool.release()
+    asyncio.run(leave_pending_row())
+
+    pool, done = replay("2026-03-06", "2026-03-10")
+    # 스풀에 남은 행 이후는 서버 소비자가 넣으므로, 그 날은 일부만 하고 완료로 남기지 않는다
+    assert sorted(pool.calls) == [("20260306", "2026-03-08 09:30:00"), ("20260307", "2026-03-08 09:30:00"),
+                                  ("20260308", "2026-03-08 09:30:00")]
+    assert done == ["20260306", "20260307"]
+
+
+def test_replay_without_spool_holds_only_the_last_minute(replay):
+    pool, done = replay("2026-03-09", "2026-03-10")
+    assert sorted(pool.calls) == [("20260309", "2026-03-10 11:59:00"), ("20260310", "2026-03-10 11:59:00")]
+    assert done == ["20260309"]      # 오늘 파일은 아직 기록 중
@@ -0,0 +1,27 @@
+"""router_info 필수 인덱스 확인 (missing_indexes)."""
+import asyncio
+
+import pytest
+
+import router_info_server as srv
+
+
+class IndexCursor:
+    def __init__(self, indexes):
+        self.rows = [(name, col) for name, cols in indexes.items() for col in cols]
+
+    async def execute(self, sql, args=None):
+        pass
+
+    async def fetchall(self):
+        return self.rows
+
+
+@pytest.mark.parametrize("indexes, missing", [
+    ({"PRIMARY": ["id"]}, [("msisdn", "ts_kst"), ("ts_kst",)]),
+    ({"PRIMARY": ["id"], "idx_msisdn_ts": ["msisdn", "ts_kst"]}, [("ts_kst",)]),
+    ({"PRIMARY": ["id", "ts_kst"], "idx_msisdn_ts": ["msisdn", "ts_kst"]}, [("ts_kst",)]),
+    ({"idx_msisdn_ts_id": ["msisdn", "ts_kst", "id"], "by_ts": ["ts_kst", "msisdn"]}, []),
+])
+def test_missing_indexes(indexes, missing):
+    assert asyncio.run(srv.missing_indexes(IndexCursor(indexes))) == missing
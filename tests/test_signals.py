@@ -0,0 +1,129 @@
+"""수집(parse_signal)과 backfill-signals(backfill_signals_sql)가 같은 문자열에 같은 숫자를 내는지, 백필 후 롤업 재계산."""
+import asyncio
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import router_info_server as srv
+from test_ingest import FakePool
+
+# (컬럼, 입력, 기대값)
+CASES = [
+    ("rsrp", "-85", -85),
+    ("rsrp", " -85 ", -85),
+    ("rsrp", "+5", None),             # 범위 밖
+    ("rsrp", "-100.4", -100),
+    ("rsrp", "-100.5", -101),         # .5 는 0에서 먼 쪽
+    ("rsrp", "-100.4995", -101),      # 소수 셋째 자리(-100.500)로 먼저 반올림
+    ("rsrp", "-160", -160),
+    ("rsrp", "-160.0004", -160),
+    ("rsrp", "-161", None),
+    ("rsrp", "1e2", None),
+    ("rsrp", "-8.5e1", None),
+    ("rsrp", ".5", None),
+    ("rsrp", "-85.", None),
+    ("rsrp", "", None),
+    ("rsrp", "N/A", None),
+    ("rsrp", "nan", None),
+    ("rsrp", "-inf", None),
+    ("rsrp", "\t-85", None),          # TRIM 은 공백만 뗀다
+    ("rsrp", -85, -85),
+    ("rsrp", -85.4, -85),
+    ("rsrp", True, None),
+    ("rsrp", None, None),
+    ("rsrq", "-9.5", -9.5),
+    ("rsrq", "-9.12345", -9.123),
+    ("rsrq", "-9.1235", -9.124),
+    ("rsrq", "-45", -45.0),
+    ("rsrq", "20.0004", 20.0),
+    ("rsrq", "20.0005", None),
+    ("sinr", "12.3456", 12.346),
+    ("sinr", "0", 0.0),
+    ("sinr", "-0.0004", 0.0),
+    ("sinr", "99999999999", None),
+    ("sinr", 1e-05, None),            # 문자열 컬럼에는 지수 표기로 저장된다
+    ("rssi", "-60", -60),
+    ("rssi", "-0.4", 0),
+    ("rssi", "0.4", None),            # 범위 검사는 정수 반올림 전 값으로
+    ("rssi", "-130.5", None),
+]
+
+
+@pytest.mark.parametrize("col, raw, expected", CASES)
+def test_parse_signal(col, raw, expected):
+    got = srv.parse_signal(col, raw)
+    assert got == expected
+    if expected is not None:
+        assert type(got) is (int if srv.SIGNAL_NUM_COLS[col][0] == "SMALLINT" else float)
+
+
+def test_backfill_sql_uses_signal_grammar():
+    sql = srv.backfill_signals_sql()
+    for col in srv.SIGNAL_NUM_COLS:
+        assert f"TRIM(`{col}`) REGEXP '{srv.SIGNAL_NUM_PATTERN}'" in sql
+    assert "DECIMAL(10,3)" in sql and srv.SIGNAL_NUM_STEP.as_tuple().exponent == -3
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DB_HOST"), reason="TEST_DB_HOST (MySQL 8) 가 필요")
+def test_backfill_sql_matches_parse_signal():
+    """임시 테이블 router_info 에 CASES 의 문자열을 넣고 backfill_signals_sql 결과를 parse_signal 과 비교."""
+    cols = list(srv.SIGNAL_NUM_COLS)
+    ddl = (
+        "CREATE TEMPORARY TABLE `router_info` (`id` INT NOT NULL AUTO_INCREMENT PRIMARY KEY, "
+        + ", ".join(f"`{c}` VARCHAR(64) NULL" for c in cols) + ", "
+        + ", ".join(f"`{c}_num` {t} NULL" for c, (t, _, _) in srv.SIGNAL_NUM_COLS.items()) + ")"
+    )
+    cases = [(col, raw) for col, raw, _ in CASES if raw is not None and not isinstance(raw, bool)]
+
+    async def run():
+        conn = await srv.aiomysql.connect(
+            host=os.environ["TEST_DB_HOST"], port=int(os.environ.get("TEST_DB_PORT", "3306")),
+            user=os.environ.get("TEST_DB_USER", "root"), password=os.environ.get("TEST_DB_PASS", ""),
+            db=os.environ.get("TEST_DB_NAME", "test"), autocommit=True,
+        )
+        try:
+            async with conn.cursor() as cur:
+                await cur.execute(ddl)
+                for col, raw in cases:
+                    await cur.execute(f"INSERT INTO `router_info` (`{col}`) VALUES (%s)", (raw,))
+                await cur.execute(srv.backfill_signals_sql(), (0, len(cases) + 1))
+                await cur.execute(
+                    "SELECT " + ", ".join(f"`{c}`, `{c}_num`" for c in cols) + " FROM `router_info` ORDER BY `id`"
+                )
+                return await cur.fetchall()
+        finally:
+            conn.close()
+
+    rows = asyncio.run(run())
+    for (col, raw), row in zip(cases, rows):
+        i = cols.index(col)
+        stored, num = row[2 * i], row[2 * i + 1]
+        want = srv.parse_signal(col, raw)
+        assert srv.parse_signal(col, stored) == want, (col, raw, stored)
+        if want is None or num is None:
+            assert num == want, (col, raw)
+        else:
+            assert np.float32(num) == np.float32(want), (col, raw, num)
+
+
+def test_backfill_marks_late_instead_of_clearing_watermark(monkeypatch):
+    pool = FakePool()
+    pool.results = [(10, 50), (datetime(2026, 2, 3, 4, 5, 6),)]   # MIN/MAX(id), 채울 행의 MIN(ts_kst)
+
+    async def create_db_pool(**_):
+        return pool
+
+    async def noop(*_):
+        pass
+
+    pool.close, pool.wait_closed = lambda: None, noop
+    monkeypatch.setattr(srv, "create_db_pool", create_db_pool)
+    monkeypatch.setattr(srv, "ensure_schema", noop)
+    asyncio.run(srv.backfill_signals(20, 0))
+
+    assert pool.statements("DELETE FROM `rollup_state`") == []
+    assert [args for _, args in pool.statements("UPDATE `router_info`")] == [(10, 30), (30, 50), (50, 70)]
+    (sql, args), = pool.statements("INSERT INTO `rollup_state`")
+    assert sql == srv.ROLLUP_LATE_SQL and args == (datetime(2026, 2, 3, 4),)
@@ -0,0 +1,155 @@
+"""수집 스풀 IngestSpool: 기록, 읽기, commit, 재기동 후 이어 읽기."""
+import asyncio
+import os
+
+import pytest
+
+import router_info_server as srv
+
+
+def rows(n: int, start: int = 0) -> list:
+    return [(f"2026-03-07 10:00:{i % 60:02d}", f"010{i:04d}", i) for i in range(start, start + n)]
+
+
+def read_all(spool, max_rows=1000):
+    return spool.read_batch(max_rows, spool.write_seq, spool.write_pos)
+
+
+async def append_flush(spool, batch):
+    for r in batch:
+        assert spool.append(r)
+    await spool.flush()
+
+
+def test_append_read_commit_restart(tmp_path):
+    async def run():
+        spool = srv.IngestSpool(str(tmp_path))
+        spool.open()
+        await append_flush(spool, rows(5))
+        got, seq, ends, pos = read_all(spool, max_rows=3)
+        assert [list(r) for r in rows(3)] == [list(r) for r in got]
+        await spool.commit(seq, ends[-1], len(got))
+        assert spool.stats["committed"] == 3 and spool.backlog == spool.write_pos - ends[-1]
+        await spool.close()
+        await spool.release()
+
+        # 재기동: offset 이후 2행만 다시 읽고, 새 행은 새 세그먼트에 쓴다
+        again = srv.IngestSpool(str(tmp_path))
+        again.open()
+        assert again.write_seq == seq + 1
+        got, seq, ends, pos = read_all(again)
+        assert [r[2] for r in got] == [3, 4]
+        await again.commit(seq, pos, len(got))
+        await append_flush(again, rows(2, start=5))
+        got, seq, ends, pos = read_all(again)
+        assert [r[2] for r in got] == [5, 6]
+        await again.commit(seq, pos, len(got))
+        assert again.backlog == 0
+        await again.close()
+        await again.release()
+        # 다 읽은 이전 세그먼트는 지워진다
+        assert sorted(n for n in os.listdir(tmp_path) if n.endswith(".seg")) == [os.path.basename(again.seg_path(seq))]
+    asyncio.run(run())
+
+
+def test_unflushed_rows_are_not_readable(tmp_path):
+    async def run():
+        spool = srv.IngestSpool(str(tmp_path))
+        spool.open()
+        spool.append(rows(1)[0])
+        assert read_all(spool)[0] == []
+        await spool.flush()
+        assert len(read_all(spool)[0]) == 1
+        await spool.release()
+    asyncio.run(run())
+
+
+def test_segment_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "SPOOL_SEGMENT_BYTES", 200)
+
+    async def run():
+        spool = srv.IngestSpool(str(tmp_path))
+        spool.open()
+        seen = []
+        for i in range(0, 20, 4):
+            await append_flush(spool, rows(4, start=i))
+        assert spool.write_seq > 2
+        while True:
+            got, seq, ends, pos = read_all(spool)
+            if not got and seq == spool.write_seq:
+                break
+            seen += [r[2] for r in got]
+            await spool.commit(seq, pos, len(got))
+        assert seen == list(range(20)) and spool.backlog == 0
+        await spool.release()
+    asyncio.run(run())
+
+
+def test_truncated_line_skipped_after_restart(tmp_path):
+    async def run():
+        spool = srv.IngestSpool(str(tmp_path))
+        spool.open()
+        await append_flush(spool, rows(2))
+        await spool.release()
+        with open(spool.seg_path(spool.write_seq), "ab") as f:
+            f.write(b'["2026-03-07 10:00:59", "01')   # 비정상 종료로 잘린 줄
+
+        again = srv.IngestSpool(str(tmp_path))
+        again.open()
+        got, seq, ends, pos = read_all(again)
+        assert [r[2] for r in got] == [0, 1]
+        await again.commit(seq, pos, len(got))
+        got, seq, _, pos = read_all(again)
+        assert got == [] and again.stats["bad_lines"] == 1
+        await again.commit(seq, pos, 0)
+        got, seq, _, _ = read_all(again)
+        assert got == [] and seq == again.write_seq
+        await again.release()
+    asyncio.run(run())
+
+
+def test_append_drops_over_max_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "SPOOL_MAX_BYTES", 100)
+    spool = srv.IngestSpool(str(tmp_path))
+    results = [spool.append(r) for r in rows(5)]
+    assert results[0] is True and results[-1] is False
+    assert spool.stats["dropped"] == results.count(False)
+
+
+@pytest.mark.parametrize("head_ts, backlog, lag", [(None, 10, 0.0), ("2026-03-07 11:59:00", 0, 0.0),
+                                                  ("2026-03-07 11:59:00", 10, 60.0)])
+def test_snapshot_lag(tmp_path, monkeypatch, head_ts, backlog, lag):
+    from datetime import datetime
+    monkeypatch.setattr(srv, "now_kst_naive", lambda: datetime(2026, 3, 7, 12))
+    spool = srv.IngestSpool(str(tmp_path))
+    spool.head_ts, spool.backlog = head_ts, backlog
+    assert spool.snapshot()["lag_sec"] == lag
+
+
+def test_pending_head_ts_across_slots(tmp_path, monkeypatch):
+    monkeypatch.setattr(srv, "SPOOL_DIR", str(tmp_path))
+    assert srv.spool_pending_ts() is None
+
+    async def run():
+        main = srv.IngestSpool(str(tmp_path))
+        main.open()
+        await append_flush(main, rows(5))
+        got, seq, ends, _ = read_all(main, max_rows=3)
+        await main.commit(seq, ends[-1], len(got))
+        # 다른 프로세스가 파일만 읽어도 commit 이후 첫 행이 보인다
+        assert srv.IngestSpool(str(tmp_path)).pending_head_ts() == "2026-03-07 10:00:03"
+
+        w1 = srv.IngestSpool(str(tmp_path / "w1"))
+        w1.open()
+        await append_flush(w1, rows(2, start=1))
+        assert srv.spool_pending_ts() == "2026-03-07 10:00:01"
+
+        got, seq, _, pos = read_all(w1)
+        await w1.commit(seq, pos, len(got))
+        got, seq, _, pos = read_all(main)
+        await main.commit(seq, pos, len(got))
+        assert srv.spool_pending_ts() is None
+        for spool in (main, w1):
+            await spool.close()
+            await spool.release()
+    asyncio.run(run())